@@ -0,0 +1,95 @@
+import random
+
+from typing import List
+
+
+PAGE_HEADER = "Єдиний державний реєстр судових рішень Пошук Допомога Вхід Повний доступ"
+PAGE_FOOTER = (
+    "Логін: Для помилки: Пароль: Увійти Відновити пароль "
+    "Зачекайте, будь ласка... © Державна судова адміністрація України"
+)
+
+COURTS = [
+    "Шевченківський районний суд міста Києва",
+    "Господарський суд Харківської області",
+    "Львівський апеляційний суд",
+    "Касаційний цивільний суд у складі Верховного Суду",
+    "Одеський окружний адміністративний суд",
+]
+
+SENTENCES = [
+    "Позивач звернувся до суду з позовом про стягнення заборгованості за договором позики.",
+    "Відповідно до статті 625 Цивільного кодексу України боржник не звільняється від відповідальності за неможливість виконання ним грошового зобов'язання.",
+    "Суд, дослідивши матеріали справи, заслухавши пояснення сторін, дійшов висновку про часткове задоволення позову.",
+    "Відповідач у судове засідання не з'явився, про дату, час та місце розгляду справи повідомлявся належним чином.",
+    "Згідно з частиною першою статті 81 Цивільного процесуального кодексу України кожна сторона повинна довести ті обставини, на які вона посилається.",
+    "Оцінивши докази в їх сукупності, суд вважає, що позовні вимоги є обґрунтованими та підлягають задоволенню.",
+    "Апеляційна скарга підлягає залишенню без задоволення, а рішення суду першої інстанції без змін.",
+    "Судовий збір покладається на відповідача пропорційно розміру задоволених позовних вимог.",
+    "Строк позовної давності, про застосування якого заявлено стороною у спорі, пропущено без поважних причин.",
+    "Рішення може бути оскаржене до апеляційного суду протягом тридцяти днів з дня його проголошення.",
+    "Колегія суддів зазначає, що доводи апеляційної скарги не спростовують висновків суду.",
+    "Інфляційні втрати та три проценти річних нараховуються на суму простроченого боргу.",
+]
+
+
+def generate_decision_text(decision_id: str, paragraphs: int = 12, seed: int = None) -> str:
+    """
+    Builds the text of a page from the court decisions registry, the way it looks before clean_text.
+    """
+    rng = random.Random(seed if seed is not None else decision_id)
+    case_number = f"{rng.randint(100, 999)}/{rng.randint(1000, 9999)}/{rng.randint(10, 25)}"
+    proceeding_number = f"2/{rng.randint(100, 999)}/{rng.randint(1000, 9999)}/{rng.randint(10, 25)}"
+
+    lines = [
+        PAGE_HEADER,
+        f"Справа № {case_number}",
+        f"Провадження № {proceeding_number}",
+        "РІШЕННЯ ІМЕНЕМ УКРАЇНИ",
+        rng.choice(COURTS),
+    ]
+    for _ in range(paragraphs):
+        lines.append(" ".join(rng.choice(SENTENCES) for _ in range(rng.randint(3, 7))))
+    lines.append(f"Рішення № {decision_id}")
+    lines.append(PAGE_FOOTER)
+    return "\n\n".join(lines)
+
+
+def generate_corpus(size: int, paragraphs: int = 12, first_id: int = 10_000_000) -> List[tuple[str, str]]:
+    """
+    Returns (decision_id, raw_text) pairs of synthetic decisions.
+    """
+    return [
+        (str(decision_id), generate_decision_text(str(decision_id), paragraphs))
+        for decision_id in range(first_id, first_id + size)
+    ]
+
+
+def generate_decision_html(decision_id: str, paragraphs: int = 12, seed: int = None) -> str:
+    """
+    Wraps a synthetic decision into the markup of a registry page: scripts, styles and navigation around the text.
+    """
+    text = generate_decision_text(decision_id, paragraphs, seed)
+    header, *body, footer = text.split("\n\n")
+    body_html = "\n".join(f"<p>{paragraph}</p>" for paragraph in body)
+    return f"""<!DOCTYPE html>
+<html lang="uk">
+<head>
+<meta charset="utf-8">
+<title>Рішення № {decision_id}</title>
+<style>body {{ font-family: Arial; }} .hidden {{ display: none; }}</style>
+<script>window.dataLayer = window.dataLayer || []; function gtag() {{ dataLayer.push(arguments); }}</script>
+</head>
+<body>
+<nav><a href="/">{header.replace(" Повний доступ", "")}</a></nav>
+<div id="header"><a href="/Account/Login">Повний доступ</a></div>
+<div id="divdocument">
+{body_html}
+</div>
+<div id="footer">
+<form>{footer}</form>
+</div>
+<script>document.getElementById("divdocument").focus();</script>
+</body>
+</html>
+"""
@@ -0,0 +1,27 @@
+import os
+import tempfile
+
+from contextlib import contextmanager
+
+from chroma_client.chunk_embedding_store import ChunkEmbeddingStore
+from chroma_client.model_registry import EmbeddingModelRegistry
+
+
+@contextmanager
+def temporary_chunk_embedding_store():
+    """
+    Embeds documents through an empty chunk embedding store in a temporary directory, so that a run neither
+    gets hits from vectors stored by earlier runs nor writes into the production store.
+    Collections must be opened inside the block to use it.
+
+        with temporary_chunk_embedding_store():
+            ChromaDBHandler(persist_directory, "bench").save_documents(...)
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        store = ChunkEmbeddingStore(os.path.join(directory, "chunks.sqlite3"))
+        EmbeddingModelRegistry.use_chunk_embedding_store(store)
+        try:
+            yield store
+        finally:
+            EmbeddingModelRegistry.use_chunk_embedding_store(None)
+            store.close()
@@ -0,0 +1,97 @@
+import hashlib
+import threading
+import time
+
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from typing import Dict
+
+
+class StubDecisionServer:
+    """
+    Local HTTP/1.1 server serving saved decision pages with ETag/Last-Modified support.
+    Used to exercise the fetch stage without touching the real registry.
+
+        with StubDecisionServer({"/Review/123": html}) as server:
+            page_fetcher.fetch(server.url("/Review/123"))
+    """
+
+    def __init__(self, pages: Dict[str, str], delay: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.pages = {path: html.encode("utf-8") for path, html in pages.items()}
+        self.etags = {path: f'"{hashlib.sha1(body).hexdigest()}"' for path, body in self.pages.items()}
+        self.last_modified = formatdate(time.time(), usegmt=True)
+        self.delay = delay
+        self.counters = {"requests": 0, "not_modified": 0, "connections": 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                stub._count("connections")
+
+            def do_GET(self):
+                stub._count("requests")
+                if stub.delay:
+                    time.sleep(stub.delay)
+
+                body = stub.pages.get(self.path)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                etag = stub.etags[self.path]
+                if self.headers.get("If-None-Match") == etag or \
+                        self.headers.get("If-Modified-Since") == stub.last_modified:
+                    stub._count("not_modified")
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", stub.last_modified)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def url(self, path: str) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-decision-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
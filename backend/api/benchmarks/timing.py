@@ -0,0 +1,57 @@
+import platform
+import subprocess
+import time
+
+import numpy as np
+
+from datetime import datetime, timezone
+
+from config.app_config import AppConfig
+
+from typing import Any, Callable, Dict, List
+
+
+def latency_summary(latencies_ms: List[float], total_seconds: float = None) -> Dict[str, float]:
+    latencies = np.asarray(latencies_ms)
+    total_seconds = total_seconds if total_seconds is not None else latencies.sum() / 1000
+    return {
+        "runs": len(latencies),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        "mean_ms": round(float(latencies.mean()), 3),
+        "qps": round(len(latencies) / total_seconds, 2) if total_seconds else None,
+    }
+
+
+def measure(function: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        call_started = time.perf_counter()
+        function()
+        latencies.append((time.perf_counter() - call_started) * 1000)
+    return latency_summary(latencies, time.perf_counter() - started)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, cwd=AppConfig.BASE_DIR
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_metadata() -> Dict[str, str]:
+    """
+    Describes the run so that result files of different commits can be compared.
+    """
+    return {
+        "commit": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "model": AppConfig.LM_MODEL_NAME,
+        "embedding_backend": AppConfig.EMBEDDING_BACKEND,
+    }
@@ -0,0 +1,34 @@
+import numpy as np
+
+from typing import Iterator, Tuple
+
+
+def synthetic_embeddings(base: np.ndarray, count: int, noise: float = 0.05, seed: int = 0,
+                         block_size: int = 10_000) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Yields (offset, block) of normalized vectors derived from real embeddings with gaussian noise.
+    Large corpora keep the distribution of the model without encoding millions of chunks.
+    """
+    rng = np.random.default_rng(seed)
+    for offset in range(0, count, block_size):
+        size = min(block_size, count - offset)
+        block = base[rng.integers(0, len(base), size)] + rng.normal(0, noise, (size, base.shape[1]))
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        yield offset, block.astype(np.float32)
+
+
+def populate_collection(collection, base: np.ndarray, texts: list[str], count: int, id_prefix: str = "bench",
+                        decisions: int = None, seed: int = 0) -> None:
+    """
+    Fills a Chroma collection with count synthetic chunks grouped into decisions of ~30 chunks.
+    """
+    decisions = decisions or max(1, count // 30)
+    max_batch_size = collection._client.get_max_batch_size()
+    for offset, block in synthetic_embeddings(base, count, seed=seed, block_size=max_batch_size):
+        indexes = range(offset, offset + len(block))
+        collection.add(
+            ids=[f"{id_prefix}_{i}" for i in indexes],
+            embeddings=block,
+            documents=[texts[i % len(texts)] for i in indexes],
+            metadatas=[{"document_id": str(10_000_000 + i % decisions), "decision_number": "bench"} for i in indexes],
+        )
@@ -0,0 +1,99 @@
+import json
+import time
+
+import numpy as np
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks.corpus import generate_corpus
+from celery_tasks.utils import clean_text, extract_metadata, split_text_into_chunks
+from chroma_client.model_registry import create_embedding_model
+from chroma_client.onnx_embeddings import export_quantized_model
+from config.app_config import AppConfig
+
+QUERIES = [
+    "стягнення заборгованості за договором позики",
+    "ст. 625 ЦК три проценти річних",
+    "пропуск строку позовної давності",
+    "апеляційна скарга залишена без задоволення",
+    "розподіл судового збору",
+    "відповідач не з'явився в судове засідання",
+]
+
+
+class Command(BaseCommand):
+    help = "Checks that the ONNX backend agrees with the PyTorch one and compares their throughput and latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--decisions", type=int, default=20, help="Decisions in the sample corpus")
+        parser.add_argument("--min-cosine", type=float, default=0.98,
+                            help="Fail if the mean cosine agreement is lower")
+        parser.add_argument("--top-k", type=int, default=10)
+        parser.add_argument("--output", help="Write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        texts = []
+        for decision_id, raw_text in generate_corpus(options["decisions"]):
+            cleaned_text = clean_text(raw_text)
+            documents = split_text_into_chunks(cleaned_text, decision_id, extract_metadata(cleaned_text))
+            texts.extend(document.page_content for document in documents)
+
+        results = {"texts": len(texts), "queries": len(QUERIES)}
+        vectors = {}
+        query_vectors = {}
+        # The onnx backend only loads an export, the first run writes it
+        export_quantized_model(AppConfig.LM_MODEL_NAME, AppConfig.ONNX_MODEL_DIR)
+        for backend in ("torch", "onnx"):
+            model = create_embedding_model(backend)
+            model.embed_documents(texts[:8])
+
+            started = time.perf_counter()
+            vectors[backend] = np.asarray(model.embed_documents(texts), dtype=np.float32)
+            seconds = time.perf_counter() - started
+
+            latencies = []
+            query_vectors[backend] = []
+            for _ in range(5):
+                for query in QUERIES:
+                    started = time.perf_counter()
+                    query_vectors[backend].append(model.embed_query(query))
+                    latencies.append((time.perf_counter() - started) * 1000)
+            query_vectors[backend] = np.asarray(query_vectors[backend][:len(QUERIES)], dtype=np.float32)
+
+            results[backend] = {
+                "texts_per_second": round(len(texts) / seconds, 1),
+                "query_latency_ms_p50": round(float(np.percentile(latencies, 50)), 2),
+                "query_latency_ms_p95": round(float(np.percentile(latencies, 95)), 2),
+            }
+            del model
+
+        # Vectors are normalized, the dot product is the cosine similarity
+        cosine = (vectors["torch"] * vectors["onnx"]).sum(axis=1)
+        top_k = min(options["top_k"], len(texts))
+        overlaps = []
+        for torch_query, onnx_query in zip(query_vectors["torch"], query_vectors["onnx"]):
+            torch_top = set(np.argsort(-(vectors["torch"] @ torch_query))[:top_k])
+            onnx_top = set(np.argsort(-(vectors["onnx"] @ onnx_query))[:top_k])
+            overlaps.append(len(torch_top & onnx_top) / top_k)
+
+        results["parity"] = {
+            "cosine_mean": round(float(cosine.mean()), 5),
+            "cosine_min": round(float(cosine.min()), 5),
+            f"top{top_k}_overlap": round(float(np.mean(overlaps)), 4),
+        }
+        results["speedup"] = round(results["onnx"]["texts_per_second"] / results["torch"]["texts_per_second"], 2)
+
+        for backend in ("torch", "onnx"):
+            self.stdout.write(
+                f"{backend:>6}: {results[backend]['texts_per_second']} texts/s, query latency "
+                f"p50 {results[backend]['query_latency_ms_p50']} ms, p95 {results[backend]['query_latency_ms_p95']} ms"
+            )
+        self.stdout.write(f"Parity: {results['parity']}, speedup x{results['speedup']}")
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2)
+
+        if results["parity"]["cosine_mean"] < options["min_cosine"]:
+            raise CommandError(f"Mean cosine agreement {results['parity']['cosine_mean']} "
+                               f"is below {options['min_cosine']}")
@@ -0,0 +1,76 @@
+import glob
+import json
+import os
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks.corpus import generate_decision_html
+from celery_tasks.html_extraction import extract_decision_text
+from celery_tasks.utils import extract_text_with_bs4
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "benchmarks", "fixtures")
+
+
+class Command(BaseCommand):
+    help = ("Checks that the streaming lxml extractor returns exactly what BeautifulSoup + clean_text return "
+            "and compares their speed and peak memory.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fixtures", default=FIXTURES_DIR, help="Directory with saved decision pages")
+        parser.add_argument("--large-paragraphs", default="500,2000",
+                            help="Comma separated sizes of generated large decisions, in paragraphs")
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--output", help="Write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        pages = {}
+        for path in sorted(glob.glob(os.path.join(options["fixtures"], "*.html"))):
+            with open(path, encoding="utf-8") as page:
+                pages[os.path.basename(path)] = page.read()
+        for paragraphs in [int(size) for size in options["large_paragraphs"].split(",") if size]:
+            pages[f"generated_{paragraphs}_paragraphs"] = generate_decision_html("130000000", paragraphs)
+
+        results = {}
+        mismatches = []
+        for name, html in pages.items():
+            if extract_text_with_bs4(html) != extract_decision_text(html):
+                mismatches.append(name)
+
+            bs4 = self.measure(extract_text_with_bs4, html, options["repeat"])
+            lxml = self.measure(extract_decision_text, html, options["repeat"])
+            results[name] = {
+                "html_bytes": len(html.encode("utf-8")),
+                "bs4": bs4,
+                "lxml": lxml,
+                "speedup": round(bs4["ms"] / lxml["ms"], 2),
+                "peak_memory_ratio": round(bs4["peak_kib"] / max(lxml["peak_kib"], 1), 2),
+            }
+            self.stdout.write(
+                f"{name:>32}: {results[name]['html_bytes'] // 1024} KiB, "
+                f"bs4 {bs4['ms']} ms / {bs4['peak_kib']} KiB, lxml {lxml['ms']} ms / {lxml['peak_kib']} KiB, "
+                f"x{results[name]['speedup']}"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump({"pages": results, "mismatches": mismatches}, output, indent=2)
+
+        if mismatches:
+            raise CommandError(f"Extractors disagree on: {', '.join(mismatches)}")
+        self.stdout.write("Both extractors return identical text on every page")
+
+    @staticmethod
+    def measure(extractor, html, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            extractor(html)
+        elapsed_ms = (time.perf_counter() - started) * 1000 / repeat
+
+        # Python-level allocations only, which is where the BeautifulSoup tree lives
+        tracemalloc.start()
+        extractor(html)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {"ms": round(elapsed_ms, 3), "peak_kib": peak // 1024}
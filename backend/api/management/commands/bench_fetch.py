@@ -0,0 +1,72 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.benchmarks.corpus import generate_decision_html
+from api.benchmarks.stub_server import StubDecisionServer
+from celery_tasks.page_fetcher import PageFetcher
+
+
+class Command(BaseCommand):
+    help = "Fetches synthetic decision pages from a local stub server: sequentially, concurrently and revalidated."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pages", type=int, default=100)
+        parser.add_argument("--delay", type=float, default=0.05, help="Simulated server latency, seconds")
+        parser.add_argument("--max-connections", type=int, default=None)
+        parser.add_argument("--max-connections-per-host", type=int, default=None)
+        parser.add_argument("--output", help="Write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        pages = {
+            f"/Review/{decision_id}": generate_decision_html(str(decision_id))
+            for decision_id in range(10_000_000, 10_000_000 + options["pages"])
+        }
+        fetcher = PageFetcher(
+            max_connections=options["max_connections"],
+            max_connections_per_host=options["max_connections_per_host"],
+        )
+        results = {}
+
+        with StubDecisionServer(pages, delay=options["delay"]) as server:
+            urls = [server.url(path) for path in pages]
+
+            started = time.perf_counter()
+            for url in urls:
+                fetcher.fetch(url)
+            results["sequential"] = self.summary(len(urls), time.perf_counter() - started)
+            fetcher._validators.clear()
+
+            started = time.perf_counter()
+            fetched = fetcher.fetch_many(urls)
+            results["concurrent"] = self.summary(len(urls), time.perf_counter() - started)
+
+            errors = [page for page in fetched if isinstance(page, BaseException)]
+            if errors:
+                self.stderr.write(f"{len(errors)} pages failed, first error: {errors[0]!r}")
+
+            # Second pass is answered with 304 Not Modified from the stored validators
+            started = time.perf_counter()
+            fetcher.fetch_many(urls)
+            results["revalidated"] = self.summary(len(urls), time.perf_counter() - started)
+
+            results["server"] = dict(server.counters)
+            results["fetcher"] = dict(fetcher.counters)
+
+        fetcher.close()
+
+        for mode in ("sequential", "concurrent", "revalidated"):
+            self.stdout.write(f"{mode:>12}: {results[mode]['pages_per_second']:.1f} pages/s")
+        self.stdout.write(
+            f"Server saw {results['server']['requests']} requests over "
+            f"{results['server']['connections']} connections, {results['server']['not_modified']} answered with 304"
+        )
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2)
+
+    @staticmethod
+    def summary(pages, seconds):
+        return {"seconds": round(seconds, 3), "pages_per_second": round(pages / seconds, 2)}
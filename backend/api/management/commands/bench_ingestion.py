@@ -0,0 +1,94 @@
+import json
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.benchmarks.corpus import generate_corpus
+from api.benchmarks.stores import temporary_chunk_embedding_store
+from celery_tasks.utils import clean_text, extract_metadata, split_text_into_chunks
+from chroma_client.chroma_storage import ChromaDBHandler
+
+
+class Command(BaseCommand):
+    help = "Compares decisions/second of the per-decision ingestion path with the batched one."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--decisions", type=int, default=64)
+        parser.add_argument("--batch-size", type=int, default=16)
+        parser.add_argument("--paragraphs", type=int, default=12)
+        parser.add_argument("--output", help="Write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        corpus = generate_corpus(options["decisions"], options["paragraphs"])
+        batch_size = options["batch_size"]
+
+        with tempfile.TemporaryDirectory() as persist_directory:
+            # Load the model before timing anything
+            ChromaDBHandler(persist_directory, "warm_up").load_or_create_db()
+
+            # Each mode embeds every chunk: neither gets hits from the vectors stored by the other
+            with temporary_chunk_embedding_store():
+                single = self.run_single(corpus, persist_directory)
+            with temporary_chunk_embedding_store():
+                batched = self.run_batched(corpus, persist_directory, batch_size)
+
+        results = {
+            "decisions": len(corpus),
+            "batch_size": batch_size,
+            "single": single,
+            "batched": batched,
+            "speedup": round(batched["decisions_per_second"] / single["decisions_per_second"], 2),
+        }
+        for mode in ("single", "batched"):
+            self.stdout.write(
+                f"{mode:>8}: {results[mode]['decisions_per_second']:.2f} decisions/s, "
+                f"{results[mode]['chunks']} chunks in {results[mode]['seconds']:.2f}s"
+            )
+        self.stdout.write(f"Speedup: x{results['speedup']}")
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2)
+
+    @staticmethod
+    def prepare(decision_id, raw_text):
+        cleaned_text = clean_text(raw_text)
+        documents = split_text_into_chunks(cleaned_text, decision_id, extract_metadata(cleaned_text))
+        ids = [f"{decision_id}_chunk_{i}" for i in range(len(documents))]
+        return documents, ids
+
+    def run_single(self, corpus, persist_directory):
+        chunks = 0
+        started = time.perf_counter()
+        for decision_id, raw_text in corpus:
+            documents, ids = self.prepare(decision_id, raw_text)
+            handler = ChromaDBHandler(persist_directory, "bench_single")
+            handler.save_documents(documents, ids, decision_id)
+            handler.close()
+            chunks += len(documents)
+        return self.summary(len(corpus), chunks, time.perf_counter() - started)
+
+    def run_batched(self, corpus, persist_directory, batch_size):
+        chunks = 0
+        started = time.perf_counter()
+        for start in range(0, len(corpus), batch_size):
+            documents = []
+            ids = []
+            for decision_id, raw_text in corpus[start:start + batch_size]:
+                decision_documents, decision_ids = self.prepare(decision_id, raw_text)
+                documents.extend(decision_documents)
+                ids.extend(decision_ids)
+            handler = ChromaDBHandler(persist_directory, "bench_batched")
+            handler.save_documents(documents, ids, f"batch {start // batch_size}")
+            handler.close()
+            chunks += len(documents)
+        return self.summary(len(corpus), chunks, time.perf_counter() - started)
+
+    @staticmethod
+    def summary(decisions, chunks, seconds):
+        return {
+            "chunks": chunks,
+            "seconds": round(seconds, 3),
+            "decisions_per_second": round(decisions / seconds, 2),
+        }
@@ -0,0 +1,121 @@
+import json
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.benchmarks.corpus import generate_decision_html
+from api.benchmarks.stores import temporary_chunk_embedding_store
+from api.benchmarks.stub_server import StubDecisionServer
+from api.benchmarks.timing import run_metadata
+from celery_tasks.page_fetcher import PageFetcher
+from celery_tasks.pipeline import IngestionPipeline
+from celery_tasks.utils import extract_metadata, extract_text_from_html, split_text_into_chunks
+from chroma_client.chroma_storage import ChromaDBHandler
+from config.app_config import AppConfig
+
+
+class Command(BaseCommand):
+    help = ("Ingests synthetic decision pages from a local stub server one stage after another, as a batch "
+            "and through the streaming pipeline, and reports throughput with per-stage utilization and queue depth.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pages", type=int, default=100)
+        parser.add_argument("--paragraphs", type=int, default=12, help="Paragraphs per synthetic decision")
+        parser.add_argument("--delay", type=float, default=0.05, help="Simulated server latency, seconds")
+        parser.add_argument("--fetch-workers", type=int, default=None)
+        parser.add_argument("--parse-workers", type=int, default=None)
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--output", help="Write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        pages = {
+            f"/Review/{decision_id}": generate_decision_html(str(decision_id), options["paragraphs"])
+            for decision_id in range(10_000_000, 10_000_000 + options["pages"])
+        }
+        results = {"meta": run_metadata(), "parameters": {
+            "pages": options["pages"], "delay": options["delay"],
+            "batch_size": options["batch_size"] or AppConfig.EMBEDDING_BATCH_SIZE,
+        }}
+
+        with StubDecisionServer(pages, delay=options["delay"]) as server, \
+                tempfile.TemporaryDirectory() as persist_directory:
+            items = [(server.url(path), path.rsplit("/", 1)[1]) for path in pages]
+
+            for mode in ("sequential", "batch", "pipeline"):
+                # Every mode starts with a cold validator cache, an empty collection and an empty chunk
+                # embedding store, so no mode gets hits from the vectors stored by an earlier one
+                with temporary_chunk_embedding_store():
+                    fetcher = PageFetcher()
+                    handler = ChromaDBHandler(persist_directory, f"bench_pipeline_{mode}")
+                    handler.load_or_create_db()
+                    results[mode] = getattr(self, mode)(items, fetcher, handler, options)
+                    fetcher.close()
+                    handler.close()
+
+        for mode in ("sequential", "batch", "pipeline"):
+            self.stdout.write(
+                f"{mode:>12}: {results[mode]['decisions_per_second']:.2f} decisions/s, "
+                f"{results[mode]['chunks']} chunks in {results[mode]['wall_seconds']:.2f} s"
+            )
+        for name, stage in results["pipeline"]["stages"].items():
+            self.stdout.write(
+                f"{name:>12}: {stage['workers']} workers, {stage['items_per_second']} items/s, "
+                f"utilization {stage['utilization']}, queue depth mean {stage['queue_depth_mean']} "
+                f"(max {stage['queue_depth_max']})"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2)
+
+    @staticmethod
+    def summary(decisions: int, chunks: int, seconds: float) -> dict:
+        return {
+            "wall_seconds": round(seconds, 3),
+            "decisions": decisions,
+            "chunks": chunks,
+            "decisions_per_second": round(decisions / seconds, 2),
+        }
+
+    def sequential(self, items, fetcher: PageFetcher, handler: ChromaDBHandler, options) -> dict:
+        """
+        One decision at a time, each stage waiting for the previous one, as decision_processing_task does.
+        """
+        chunks = 0
+        started = time.perf_counter()
+        for url, decision_id in items:
+            cleaned_text = extract_text_from_html(fetcher.fetch(url))
+            documents = split_text_into_chunks(cleaned_text, decision_id, extract_metadata(cleaned_text))
+            handler.save_documents(documents, [f"{decision_id}_chunk_{i}" for i in range(len(documents))], decision_id)
+            chunks += len(documents)
+        return self.summary(len(items), chunks, time.perf_counter() - started)
+
+    def batch(self, items, fetcher: PageFetcher, handler: ChromaDBHandler, options) -> dict:
+        """
+        Concurrent fetch of all pages, then parsing, then one embedding and write pass, as the batch task does.
+        """
+        started = time.perf_counter()
+        documents = []
+        ids = []
+        for (url, decision_id), html in zip(items, fetcher.fetch_many([url for url, _ in items])):
+            cleaned_text = extract_text_from_html(html)
+            decision_documents = split_text_into_chunks(cleaned_text, decision_id, extract_metadata(cleaned_text))
+            documents.extend(decision_documents)
+            ids.extend(f"{decision_id}_chunk_{i}" for i in range(len(decision_documents)))
+        handler.save_documents(documents, ids, f"batch of {len(items)} decisions")
+        return self.summary(len(items), len(ids), time.perf_counter() - started)
+
+    def pipeline(self, items, fetcher: PageFetcher, handler: ChromaDBHandler, options) -> dict:
+        pipeline = IngestionPipeline(
+            handler,
+            fetcher.fetch,
+            fetch_workers=options["fetch_workers"],
+            parse_workers=options["parse_workers"],
+            batch_size=options["batch_size"],
+        )
+        pipeline_results = pipeline.run(items)
+        errors = [result for result in pipeline_results if result["status"] != "success"]
+        if errors:
+            self.stderr.write(f"{len(errors)} decisions failed, first error: {errors[0]['error_message']}")
+        return pipeline.stats()
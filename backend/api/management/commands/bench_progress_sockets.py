@@ -0,0 +1,124 @@
+import asyncio
+import json
+import random
+import time
+
+import redis.asyncio as redis
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks.timing import latency_summary, run_metadata
+from web_socket.subscriber import ProgressSubscriber, SocketSendQueue
+
+
+class Command(BaseCommand):
+    help = ("Registers thousands of simulated progress sockets on one shared subscriber, publishes progress "
+            "messages to random users and reports the Redis connection count and the delivery latency.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sockets", type=int, default=5000)
+        parser.add_argument("--messages", type=int, default=20000)
+        parser.add_argument("--rate", type=float, default=2000, help="Published messages per second")
+        parser.add_argument("--send-delay", type=float, default=0.0,
+                            help="Simulated time a socket needs to send one message, seconds")
+        parser.add_argument("--legacy", action="store_true",
+                            help="Also open one pubsub connection per socket, like the old consumer did")
+        parser.add_argument("--output", help="Write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        if not settings.REDIS_URL:
+            raise CommandError("REDIS_URL is not configured")
+        results = {"metadata": run_metadata(), **asyncio.run(self.run(options))}
+        if results["latency"] is None:
+            raise CommandError("No message was delivered")
+
+        self.stdout.write(
+            f"{results['sockets']} sockets: Redis connections +{results['redis_connections_shared']} "
+            f"(shared subscriber)"
+            + (f", +{results['redis_connections_legacy']} (per-socket)" if "redis_connections_legacy" in results else "")
+        )
+        self.stdout.write(
+            f"Delivered {results['delivered']}/{results['published']}, dropped {results['dropped']}, latency "
+            f"p50 {results['latency']['p50_ms']} ms, p95 {results['latency']['p95_ms']} ms, "
+            f"p99 {results['latency']['p99_ms']} ms"
+        )
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2)
+
+    async def run(self, options) -> dict:
+        admin = redis.from_url(settings.REDIS_URL)
+        connections_before = await self.connected_clients(admin)
+
+        latencies = []
+        delivered = asyncio.Event()
+
+        async def send(data: str):
+            message = json.loads(data)
+            if options["send_delay"]:
+                await asyncio.sleep(options["send_delay"])
+            latencies.append((time.time() - message["sent_at"]) * 1000)
+            if len(latencies) >= options["messages"]:
+                delivered.set()
+
+        subscriber = ProgressSubscriber(pattern="bench_progress:*")
+        channels = [f"bench_progress:{i}" for i in range(options["sockets"])]
+        send_queues = []
+        for channel in channels:
+            send_queue = SocketSendQueue(send)
+            subscriber.register(channel, send_queue)
+            send_queues.append(send_queue)
+        await asyncio.wait_for(subscriber.ready.wait(), timeout=10)
+        results = {
+            "sockets": len(channels),
+            "redis_connections_shared": await self.connected_clients(admin) - connections_before,
+        }
+
+        interval = 1 / options["rate"]
+        started = time.perf_counter()
+        for i in range(options["messages"]):
+            message = {"type": "progress", "decision_id": str(i), "status": "started", "sent_at": time.time()}
+            await admin.publish(random.choice(channels), json.dumps(message))
+            # Keeps the publishing rate, the subscriber runs while the publisher sleeps
+            await asyncio.sleep(max(0.0, started + (i + 1) * interval - time.perf_counter()))
+
+        dropped = 0
+        try:
+            await asyncio.wait_for(delivered.wait(), timeout=30)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            for channel, send_queue in zip(channels, send_queues):
+                subscriber.unregister(channel, send_queue)
+                send_queue.close()
+                dropped += send_queue.dropped
+            subscriber._task.cancel()
+
+        results.update({
+            "published": options["messages"],
+            "delivered": len(latencies),
+            "dropped": dropped,
+            "latency": latency_summary(latencies, time.perf_counter() - started) if latencies else None,
+            "subscriber": subscriber.stats(),
+        })
+
+        if options["legacy"]:
+            clients = []
+            try:
+                for channel in channels:
+                    client = redis.from_url(settings.REDIS_URL)
+                    pubsub = client.pubsub()
+                    await pubsub.subscribe(channel)
+                    clients.append((client, pubsub))
+                results["redis_connections_legacy"] = await self.connected_clients(admin) - connections_before
+            finally:
+                for client, pubsub in clients:
+                    await pubsub.aclose()
+                    await client.aclose()
+
+        await admin.aclose()
+        return results
+
+    @staticmethod
+    async def connected_clients(client) -> int:
+        return int((await client.info("clients"))["connected_clients"])
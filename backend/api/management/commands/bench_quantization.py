@@ -0,0 +1,119 @@
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from django.core.management.base import BaseCommand
+
+from api.benchmarks.corpus import generate_corpus
+from api.benchmarks.timing import latency_summary, run_metadata
+from api.benchmarks.vectors import synthetic_embeddings
+from celery_tasks.utils import clean_text, extract_metadata, split_text_into_chunks
+from chroma_client.exact_index import ExactVectorIndex
+from chroma_client.model_registry import EmbeddingModelRegistry
+
+QUERIES = [
+    "стягнення заборгованості за договором позики",
+    "ст. 625 ЦК три проценти річних",
+    "пропуск строку позовної давності",
+    "апеляційна скарга залишена без задоволення",
+    "розподіл судового збору",
+    "відповідач не з'явився в судове засідання",
+    "інфляційні втрати нараховуються на суму боргу",
+    "обов'язок доказування покладається на сторони",
+]
+
+CHUNKS_PER_DECISION = 30
+
+# (name, dtype, rescore factor); float32 without rescoring is the exact reference
+VARIANTS = [
+    ("float32", "float32", 0),
+    ("float16", "float16", 0),
+    ("float16+rescore", "float16", None),
+    ("int8", "int8", 0),
+    ("int8+rescore", "int8", None),
+]
+
+
+class Command(BaseCommand):
+    help = ("Compares the memory footprint, recall@k and latency of float32, float16 and int8 exact indexes, "
+            "with and without full-precision rescoring.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=200_000, help="Synthetic chunks")
+        parser.add_argument("--queries", type=int, default=200,
+                            help="Query vectors, the real queries plus perturbed corpus vectors")
+        parser.add_argument("--k", type=int, default=100)
+        parser.add_argument("--rescore-factor", type=int, default=None,
+                            help="Candidates per result taken for rescoring (default: EXACT_INDEX_RESCORE_FACTOR)")
+        parser.add_argument("--output", help="Write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        embedding_model = EmbeddingModelRegistry.get_embedding_model()
+        texts = []
+        for decision_id, raw_text in generate_corpus(20):
+            cleaned_text = clean_text(raw_text)
+            documents = split_text_into_chunks(cleaned_text, decision_id, extract_metadata(cleaned_text))
+            texts.extend(document.page_content for document in documents)
+        base = np.asarray(embedding_model.embed_documents(texts), dtype=np.float32)
+        query_vectors = np.asarray(embedding_model.embed_documents(QUERIES), dtype=np.float32)
+        if options["queries"] > len(query_vectors):
+            _, extra = next(synthetic_embeddings(
+                base, options["queries"] - len(query_vectors), noise=0.1, seed=1, block_size=options["queries"]
+            ))
+            query_vectors = np.vstack([query_vectors, extra])
+
+        k = options["k"]
+        results = {"meta": run_metadata(), "parameters": {
+            "size": options["size"], "queries": len(query_vectors), "k": k,
+        }, "variants": {}}
+        reference = None
+        with tempfile.TemporaryDirectory() as directory:
+            for name, dtype, rescore_factor in VARIANTS:
+                if rescore_factor is None:
+                    rescore_factor = options["rescore_factor"]
+                index = ExactVectorIndex(os.path.join(directory, name), dtype, rescore_factor)
+                for offset, block in synthetic_embeddings(base, options["size"]):
+                    indexes = range(offset, offset + len(block))
+                    index.upsert(
+                        [f"{10_000_000 + i // CHUNKS_PER_DECISION}_chunk_{i % CHUNKS_PER_DECISION}" for i in indexes],
+                        block,
+                        [str(10_000_000 + i // CHUNKS_PER_DECISION) for i in indexes],
+                    )
+
+                latencies = []
+                found = []
+                started = time.perf_counter()
+                for query_vector in query_vectors:
+                    call_started = time.perf_counter()
+                    found.append({chunk_id for chunk_id, _ in index.search(query_vector, k)})
+                    latencies.append((time.perf_counter() - call_started) * 1000)
+                search = latency_summary(latencies, time.perf_counter() - started)
+
+                if reference is None:
+                    reference = found
+                recalls = np.asarray([len(expected & ids) / len(expected) for expected, ids in zip(reference, found)])
+                stats = index.stats()
+                reference_bytes = results["variants"]["float32"]["search_bytes"] if results["variants"] \
+                    else stats["search_bytes"]
+
+                results["variants"][name] = {
+                    "search_bytes": stats["search_bytes"],
+                    "rescore_bytes": stats["rescore_bytes"],
+                    "memory_ratio": round(stats["search_bytes"] / reference_bytes, 3),
+                    f"recall@{k}": round(float(recalls.mean()), 4),
+                    "recall_min": round(float(recalls.min()), 4),
+                    "search": search,
+                }
+                self.stdout.write(
+                    f"{name:>16}: {stats['search_bytes'] / 1024 ** 2:.1f} MiB scanned "
+                    f"({results['variants'][name]['memory_ratio']:.0%} of float32), "
+                    f"recall@{k} {results['variants'][name][f'recall@{k}']} (min {recalls.min():.2f}), "
+                    f"p50 {search['p50_ms']} ms, p95 {search['p95_ms']} ms"
+                )
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2, ensure_ascii=False)
@@ -0,0 +1,81 @@
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+
+from api.benchmarks.timing import latency_summary, run_metadata
+from chroma_client.model_registry import EmbeddingModelRegistry
+from chroma_client.query_batcher import QueryMicroBatcher
+
+
+class Command(BaseCommand):
+    help = ("Encodes distinct queries from concurrent callers one by one and through the query micro-batcher, "
+            "from a thread pool (a threaded WSGI server) and from sync views under ASGI, and reports the "
+            "observed batch-size distribution.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--queries", type=int, default=256)
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--max-wait-ms", type=float, default=None)
+        parser.add_argument("--output", help="Write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        # Distinct texts: every query is a cache miss in production, here no cache is involved at all
+        queries = [f"стягнення заборгованості за договором позики № {number}" for number in range(options["queries"])]
+        model = EmbeddingModelRegistry.get_embedding_model()
+        model.embed_query(queries[0])
+
+        results = {"meta": run_metadata(), "parameters": {
+            "queries": options["queries"], "concurrency": options["concurrency"],
+        }}
+        results["unbatched"] = self.run_threads(model.embed_query, queries, options["concurrency"])
+
+        batcher = QueryMicroBatcher(max_wait_ms=options["max_wait_ms"])
+        results["batched_threads"] = {
+            **self.run_threads(batcher.embed, queries, options["concurrency"]),
+            "batcher": batcher.stats(),
+        }
+
+        # Sync views under ASGI run through sync_to_async(thread_sensitive=True): one thread for all of them
+        batcher = QueryMicroBatcher(max_wait_ms=options["max_wait_ms"])
+        results["batched_asgi_sync_view"] = {
+            **asyncio.run(self.run_asgi(batcher.embed, queries, options["concurrency"])),
+            "batcher": batcher.stats(),
+        }
+
+        for mode in ("unbatched", "batched_threads", "batched_asgi_sync_view"):
+            line = f"{mode:>24}: {results[mode]['qps']} queries/s, p95 {results[mode]['p95_ms']} ms"
+            if "batcher" in results[mode]:
+                line += f", batch sizes {results[mode]['batcher']['batch_size']['buckets']}"
+            self.stdout.write(line)
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2)
+
+    @staticmethod
+    def timed(embed, query: str) -> float:
+        started = time.perf_counter()
+        embed(query)
+        return (time.perf_counter() - started) * 1000
+
+    def run_threads(self, embed, queries, concurrency: int) -> dict:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            latencies = list(pool.map(lambda query: self.timed(embed, query), queries))
+        return latency_summary(latencies, time.perf_counter() - started)
+
+    async def run_asgi(self, embed, queries, concurrency: int) -> dict:
+        view = sync_to_async(self.timed, thread_sensitive=True)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def request(query):
+            async with semaphore:
+                return await view(embed, query)
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(request(query) for query in queries))
+        return latency_summary(latencies, time.perf_counter() - started)
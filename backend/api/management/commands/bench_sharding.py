@@ -0,0 +1,108 @@
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+
+from api.benchmarks.corpus import generate_corpus
+from api.benchmarks.timing import measure, run_metadata
+from api.benchmarks.vectors import synthetic_embeddings
+from celery_tasks.utils import clean_text, extract_metadata, split_text_into_chunks
+from chroma_client.chroma_storage import ChromaDBHandler, shard_index
+from chroma_client.model_registry import EmbeddingModelRegistry
+
+QUERIES = [
+    "стягнення заборгованості за договором позики",
+    "ст. 625 ЦК три проценти річних",
+    "пропуск строку позовної давності",
+    "апеляційна скарга залишена без задоволення",
+    "розподіл судового збору",
+    "відповідач не з'явився в судове засідання",
+]
+
+CHUNKS_PER_DECISION = 30
+
+
+class Command(BaseCommand):
+    help = "Compares ingest throughput and query latency of sharded Chroma collections for several shard counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--shards", default="1,2,4,8", help="Comma separated shard counts")
+        parser.add_argument("--size", type=int, default=200_000, help="Synthetic chunks per run")
+        parser.add_argument("--writers", type=int, default=4, help="Concurrent ingesting threads")
+        parser.add_argument("--block-size", type=int, default=1000, help="Chunks per write")
+        parser.add_argument("--repeat", type=int, default=10, help="Passes over the query set")
+        parser.add_argument("--k", type=int, default=100)
+        parser.add_argument("--output", help="Write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        embedding_model = EmbeddingModelRegistry.get_embedding_model()
+        texts = []
+        for decision_id, raw_text in generate_corpus(20):
+            cleaned_text = clean_text(raw_text)
+            documents = split_text_into_chunks(cleaned_text, decision_id, extract_metadata(cleaned_text))
+            texts.extend(document.page_content for document in documents)
+        base = np.asarray(embedding_model.embed_documents(texts), dtype=np.float32)
+        query_vectors = embedding_model.embed_documents(QUERIES)
+
+        results = {"meta": run_metadata(), "parameters": {
+            "size": options["size"], "writers": options["writers"], "k": options["k"],
+        }, "shards": {}}
+        with tempfile.TemporaryDirectory() as persist_directory:
+            for shards in [int(shards) for shards in options["shards"].split(",")]:
+                handler = ChromaDBHandler(persist_directory, f"bench_shards_{shards}", shards=shards)
+                handler.load_or_create_db()
+
+                ingest = self.ingest(handler, base, texts, options)
+                if handler.exact_index is not None:
+                    # The chunks are written straight to the collections, so the exact index is refilled from them
+                    handler.rebuild_exact_index()
+                calls = iter(range(options["repeat"] * len(QUERIES)))
+                search = measure(
+                    lambda: handler.similarity_search_by_vector(
+                        query_vectors[next(calls) % len(QUERIES)], k=options["k"]
+                    ),
+                    options["repeat"] * len(QUERIES),
+                )
+                results["shards"][str(shards)] = {"ingest": ingest, "search": search}
+                self.stdout.write(
+                    f"{shards:>3} shards: ingest {ingest['chunks_per_second']} chunks/s, search "
+                    f"p50 {search['p50_ms']} ms, p95 {search['p95_ms']} ms, {search['qps']} QPS"
+                )
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2, ensure_ascii=False)
+
+    @staticmethod
+    def ingest(handler: ChromaDBHandler, base: np.ndarray, texts: list[str], options) -> dict:
+        """
+        Writes precomputed vectors, so that the encoder does not hide the cost of the index updates.
+        """
+        def write(offset: int, block: np.ndarray):
+            shards = defaultdict(list)
+            for i in range(offset, offset + len(block)):
+                decision_id = str(10_000_000 + i // CHUNKS_PER_DECISION)
+                shards[shard_index(decision_id, handler.shards) if handler.shards > 1 else 0].append(i)
+            for shard, indexes in shards.items():
+                handler.shard_dbs[shard]._collection.add(
+                    ids=[f"{10_000_000 + i // CHUNKS_PER_DECISION}_chunk_{i % CHUNKS_PER_DECISION}" for i in indexes],
+                    embeddings=block[[i - offset for i in indexes]],
+                    documents=[texts[i % len(texts)] for i in indexes],
+                    metadatas=[{"document_id": str(10_000_000 + i // CHUNKS_PER_DECISION)} for i in indexes],
+                )
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["writers"]) as writers:
+            futures = [
+                writers.submit(write, offset, block)
+                for offset, block in synthetic_embeddings(base, options["size"], block_size=options["block_size"])
+            ]
+            for future in futures:
+                future.result()
+        seconds = time.perf_counter() - started
+        return {"seconds": round(seconds, 2), "chunks_per_second": round(options["size"] / seconds, 1)}
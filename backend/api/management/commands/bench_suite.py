@@ -0,0 +1,150 @@
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from django.core.management.base import BaseCommand
+
+from api.benchmarks.corpus import generate_corpus
+from api.benchmarks.stores import temporary_chunk_embedding_store
+from api.benchmarks.timing import latency_summary, measure, run_metadata
+from api.benchmarks.vectors import populate_collection
+from celery_tasks.utils import clean_text, extract_metadata, split_text_into_chunks
+from chroma_client.chroma_storage import ChromaDBHandler
+from chroma_client.model_registry import EmbeddingModelRegistry
+from config.app_config import AppConfig
+
+QUERIES = [
+    "стягнення заборгованості за договором позики",
+    "ст. 625 ЦК три проценти річних",
+    "пропуск строку позовної давності",
+    "апеляційна скарга залишена без задоволення",
+    "розподіл судового збору",
+    "відповідач не з'явився в судове засідання",
+    "інфляційні втрати нараховуються на суму боргу",
+    "обов'язок доказування покладається на сторони",
+]
+
+
+class Command(BaseCommand):
+    help = ("Times the ingestion stages and the search methods (HNSW and exact index separately) on a synthetic "
+            "corpus and writes machine-readable JSON for comparing commits.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--decisions", type=int, default=50, help="Decisions used to time ingestion stages")
+        parser.add_argument("--sizes", default="1000,10000,100000",
+                            help="Comma separated corpus sizes (chunks) for the search benchmark, up to 1000000")
+        parser.add_argument("--repeat", type=int, default=5, help="Passes over the query set per method")
+        parser.add_argument("--k", type=int, default=100)
+        parser.add_argument("--output", default="bench_results.json")
+
+    def handle(self, *args, **options):
+        results = {"meta": run_metadata(), "parameters": {
+            "decisions": options["decisions"], "repeat": options["repeat"], "k": options["k"],
+        }}
+
+        with tempfile.TemporaryDirectory() as persist_directory:
+            # save_documents embeds through an empty store, not through vectors kept from earlier runs
+            with temporary_chunk_embedding_store():
+                results["stages"], texts, vectors = self.bench_stages(options["decisions"], persist_directory)
+            results["search"] = {}
+            for size in [int(size) for size in options["sizes"].split(",")]:
+                results["search"][str(size)] = self.bench_search(
+                    persist_directory, vectors, texts, size, options["k"], options["repeat"]
+                )
+
+        with open(options["output"], "w") as output:
+            json.dump(results, output, indent=2, ensure_ascii=False)
+        self.stdout.write(f"Results written to {options['output']}")
+
+    def bench_stages(self, decisions, persist_directory):
+        corpus = generate_corpus(decisions)
+        embedding_model = EmbeddingModelRegistry.get_embedding_model()
+        timings = {"clean_text": [], "extract_metadata": [], "split_text_into_chunks": [],
+                   "embedding": [], "save_documents": []}
+        texts = []
+        vectors = []
+        handler = ChromaDBHandler(persist_directory, "bench_stages")
+        handler.load_or_create_db()
+
+        def timed(stage, function, *args):
+            started = time.perf_counter()
+            value = function(*args)
+            timings[stage].append((time.perf_counter() - started) * 1000)
+            return value
+
+        for decision_id, raw_text in corpus:
+            cleaned_text = timed("clean_text", clean_text, raw_text)
+            metadata = timed("extract_metadata", extract_metadata, cleaned_text)
+            documents = timed("split_text_into_chunks", split_text_into_chunks, cleaned_text, decision_id, metadata)
+            chunk_texts = [document.page_content for document in documents]
+            # The raw encoder, without the chunk embedding store
+            vectors.extend(timed("embedding", embedding_model.embed_documents, chunk_texts))
+            ids = [f"{decision_id}_chunk_{i}" for i in range(len(documents))]
+            timed("save_documents", handler.save_documents, documents, ids, decision_id)
+            texts.extend(chunk_texts)
+
+        stages = {}
+        for stage, latencies in timings.items():
+            stages[stage] = latency_summary(latencies)
+            self.stdout.write(f"{stage:>24}: p50 {stages[stage]['p50_ms']} ms per decision")
+        stages["chunks"] = len(texts)
+        return stages, texts, np.asarray(vectors, dtype=np.float32)
+
+    def bench_search(self, persist_directory, vectors, texts, size, k, repeat):
+        handler = ChromaDBHandler(persist_directory, f"bench_search_{size}", shards=1)
+        handler.load_or_create_db()
+        started = time.perf_counter()
+        populate_collection(handler.db._collection, vectors, texts, size)
+        if handler.exact_index is not None:
+            # The corpus is written straight to the collection, so the exact index is refilled from it
+            handler.rebuild_exact_index()
+        self.stdout.write(f"Corpus of {size} chunks built in {time.perf_counter() - started:.1f}s")
+
+        # Every search below encodes its query: no hits from the query embedding cache
+        encode = handler.embedding_model.embed_query
+        query_vectors = [encode(query) for query in QUERIES]
+        methods = {
+            "similarity_search_by_vector": lambda i: handler.similarity_search_by_vector(query_vectors[i], k=k),
+            "similarity_search_by_vector_with_relevance_scores":
+                lambda i: handler.similarity_search_by_vector_with_relevance_scores(query_vectors[i], k=k),
+            "encode_and_search": lambda i: handler.similarity_search_by_vector(encode(QUERIES[i]), k=k),
+        }
+
+        # Each engine is timed on its own: HNSW with the exact index detached from the handler, and the exact
+        # index where the handler would use it (EXACT_INDEX_ENABLED and at most EXACT_SEARCH_MAX_CANDIDATES chunks)
+        exact_index = handler.exact_index
+        engines = ["hnsw"]
+        if exact_index is not None and size <= AppConfig.EXACT_SEARCH_MAX_CANDIDATES:
+            engines.append("exact")
+
+        results = {}
+        for engine in engines:
+            handler.exact_index = exact_index if engine == "exact" else None
+            results[engine] = {}
+            for method, search in methods.items():
+                calls = iter(range(repeat * len(QUERIES)))
+                timing = measure(lambda: search(next(calls) % len(QUERIES)), repeat * len(QUERIES))
+                results[engine][method] = timing
+                self.stdout.write(
+                    f"{size:>8} {engine:>5} {method}: p50 {timing['p50_ms']} ms, p95 {timing['p95_ms']} ms, "
+                    f"p99 {timing['p99_ms']} ms, {timing['qps']} QPS"
+                )
+        handler.exact_index = exact_index
+
+        # The production path, with every query vector served by the query embedding cache
+        for query in QUERIES:
+            handler.embed_query(query)
+        calls = iter(range(repeat * len(QUERIES)))
+        results["similarity_search_cached_query"] = measure(
+            lambda: handler.similarity_search(QUERIES[next(calls) % len(QUERIES)], with_score=True, k=k),
+            repeat * len(QUERIES),
+        )
+        timing = results["similarity_search_cached_query"]
+        timing["engine"] = engines[-1]
+        self.stdout.write(
+            f"{size:>8} {timing['engine']:>5} similarity_search (cached query vectors): p50 {timing['p50_ms']} ms, "
+            f"p95 {timing['p95_ms']} ms, p99 {timing['p99_ms']} ms, {timing['qps']} QPS"
+        )
+        return results
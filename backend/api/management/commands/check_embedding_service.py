@@ -0,0 +1,52 @@
+import time
+
+import numpy as np
+
+from django.core.management.base import BaseCommand, CommandError
+
+from chroma_client.embedding_service import RemoteEmbeddings
+from chroma_client.model_registry import create_embedding_model
+from config.app_config import AppConfig
+
+TEXTS = [
+    "стягнення заборгованості за договором позики",
+    "ст. 625 ЦК три проценти річних",
+    "пропуск строку позовної давності",
+    "апеляційна скарга залишена без задоволення",
+]
+
+
+class Command(BaseCommand):
+    help = "Encodes sample texts through a running embedding service and compares them with the in-process model."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--socket", default=None, help="Defaults to AppConfig.EMBEDDING_SERVICE_SOCKET")
+        parser.add_argument("--requests", type=int, default=200, help="Single-query requests for the latency")
+        parser.add_argument("--skip-parity", action="store_true", help="Do not load the model in this process")
+
+    def handle(self, *args, **options):
+        remote = RemoteEmbeddings(options["socket"])
+        try:
+            remote_vectors = np.asarray(remote.embed_documents(TEXTS), dtype=np.float32)
+        except OSError as e:
+            raise CommandError(f"The embedding service at {remote.socket_path} is not reachable: {e}")
+
+        latencies = []
+        for i in range(options["requests"]):
+            started = time.perf_counter()
+            remote.embed_query(TEXTS[i % len(TEXTS)])
+            latencies.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(
+            f"{len(TEXTS)} texts, dimension {remote_vectors.shape[1]}; query latency "
+            f"p50 {np.percentile(latencies, 50):.2f} ms, p95 {np.percentile(latencies, 95):.2f} ms"
+        )
+
+        if options["skip_parity"]:
+            return
+        local_vectors = np.asarray(
+            create_embedding_model(AppConfig.EMBEDDING_SERVICE_BACKEND).embed_documents(TEXTS), dtype=np.float32
+        )
+        cosine = (remote_vectors * local_vectors).sum(axis=1)
+        self.stdout.write(f"Cosine agreement with the in-process model: min {cosine.min():.6f}")
+        if cosine.min() < 0.9999:
+            raise CommandError("The service returns different vectors than the in-process model")
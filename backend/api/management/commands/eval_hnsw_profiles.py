@@ -0,0 +1,171 @@
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks.corpus import generate_corpus
+from api.benchmarks.timing import latency_summary, run_metadata
+from api.benchmarks.vectors import populate_collection, synthetic_embeddings
+from celery_tasks.utils import clean_text, extract_metadata, split_text_into_chunks
+from chroma_client.chroma_storage import ChromaDBHandler
+from chroma_client.model_registry import EmbeddingModelRegistry
+from config.app_config import AppConfig
+
+QUERIES = [
+    "стягнення заборгованості за договором позики",
+    "ст. 625 ЦК три проценти річних",
+    "пропуск строку позовної давності",
+    "апеляційна скарга залишена без задоволення",
+    "розподіл судового збору",
+    "відповідач не з'явився в судове засідання",
+    "інфляційні втрати нараховуються на суму боргу",
+    "обов'язок доказування покладається на сторони",
+]
+
+
+class Command(BaseCommand):
+    help = ("Builds a collection per HNSW profile and reports recall@k against exact brute-force top-k "
+            "together with the query latency.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", default=",".join(AppConfig.HNSW_PROFILES),
+                            help="Comma separated profiles from AppConfig.HNSW_PROFILES")
+        parser.add_argument("--size", type=int, default=100_000, help="Synthetic chunks per collection")
+        parser.add_argument("--queries", type=int, default=200,
+                            help="Query vectors, the real queries plus perturbed corpus vectors")
+        parser.add_argument("--k", type=int, default=100)
+        parser.add_argument("--live", action="store_true",
+                            help="Evaluate the existing collection (its first shard) instead of building synthetic ones")
+        parser.add_argument("--output", help="Write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        profiles = options["profiles"].split(",")
+        unknown = [profile for profile in profiles if profile not in AppConfig.HNSW_PROFILES]
+        if unknown:
+            raise CommandError(f"Unknown HNSW profiles: {', '.join(unknown)}")
+
+        embedding_model = EmbeddingModelRegistry.get_embedding_model()
+        texts = []
+        for decision_id, raw_text in generate_corpus(20):
+            cleaned_text = clean_text(raw_text)
+            documents = split_text_into_chunks(cleaned_text, decision_id, extract_metadata(cleaned_text))
+            texts.extend(document.page_content for document in documents)
+        base = np.asarray(embedding_model.embed_documents(texts), dtype=np.float32)
+        query_vectors = self.query_vectors(embedding_model, base, options["queries"])
+
+        results = {"meta": run_metadata(), "parameters": {
+            "size": options["size"], "queries": len(query_vectors), "k": options["k"], "live": options["live"],
+        }, "profiles": {}}
+
+        if options["live"]:
+            handler = ChromaDBHandler()
+            handler.load_or_create_db()
+            metadata = handler.db._collection.metadata or {}
+            results["profiles"]["live"] = self.evaluate(handler, query_vectors, options["k"])
+            self.report(f"live ({metadata})", results["profiles"]["live"])
+        else:
+            with tempfile.TemporaryDirectory() as persist_directory:
+                for profile in profiles:
+                    handler = ChromaDBHandler(persist_directory, f"eval_hnsw_{profile}", shards=1, hnsw_profile=profile)
+                    handler.load_or_create_db()
+                    started = time.perf_counter()
+                    populate_collection(handler.db._collection, base, texts, options["size"])
+                    build_seconds = time.perf_counter() - started
+
+                    results["profiles"][profile] = {
+                        "parameters": AppConfig.HNSW_PROFILES[profile],
+                        "build_seconds": round(build_seconds, 2),
+                        **self.evaluate(handler, query_vectors, options["k"]),
+                    }
+                    self.report(profile, results["profiles"][profile])
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2, ensure_ascii=False)
+
+    @staticmethod
+    def query_vectors(embedding_model, base: np.ndarray, count: int) -> np.ndarray:
+        """
+        The real queries, topped up with noisier variants of corpus vectors that are not stored as such.
+        """
+        vectors = np.asarray(embedding_model.embed_documents(QUERIES), dtype=np.float32)
+        if count > len(vectors):
+            _, extra = next(synthetic_embeddings(base, count - len(vectors), noise=0.1, seed=1, block_size=count))
+            vectors = np.vstack([vectors, extra])
+        return vectors[:count]
+
+    @staticmethod
+    def stored_embeddings(collection, page_size: int = 10_000):
+        ids = []
+        blocks = []
+        offset = 0
+        while True:
+            page = collection.get(include=["embeddings"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            ids.extend(page["ids"])
+            blocks.append(np.asarray(page["embeddings"], dtype=np.float32))
+            offset += len(page["ids"])
+        return np.asarray(ids), np.vstack(blocks)
+
+    def exact_top_k(self, collection, query_vectors: np.ndarray, k: int, block_size: int = 50_000) -> list[set]:
+        """
+        Cosine top-k of every query with a blocked matrix product over the stored embeddings.
+        """
+        ids, embeddings = self.stored_embeddings(collection)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        queries = query_vectors / np.linalg.norm(query_vectors, axis=1, keepdims=True)
+        k = min(k, len(ids))
+
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        best_indexes = np.empty((len(queries), 0), dtype=np.int64)
+        for offset in range(0, len(embeddings), block_size):
+            block = embeddings[offset:offset + block_size]
+            scores = np.hstack([best_scores, queries @ block.T])
+            indexes = np.hstack([
+                best_indexes, np.broadcast_to(np.arange(offset, offset + len(block)), (len(queries), len(block))),
+            ])
+            if scores.shape[1] > k:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, top, axis=1)
+                indexes = np.take_along_axis(indexes, top, axis=1)
+            best_scores, best_indexes = scores, indexes
+        return [set(ids[row]) for row in best_indexes]
+
+    def evaluate(self, handler: ChromaDBHandler, query_vectors: np.ndarray, k: int) -> dict:
+        collection = handler.db._collection
+        exact = self.exact_top_k(collection, query_vectors, k)
+
+        recalls = []
+        latencies = []
+        started = time.perf_counter()
+        for query_vector, expected in zip(query_vectors, exact):
+            call_started = time.perf_counter()
+            # Same include as the search endpoints, so the latency matches what the API pays
+            found = collection.query(
+                query_embeddings=[query_vector.tolist()], n_results=k,
+                include=["documents", "metadatas", "distances"],
+            )
+            latencies.append((time.perf_counter() - call_started) * 1000)
+            recalls.append(len(expected.intersection(found["ids"][0])) / len(expected))
+        search = latency_summary(latencies, time.perf_counter() - started)
+
+        recalls = np.asarray(recalls)
+        return {
+            "chunks": collection.count(),
+            f"recall@{k}": round(float(recalls.mean()), 4),
+            "recall_p5": round(float(np.percentile(recalls, 5)), 4),
+            "recall_min": round(float(recalls.min()), 4),
+            "search": search,
+        }
+
+    def report(self, name: str, result: dict):
+        recall_key = next(key for key in result if key.startswith("recall@"))
+        search = result["search"]
+        self.stdout.write(
+            f"{name:>10}: {recall_key} {result[recall_key]} (p5 {result['recall_p5']}, min {result['recall_min']}), "
+            f"p50 {search['p50_ms']} ms, p95 {search['p95_ms']} ms, {search['qps']} QPS"
+        )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from chroma_client.onnx_embeddings import export_quantized_model
+from config.app_config import AppConfig
+
+
+class Command(BaseCommand):
+    help = "Exports the embedding model to int8-quantized ONNX for the onnx backend (run once per deployment)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model-dir", default=None, help="Defaults to AppConfig.ONNX_MODEL_DIR")
+        parser.add_argument("--force", action="store_true", help="Export again even if an export exists")
+
+    def handle(self, *args, **options):
+        model_dir = options["model_dir"] or AppConfig.ONNX_MODEL_DIR
+        if export_quantized_model(AppConfig.LM_MODEL_NAME, model_dir, force=options["force"]):
+            self.stdout.write(f"Exported «{AppConfig.LM_MODEL_NAME}» to {model_dir}")
+        else:
+            self.stdout.write(f"{model_dir} already holds an export of «{AppConfig.LM_MODEL_NAME}»")
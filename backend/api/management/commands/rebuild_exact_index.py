@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from chroma_client.chroma_storage import ChromaDBHandler
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the memory-mapped exact index from the embeddings stored in Chroma."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--collection", default=None)
+        parser.add_argument("--page-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        handler = ChromaDBHandler(collection_name=options["collection"])
+        if handler.exact_index is None:
+            raise CommandError("The exact index is disabled (EXACT_INDEX_ENABLED)")
+        handler.rebuild_exact_index(
+            options["page_size"],
+            lambda name, indexed, total: self.stdout.write(f"{name}: indexed {indexed}/{total} chunks"),
+        )
+        self.stdout.write(f"Exact index: {handler.exact_index.stats()}")
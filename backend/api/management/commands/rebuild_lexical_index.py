@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from chroma_client.chroma_storage import ChromaDBHandler
+
+
+class Command(BaseCommand):
+    help = "Indexes the chunks already stored in Chroma into the BM25 lexical index."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--collection", default=None)
+        parser.add_argument("--page-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        handler = ChromaDBHandler(collection_name=options["collection"])
+        handler.load_or_create_db()
+
+        for db in handler.shard_dbs:
+            collection = db._collection
+            indexed = 0
+            total = collection.count()
+            while indexed < total:
+                page = collection.get(include=["documents", "metadatas"], limit=options["page_size"], offset=indexed)
+                if not page["ids"]:
+                    break
+                handler.lexical_index.add_chunks(
+                    page["ids"],
+                    page["documents"],
+                    [(metadata or {}).get("document_id", "unknown") for metadata in page["metadatas"]],
+                )
+                indexed += len(page["ids"])
+                self.stdout.write(f"{collection.name}: indexed {indexed}/{total} chunks")
+
+        self.stdout.write(f"Lexical index: {handler.lexical_index.stats()}")
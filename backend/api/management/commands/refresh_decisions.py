@@ -0,0 +1,56 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import CourtDecision, DecisionStatus
+from api.processor.decision_processor import decision_url
+from celery_tasks.inflight import inflight_decisions
+from celery_tasks.tasks import decision_batch_processing_task
+from config.app_config import AppConfig
+
+# Progress of command runs is published to a channel no browser listens to
+REFRESH_CHANNEL = "refresh_decisions"
+
+
+class Command(BaseCommand):
+    help = ("Fetches decisions again and re-indexes only the ones whose text has changed: "
+            "changed chunks are upserted and chunks the decision no longer produces are deleted.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("decision_ids", nargs="*")
+        parser.add_argument("--all", action="store_true", help="Refresh every processed decision")
+        parser.add_argument("--batch-size", type=int, default=None, help="Defaults to AppConfig.INGEST_BATCH_SIZE")
+        parser.add_argument("--async", action="store_true", dest="run_async",
+                            help="Enqueue the batches to the workers instead of running them here")
+
+    def handle(self, *args, **options):
+        decision_ids = list(dict.fromkeys(options["decision_ids"]))
+        if options["all"]:
+            decision_ids.extend(
+                CourtDecision.objects.filter(status=DecisionStatus.DONE)
+                .exclude(decision_id__in=decision_ids)
+                .values_list("decision_id", flat=True)
+            )
+        if not decision_ids:
+            raise CommandError("Pass decision IDs or --all")
+
+        # Decisions that an upload is processing right now are left to it
+        claimed = inflight_decisions.claim(decision_ids, REFRESH_CHANNEL)
+        items = [(decision_url(decision_id), decision_id) for decision_id in decision_ids if claimed[decision_id]]
+        skipped = len(decision_ids) - len(items)
+        if skipped:
+            self.stdout.write(f"{skipped} decisions are being processed, skipped")
+
+        batch_size = max(options["batch_size"] or AppConfig.INGEST_BATCH_SIZE, 1)
+        statuses = Counter()
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            if options["run_async"]:
+                decision_batch_processing_task.apply_async((batch, REFRESH_CHANNEL), {"refresh": True})
+                statuses["queued"] += len(batch)
+                continue
+            results = decision_batch_processing_task.apply(args=(batch, REFRESH_CHANNEL), kwargs={"refresh": True}).get()
+            statuses.update(result["status"] for result in results)
+            self.stdout.write(f"{min(start + batch_size, len(items))}/{len(items)} decisions: {dict(statuses)}")
+
+        self.stdout.write(f"Refresh finished: {dict(statuses)}")
@@ -0,0 +1,42 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+
+from chroma_client.embedding_service import EmbeddingServer
+from chroma_client.model_registry import create_embedding_model
+from config.app_config import AppConfig
+
+
+class Command(BaseCommand):
+    help = "Loads the embedding model once and serves encode requests over a Unix socket (EMBEDDING_BACKEND=service)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--socket", default=None, help="Defaults to AppConfig.EMBEDDING_SERVICE_SOCKET")
+        parser.add_argument("--backend", default=None, help="Defaults to AppConfig.EMBEDDING_SERVICE_BACKEND")
+
+    def handle(self, *args, **options):
+        socket_path = options["socket"] or AppConfig.EMBEDDING_SERVICE_SOCKET
+        backend = options["backend"] or AppConfig.EMBEDDING_SERVICE_BACKEND
+        if backend == "service":
+            raise CommandError("The embedding service has to run a local backend (torch or onnx)")
+        if backend != AppConfig.EMBEDDING_SERVICE_BACKEND:
+            # The clients key their cached vectors by EMBEDDING_SERVICE_BACKEND
+            self.stderr.write(f"--backend {backend} differs from EMBEDDING_SERVICE_BACKEND="
+                              f"{AppConfig.EMBEDDING_SERVICE_BACKEND}: cached vectors of the clients will not match")
+
+        self.stdout.write(f"Loading «{AppConfig.LM_MODEL_NAME}» with the {backend} backend")
+        server = EmbeddingServer(socket_path, create_embedding_model(backend))
+
+        # serve_forever blocks, shutdown has to come from another thread
+        def stop(signum, frame):
+            threading.Thread(target=server.shutdown).start()
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(f"Embedding service listening on {socket_path}")
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+        self.stdout.write("Embedding service stopped")
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='courtdecision',
+            index=models.Index(fields=['decision_id', 'status'], name='decision_id_status_idx'),
+        ),
+    ]
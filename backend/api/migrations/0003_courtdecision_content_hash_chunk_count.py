@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_courtdecision_decision_id_status_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='courtdecision',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='courtdecision',
+            name='chunk_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -15,7 +15,16 @@ class CourtDecision(models.Model):
         choices=DecisionStatus.choices,
         default=DecisionStatus.ABSENT
     )
+    # SHA-256 of the cleaned text the stored chunks were built from, unchanged decisions are not re-indexed
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+    chunk_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Status lookups for lists of IDs are answered from the index alone
+            models.Index(fields=["decision_id", "status"], name="decision_id_status_idx"),
+        ]
+
     def __str__(self):
         return f"{self.decision_id} - {self.get_status_display()}"
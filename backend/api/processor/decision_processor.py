@@ -1,5 +1,32 @@
 import re
-from celery_tasks.tasks import decision_processing_task
+from celery import current_app
+from api.models import CourtDecision, DecisionStatus
+from celery_tasks.inflight import inflight_decisions
+from celery_tasks.tasks import decision_processing_task, decision_batch_processing_task, decision_pipeline_task
+from config.app_config import AppConfig
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def get_decision_statuses(decision_ids: list[str]) -> dict[str, str]:
+    """
+    Status of every ID ("absent" for unknown ones), resolved from the (decision_id, status) index.
+    """
+    statuses = dict.fromkeys(decision_ids, DecisionStatus.ABSENT.value)
+    ids = list(statuses)
+    # Keeps the IN lists below the bound parameter limits of the database
+    for start in range(0, len(ids), AppConfig.DECISION_STATUS_QUERY_BATCH):
+        statuses.update(
+            CourtDecision.objects
+            .filter(decision_id__in=ids[start:start + AppConfig.DECISION_STATUS_QUERY_BATCH])
+            .values_list("decision_id", "status")
+        )
+    return statuses
+
+
+def decision_url(decision_id: str) -> str:
+    return f""
 
 
 class DecisionProcessor:
@@ -9,15 +36,55 @@ class DecisionProcessor:
         self.urls = []
 
     def extract_ids(self) -> list[str]:
-        self.decision_ids = re.findall(r'^\d{7,9}', self.raw_data, re.MULTILINE)
+        # Repeated IDs are kept once, in the order of their first appearance
+        self.decision_ids = list(dict.fromkeys(re.findall(r'^\d{7,9}', self.raw_data, re.MULTILINE)))
         return self.decision_ids
 
-    def process_all(self, user_channel_id: str) -> list[str]:
-        tasks = []
+    def process_all(self, user_channel_id: str) -> dict[str, str]:
+        """
+        Enqueues the decisions that are neither processed nor already in flight.
+        Returns the status of every ID: "done" for the processed ones, "in_progress" for the ones another
+        submission is processing (their progress is sent to this user as well), "queued" for the enqueued ones.
+        """
+        statuses = get_decision_statuses(self.decision_ids)
+        pending = [decision_id for decision_id in self.decision_ids if statuses[decision_id] != DecisionStatus.DONE]
+        claimed = inflight_decisions.claim(pending, user_channel_id)
+
+        tasks = {}
+        items = []
         for decision_id in self.decision_ids:
-            url = f""
+            if statuses[decision_id] == DecisionStatus.DONE:
+                tasks[decision_id] = DecisionStatus.DONE.value
+                continue
+            if not claimed[decision_id]:
+                tasks[decision_id] = "in_progress"
+                continue
+            url = decision_url(decision_id)
             self.urls.append(url)
-            decision_processing_task.delay(url, decision_id, user_channel_id)
-            tasks.append(decision_id)
+            items.append((url, decision_id))
+            tasks[decision_id] = "queued"
+
+        # All messages go through one producer (one broker connection) instead of one acquisition per task
+        batch_size = AppConfig.INGEST_BATCH_SIZE
+        batch_task = decision_pipeline_task if AppConfig.INGEST_PIPELINE_ENABLED else decision_batch_processing_task
+        dispatched = 0
+        try:
+            with current_app.producer_or_acquire() as producer:
+                if batch_size > 1:
+                    for start in range(0, len(items), batch_size):
+                        batch_task.apply_async(
+                            (items[start:start + batch_size], user_channel_id), producer=producer
+                        )
+                        dispatched = start + batch_size
+                else:
+                    for url, decision_id in items:
+                        decision_processing_task.apply_async((url, decision_id, user_channel_id), producer=producer)
+                        dispatched += 1
+        except Exception:
+            # Nothing will process the decisions that were not enqueued, their locks must not wait for the TTL
+            undispatched = [decision_id for _, decision_id in items[dispatched:]]
+            logger.exception(f"Could not enqueue {len(undispatched)} decisions, releasing their locks")
+            inflight_decisions.release(undispatched)
+            raise
 
         return tasks
@@ -1,3 +1,384 @@
-from django.test import TestCase
+import glob
+import math
+import os
+import random
+import re
+import tempfile
 
-# Create your tests here.
+import numpy as np
+
+from unittest import mock
+from django.test import SimpleTestCase
+
+from celery_tasks.html_extraction import extract_decision_text, iter_decision_text
+from api.benchmarks.corpus import generate_decision_html
+from celery_tasks.utils import (
+    extract_metadata, extract_text_with_bs4, iter_text_chunks, make_text_splitter, split_text_into_chunks,
+)
+from chroma_client.exact_index import ExactVectorIndex
+from chroma_client.lexical_index import LexicalIndex, tokenize
+from config.app_config import AppConfig
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "benchmarks", "fixtures")
+
+
+def read_fixtures() -> dict[str, str]:
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        with open(path, encoding="utf-8") as page:
+            pages[os.path.basename(path)] = page.read()
+    return pages
+
+
+def split_into_pieces(text: str, rng: random.Random, count: int = 30) -> list[str]:
+    cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, count)))
+    return [text[start:end] for start, end in zip([0, *cuts], [*cuts, len(text)])]
+
+
+class HtmlExtractionTests(SimpleTestCase):
+    """
+    The lxml extractor, whole and streamed, must return what BeautifulSoup + clean_text return,
+    except for <nav> subtrees, which only the lxml extractor drops.
+    """
+
+    def assert_same_text(self, name: str, html: str):
+        expected = extract_text_with_bs4(html)
+        with self.subTest(page=name):
+            self.assertEqual(extract_decision_text(html), expected)
+            self.assertEqual("".join(iter_decision_text(html)), expected)
+
+    def test_fixtures(self):
+        pages = read_fixtures()
+        self.assertTrue(pages)
+        for name, html in pages.items():
+            self.assertTrue(extract_text_with_bs4(html))
+            self.assert_same_text(name, html)
+
+    def test_fixtures_without_markers(self):
+        # Without the start and end markers the whole page text is kept
+        for name, html in read_fixtures().items():
+            html = html.replace("Повний доступ", "").replace("Логін: Для помилки:", "")
+            html = re.sub(r"<nav\b.*?</nav>", "", html, flags=re.DOTALL)
+            self.assert_same_text(name, html)
+
+    def test_nav_inside_the_decision_is_dropped(self):
+        page = ("<html><body>\n<a>Повний доступ</a>\n<p>Суд вирішив:</p>\n"
+                "<nav><a href='/'>Пошук</a> <a href='/help'>Допомога</a></nav>\n"
+                "<p>позов задовольнити.</p>\n<form>Логін: Для помилки: Зачекайте, будь ласка...</form>\n</body></html>")
+        self.assertEqual(extract_text_with_bs4(page), "Суд вирішив: Пошук Допомога позов задовольнити.")
+        self.assertEqual(extract_decision_text(page), "Суд вирішив: позов задовольнити.")
+        self.assertEqual("".join(iter_decision_text(page)), "Суд вирішив: позов задовольнити.")
+
+    def test_empty_page(self):
+        self.assertEqual(extract_decision_text(""), extract_text_with_bs4(""))
+        self.assertEqual("".join(iter_decision_text("")), "")
+
+
+class IterTextChunksTests(SimpleTestCase):
+    """
+    The streamed chunks must be those RecursiveCharacterTextSplitter.split_text gives for the whole text.
+    """
+
+    def assert_same_chunks(self, text: str, rng: random.Random):
+        expected = make_text_splitter().split_text(text)
+        for window in (513, 1024, 4096):
+            with self.subTest(window=window, length=len(text)):
+                self.assertEqual(list(iter_text_chunks(split_into_pieces(text, rng), window)), expected)
+
+    def test_words(self):
+        rng = random.Random(1)
+        words = ["суд", "позов", "боргу", "ст. 625 ЦК", "910/12345/23", "відповідач"]
+        for _ in range(20):
+            self.assert_same_chunks(" ".join(rng.choice(words) for _ in range(rng.randint(1, 2000))), rng)
+
+    def test_repeated_sentence(self):
+        rng = random.Random(2)
+        sentence = "Суд вважає, що позовні вимоги є обґрунтованими та підлягають задоволенню."
+        for repeats in (1, 5, 12, 40, 200):
+            self.assert_same_chunks(" ".join([sentence] * repeats), rng)
+
+    def test_repeated_sentences_inserted(self):
+        rng = random.Random(3)
+        for _ in range(20):
+            sentences = [
+                " ".join(rng.choice(["один", "два", "три", "чотири"]) for _ in range(rng.randint(2, 9))) + "."
+                for _ in range(60)
+            ]
+            position = rng.randrange(len(sentences))
+            sentences[position:position] = [sentences[position]] * rng.randint(6, 12)
+            self.assert_same_chunks(" ".join(sentences), rng)
+
+    def test_short_period_repetition(self):
+        rng = random.Random(4)
+        for _ in range(20):
+            self.assert_same_chunks(" ".join(rng.choice(["а", "а", "бв"]) for _ in range(rng.randint(100, 3000))), rng)
+
+    def test_words_longer_than_a_chunk_and_line_breaks(self):
+        rng = random.Random(5)
+        for _ in range(20):
+            tokens = [
+                "x" * rng.randint(400, 1500) if rng.random() < 0.05 else rng.choice(["а", "бв", "где"])
+                for _ in range(rng.randint(1, 600))
+            ]
+            separators = [" "] * 20 + ["\n", "\n\n"]
+            self.assert_same_chunks("".join(token + rng.choice(separators) for token in tokens), rng)
+
+    def test_separators_appearing_later(self):
+        rng = random.Random(6)
+        for _ in range(20):
+            parts = [
+                "".join(rng.choice(["а", "бв", "где"]) + rng.choice(separators) for _ in range(rng.randint(0, 800)))
+                for separators in ([" "], [" ", " ", "\n"], [" ", "\n", "\n\n"], ["", "", " "])
+            ]
+            rng.shuffle(parts)
+            self.assert_same_chunks("".join(parts), rng)
+
+    def test_decision_pages(self):
+        # The pipeline path: pieces of the streamed page text against the chunks of the whole-page path
+        pages = {**read_fixtures(), "generated": generate_decision_html("130000000", 300)}
+        for name, html in pages.items():
+            text = extract_decision_text(html)
+            expected = [
+                document.page_content for document in split_text_into_chunks(text, "1", extract_metadata(text))
+            ]
+            for window in (1024, AppConfig.STREAM_SPLIT_WINDOW):
+                with self.subTest(page=name, window=window):
+                    self.assertEqual(list(iter_text_chunks(iter_decision_text(html), window)), expected)
+
+    def test_empty_text(self):
+        self.assertEqual(list(iter_text_chunks([])), [])
+        self.assertEqual(list(iter_text_chunks(["", " "])), make_text_splitter().split_text(" "))
+
+
+class ExactVectorIndexTests(SimpleTestCase):
+    """
+    Searches of the exact index must agree with a brute-force scan of the chunks that are live after
+    a sequence of inserts, overwrites and deletes (with growth, compaction and several search blocks).
+    """
+    dimension = 32
+
+    def setUp(self):
+        self.rng = np.random.default_rng(7)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        patcher = mock.patch.multiple(AppConfig, EXACT_INDEX_INITIAL_ROWS=64, EXACT_INDEX_BLOCK_ROWS=128)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def build(self, dtype: str, rescore_factor: int = 4) -> tuple[ExactVectorIndex, dict]:
+        index = ExactVectorIndex(f"{self.directory}/{dtype}-{rescore_factor}", dtype, rescore_factor)
+        chunks = {}
+
+        def upsert(chunk_ids):
+            vectors = self.rng.standard_normal((len(chunk_ids), self.dimension)).astype(np.float32)
+            document_ids = [f"{int(chunk_id.split('_')[0]) % 40}" for chunk_id in chunk_ids]
+            index.upsert(chunk_ids, vectors, document_ids)
+            chunks.update(zip(chunk_ids, zip(vectors, document_ids)))
+
+        upsert([f"{i}_chunk" for i in range(300)])
+        upsert([f"{i}_chunk" for i in range(300, 700)])
+        # Overwrites of existing rows together with new ones
+        upsert([f"{i}_chunk" for i in self.rng.choice(700, 150, replace=False)] + [f"{i}_chunk" for i in range(700, 750)])
+        deleted = [f"{i}_chunk" for i in self.rng.choice(750, 250, replace=False)]
+        index.delete(deleted + ["missing_chunk"])
+        for chunk_id in deleted:
+            del chunks[chunk_id]
+        upsert([f"{i}_chunk" for i in range(750, 800)] + deleted[:20])
+        return index, chunks
+
+    @staticmethod
+    def brute_force(chunks: dict, query: np.ndarray, k: int, document_ids: list = None) -> list[tuple[str, float]]:
+        query = query / np.linalg.norm(query)
+        scored = [
+            (chunk_id, float(vector @ query / np.linalg.norm(vector)))
+            for chunk_id, (vector, document_id) in chunks.items()
+            if document_ids is None or document_id in document_ids
+        ]
+        return sorted(scored, key=lambda item: -item[1])[:k]
+
+    def assert_matches(self, index: ExactVectorIndex, chunks: dict, rescore: bool, min_recall: float,
+                       score_tolerance: float):
+        """
+        With min_recall 1.0 the results must be the brute-force ones in the same order, otherwise the mean recall
+        over all queries must reach min_recall. Every returned score must be close to the exact one.
+        """
+        self.assertEqual(index.count(), len(chunks))
+        recalls = []
+        for _ in range(20):
+            query = self.rng.standard_normal(self.dimension).astype(np.float32)
+            exact_scores = dict(self.brute_force(chunks, query, len(chunks)))
+            for k, document_ids in ((10, None), (1, None), (5, ["3", "17"])):
+                expected = [chunk_id for chunk_id, _ in self.brute_force(chunks, query, k, document_ids)]
+                found = index.search(query.tolist(), k, document_ids=document_ids, rescore=rescore)
+                with self.subTest(k=k, document_ids=document_ids):
+                    self.assertEqual(len(found), len(expected))
+                    if min_recall == 1.0:
+                        self.assertEqual([chunk_id for chunk_id, _ in found], expected)
+                    for chunk_id, score in found:
+                        self.assertAlmostEqual(score, exact_scores[chunk_id], delta=score_tolerance)
+                recalls.append(len(set(expected) & {chunk_id for chunk_id, _ in found}) / len(expected))
+        self.assertGreaterEqual(sum(recalls) / len(recalls), min_recall)
+
+    def test_float32(self):
+        index, chunks = self.build("float32")
+        self.assertEqual(index.stats()["rescore_bytes"], 0)
+        self.assert_matches(index, chunks, rescore=True, min_recall=1.0, score_tolerance=1e-5)
+
+    def test_float16(self):
+        index, chunks = self.build("float16")
+        self.assert_matches(index, chunks, rescore=True, min_recall=1.0, score_tolerance=1e-5)
+        self.assert_matches(index, chunks, rescore=False, min_recall=0.95, score_tolerance=2e-3)
+
+    def test_int8(self):
+        index, chunks = self.build("int8")
+        self.assert_matches(index, chunks, rescore=True, min_recall=1.0, score_tolerance=1e-5)
+        self.assert_matches(index, chunks, rescore=False, min_recall=0.9, score_tolerance=3e-2)
+
+    def test_int8_without_full_copy(self):
+        index, chunks = self.build("int8", rescore_factor=0)
+        self.assertEqual(index.stats()["rescore_bytes"], 0)
+        self.assert_matches(index, chunks, rescore=True, min_recall=0.9, score_tolerance=3e-2)
+
+    def test_compaction_keeps_live_rows(self):
+        index, chunks = self.build("float32")
+        index.delete(list(chunks)[:400])
+        for chunk_id in list(chunks)[:400]:
+            del chunks[chunk_id]
+        self.assertEqual(index.stats()["deleted"], 0)
+        self.assert_matches(index, chunks, rescore=True, min_recall=1.0, score_tolerance=1e-5)
+
+    def test_empty_and_limited_searches(self):
+        index = ExactVectorIndex(f"{self.directory}/empty", "float32")
+        query = self.rng.standard_normal(self.dimension).tolist()
+        self.assertIsNone(index.version())
+        self.assertIsNone(index.search(query, 10))
+        index.upsert(["1_chunk"], [query], ["1"])
+        self.assertIsNotNone(index.version())
+        self.assertEqual(index.search(query, 0), [])
+        self.assertEqual([chunk_id for chunk_id, _ in index.search(query, 10)], ["1_chunk"])
+        self.assertIsNone(index.search(query, 10, max_candidates=0))
+        index.delete(["1_chunk"])
+        self.assertEqual(index.search(query, 10), [])
+        index.clear()
+        self.assertIsNone(index.search(query, 10))
+
+
+class LexicalIndexTests(SimpleTestCase):
+    """
+    BM25 scores and ranking of the lexical index, checked against a direct computation over the live chunks.
+    """
+    vocabulary = ["суд", "позов", "борг", "позика", "договір", "стягнення", "апеляція", "скарга", "рішення",
+                  "відповідач", "позивач", "штраф", "пеня", "строк", "давність", "збір"]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.index = LexicalIndex(f"{directory.name}/lexical.sqlite3")
+
+    @staticmethod
+    def reference(chunks: dict, query: str, k: int, k1: float = 1.5, b: float = 0.75) -> list[tuple[str, float]]:
+        documents = {chunk_id: tokenize(text) for chunk_id, text in chunks.items()}
+        average_length = sum(map(len, documents.values())) / len(documents)
+        terms = list(dict.fromkeys(tokenize(query)))
+        frequencies = {term: sum(term in tokens for tokens in documents.values()) for term in terms}
+        selective = [term for term in terms if 0 < frequencies[term] <= AppConfig.LEXICAL_MAX_DF_RATIO * len(chunks)]
+        terms = selective or [term for term in terms if frequencies[term]]
+        scores = {}
+        for chunk_id, tokens in documents.items():
+            score = 0.0
+            for term in terms:
+                tf = tokens.count(term)
+                if tf:
+                    idf = math.log(1 + (len(documents) - frequencies[term] + 0.5) / (frequencies[term] + 0.5))
+                    score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(tokens) / average_length))
+            if terms and any(term in tokens for term in terms):
+                scores[chunk_id] = score
+        return sorted(scores.items(), key=lambda item: -item[1])[:k]
+
+    def assert_ranking(self, chunks: dict, query: str, k: int = 10):
+        expected = self.reference(chunks, query, k)
+        exact_scores = dict(self.reference(chunks, query, len(chunks)))
+        found = self.index.search(query, k)
+        with self.subTest(query=query, k=k):
+            self.assertEqual(len(found), len(expected))
+            # Compared by score: chunks with equal scores may come in any order
+            for (chunk_id, score), (_, expected_score) in zip(found, expected):
+                self.assertAlmostEqual(score, expected_score, places=9)
+                self.assertAlmostEqual(score, exact_scores[chunk_id], places=9)
+
+    def test_matches_reference_after_replacements_and_deletes(self):
+        rng = random.Random(11)
+        chunks = {}
+
+        def add(chunk_ids):
+            texts = [
+                " ".join(rng.choice(self.vocabulary[:rng.randint(3, len(self.vocabulary))])
+                         for _ in range(rng.randint(1, 40)))
+                for _ in chunk_ids
+            ]
+            self.index.add_chunks(chunk_ids, texts, [chunk_id.split("_")[0] for chunk_id in chunk_ids])
+            chunks.update(zip(chunk_ids, texts))
+
+        add([f"{i}_chunk_0" for i in range(150)])
+        add([f"{i}_chunk_0" for i in rng.sample(range(150), 40)] + [f"{i}_chunk_1" for i in range(50)])
+        deleted = rng.sample(sorted(chunks), 60)
+        self.index.delete_chunks(deleted + ["missing_chunk_0"])
+        for chunk_id in deleted:
+            del chunks[chunk_id]
+
+        self.assertEqual(self.index.stats(), {
+            "chunks": len(chunks), "tokens": sum(len(tokenize(text)) for text in chunks.values()),
+        })
+        for _ in range(40):
+            self.assert_ranking(chunks, " ".join(rng.sample(self.vocabulary, rng.randint(1, 4))), rng.choice([1, 5, 20]))
+
+    def test_rarer_terms_and_shorter_chunks_rank_higher(self):
+        chunks = {
+            "1_chunk_0": "суд стягнення пеня",
+            "2_chunk_0": "суд стягнення борг",
+            "3_chunk_0": "суд стягнення борг рішення рішення рішення рішення рішення рішення",
+            "4_chunk_0": "суд рішення",
+            "5_chunk_0": "суд рішення скарга",
+        }
+        self.index.add_chunks(list(chunks), list(chunks.values()), [chunk_id[0] for chunk_id in chunks])
+        # "пеня" is in one chunk, "борг" in two
+        self.assertEqual(self.index.search("пеня борг", 3)[0][0], "1_chunk_0")
+        # Same term frequency, the shorter chunk wins
+        self.assertEqual([chunk_id for chunk_id, _ in self.index.search("борг", 2)], ["2_chunk_0", "3_chunk_0"])
+        self.assert_ranking(chunks, "пеня борг")
+        self.assert_ranking(chunks, "Борг, РІШЕННЯ!")
+
+    def test_common_terms_are_ignored_unless_nothing_else_matches(self):
+        chunks = {f"{i}_chunk_0": "суд " * (i + 1) + ("позика" if i == 3 else "") for i in range(6)}
+        self.index.add_chunks(list(chunks), list(chunks.values()), [str(i) for i in range(6)])
+        # "суд" is in every chunk: only "позика" ranks
+        self.assertEqual([chunk_id for chunk_id, _ in self.index.search("суд позика")], ["3_chunk_0"])
+        # A query of common terms only still uses them
+        self.assertEqual(len(self.index.search("суд")), 6)
+        self.assert_ranking(chunks, "суд")
+
+    def test_case_numbers_match_whole(self):
+        self.assertEqual(tokenize("Справа № 910/12345/23"), ["справа", "910", "12345", "23", "910/12345/23"])
+        chunks = {
+            "1_chunk_0": "справа 910/12345/23 про стягнення",
+            "2_chunk_0": "910 гривень 12345 23 роки",
+            "3_chunk_0": "справа 910/12345/24",
+            "4_chunk_0": "910 910 12345 12345 23 23",
+            "5_chunk_0": "позов",
+        }
+        self.index.add_chunks(list(chunks), list(chunks.values()), [chunk_id[0] for chunk_id in chunks])
+        self.assertEqual(self.index.search("910/12345/23", 1)[0][0], "1_chunk_0")
+        self.assertEqual(self.index.search("2-123/2020"), [])
+        self.assert_ranking(chunks, "910/12345/23")
+
+    def test_empty_index_and_queries(self):
+        self.assertEqual(self.index.search("суд"), [])
+        self.index.add_chunks(["1_chunk_0"], ["суд позов"], ["1"])
+        self.assertEqual(self.index.search(""), [])
+        self.assertEqual(self.index.search("?!"), [])
+        self.assertEqual(self.index.search("скарга"), [])
+        self.assertEqual(self.index.search("ПОЗОВ", 0), [])
+        self.index.delete_chunks(["1_chunk_0"])
+        self.assertEqual(self.index.search("позов"), [])
+        self.assertEqual(self.index.stats(), {"chunks": 0, "tokens": 0})
@@ -1,7 +1,9 @@
 from django.urls import path
-from api.views import DecisionUploadView, SearchView
+from api.views import DecisionUploadView, DecisionStatusView, SearchView, EmbeddingModelStatsView
 
 urlpatterns = [
     path('decision_upload/', DecisionUploadView.as_view(), name="decision_upload"),
+    path("decision_status/", DecisionStatusView.as_view(), name="decision_status"),
     path("search/", SearchView.as_view(), name="search-view"),
+    path("embedding_model/stats/", EmbeddingModelStatsView.as_view(), name="embedding-model-stats"),
 ]
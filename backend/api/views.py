@@ -1,8 +1,19 @@
+import base64
+import hashlib
+import json
+
+from django.http import StreamingHttpResponse
 from rest_framework import status, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from api.processor.decision_processor import DecisionProcessor
+from api.models import DecisionStatus
+from api.processor.decision_processor import DecisionProcessor, get_decision_statuses
 from chroma_client.chroma_storage import ChromaDBHandler
+from chroma_client.model_registry import EmbeddingModelRegistry
+from chroma_client.query_batcher import query_batcher
+from chroma_client.query_cache import normalize_query, query_embedding_cache
+from chroma_client.search_cache import search_result_cache
+from config.app_config import AppConfig
 from collections import defaultdict
 
 import logging
@@ -24,21 +35,41 @@ class DecisionUploadView(APIView):
             return Response({"error": "No decision IDs found in input_text."}, status=status.HTTP_400_BAD_REQUEST)
 
         user_channel_id = self.request.user.uuid_channel
-        set_tasks = processor.process_all(user_channel_id)
-        uploading_result = {"ids_array": set_tasks, "user_channel_id": user_channel_id}
+        statuses = processor.process_all(user_channel_id)
+        uploading_result = {"ids_array": list(statuses), "statuses": statuses, "user_channel_id": user_channel_id}
 
         return Response(uploading_result, status=status.HTTP_200_OK)
 
 
+class DecisionStatusView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        decision_ids = request.data.get("decision_ids")
+        if not isinstance(decision_ids, list) or not all(isinstance(i, str) for i in decision_ids):
+            return Response({"error": "decision_ids must be a list of strings."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(decision_ids) > AppConfig.DECISION_STATUS_MAX_IDS:
+            return Response({"error": f"At most {AppConfig.DECISION_STATUS_MAX_IDS} IDs per request."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        statuses = get_decision_statuses(decision_ids)
+        done = sum(1 for s in statuses.values() if s == DecisionStatus.DONE)
+        return Response({"statuses": statuses, "done": done, "total": len(statuses)}, status=status.HTTP_200_OK)
+
+
 class SearchView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     valid_search_methods = ("similarity_search",
                             "similarity_search_by_vector",
-                            "similarity_search_by_vector_with_relevance_scores")
+                            "similarity_search_by_vector_with_relevance_scores",
+                            "hybrid",
+                            "decision_search")
+    # "full" - chunks with their whole text, "snippets" - shortened chunk texts, "ids" - decision IDs and scores only
+    valid_fields = ("full", "snippets", "ids")
+    top_k = 100
 
     def post(self, request):
-        results = None
         search_words = request.data.get("search")
         method = request.data.get("method")
 
@@ -47,56 +78,206 @@ class SearchView(APIView):
         if not method or not method.strip() or method not in self.valid_search_methods:
             method = "similarity_search"
 
+        fields = request.data.get("fields") or "full"
+        if fields not in self.valid_fields:
+            return Response({"error": f"fields must be one of: {', '.join(self.valid_fields)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            page_size = self.parse_page_size(request.data.get("page_size"))
+            cursor = self.decode_cursor(request.data.get("cursor"))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
-            db_handler = ChromaDBHandler()
-            db_handler.init_embedding_model()
+            # Every page is cut from the same cached decision list, the search runs once per query
+            result_data, cache_key = search_result_cache.get(search_words, method, self.top_k)
+            result_set = self.result_set_digest(search_words, method, cache_key)
+            offset = 0
+            if cursor:
+                # A cursor only continues the search that issued it, over the same collection version
+                if cursor["results"] != result_set:
+                    return Response(
+                        {"error": "The cursor belongs to another search or its results have changed, "
+                                  "start again from the first page."},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                offset = cursor["offset"]
+            if result_data is None:
+                result_data = self.search(search_words, method)
+                search_result_cache.set(cache_key, result_data)
 
-            # 1 similarity_search
-            if method == "similarity_search":
-                results = db_handler.similarity_search(query=search_words, with_score=True, k=100)
+            response_data = {}
+            if page_size:
+                end = offset + page_size
+                response_data["next_cursor"] = self.encode_cursor(end, result_set) if end < len(result_data) else None
+                response_data["total_decisions"] = len(result_data)
+                result_data = result_data[offset:end]
+            result_data = [self.project(decision, fields) for decision in result_data]
 
-            #2 similarity_search_by_vector
-            if method == "similarity_search_by_vector":
-                results = db_handler.similarity_search_by_vector(search_words)
+            if request.data.get("stream"):
+                return StreamingHttpResponse(
+                    self.stream_json(result_data, response_data), content_type="application/json"
+                )
+            return Response({"search_result": result_data, **response_data}, status=status.HTTP_200_OK)
 
-            # 3 similarity_search_by_vector_with_relevance_scores
-            if method == "similarity_search_by_vector_with_relevance_scores":
-                # 3.1. Get embedding from searching words
-                embedding = db_handler.embedding_model.embed_query(search_words)
-                # 3.2. Search by embedding
-                results = db_handler.similarity_search_by_vector_with_relevance_scores(embedding, k=100)
+        except Exception as e:
+            logger.exception("Search failed")
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @staticmethod
+    def parse_page_size(value) -> int:
+        # No page_size keeps the old behaviour: all decisions in one response
+        if value in (None, ""):
+            return 0
+        try:
+            page_size = int(value)
+        except (TypeError, ValueError):
+            raise ValueError("page_size must be an integer.")
+        if not 1 <= page_size <= AppConfig.SEARCH_MAX_PAGE_SIZE:
+            raise ValueError(f"page_size must be between 1 and {AppConfig.SEARCH_MAX_PAGE_SIZE}.")
+        return page_size
 
-            formatted_results = [
+    @classmethod
+    def result_set_digest(cls, search_words: str, method: str, cache_key: str) -> str:
+        """
+        Identifies the decision list a page is cut from: the query, the method and the cache key, which holds
+        the collection version (None when the results are not cached).
+        """
+        params = json.dumps([normalize_query(search_words), method, cls.top_k, cache_key], ensure_ascii=False)
+        return hashlib.sha1(params.encode()).hexdigest()
+
+    @staticmethod
+    def encode_cursor(offset: int, result_set: str) -> str:
+        return base64.urlsafe_b64encode(json.dumps({"offset": offset, "results": result_set}).encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor) -> dict:
+        if not cursor:
+            return {}
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            offset, result_set = cursor["offset"], cursor["results"]
+        except (AttributeError, TypeError, ValueError, KeyError):
+            raise ValueError("Invalid cursor.")
+        if not isinstance(offset, int) or offset < 0 or not isinstance(result_set, str):
+            raise ValueError("Invalid cursor.")
+        return cursor
+
+    @staticmethod
+    def project(decision: dict, fields: str) -> dict:
+        if fields == "full":
+            return decision
+        if fields == "ids":
+            return {
+                "decision_id": decision["decision_id"],
+                "max_score": decision["max_score"],
+                "scores": [chunk["similarity_score"] for chunk in decision["chunks"]],
+            }
+        # snippets: the beginning of every chunk instead of its whole text
+        return {
+            "decision_id": decision["decision_id"],
+            "max_score": decision["max_score"],
+            "chunks": [
                 {
-                    "text": doc.page_content,
-                    "metadata": doc.metadata,
-                    "similarity_score": score,
+                    "snippet": chunk["text"][:AppConfig.SEARCH_SNIPPET_LENGTH],
+                    "metadata": chunk["metadata"],
+                    "similarity_score": chunk["similarity_score"],
                 }
-                for doc, score in results if score is not None
-            ]
+                for chunk in decision["chunks"]
+            ],
+        }
 
-            grouped_results = defaultdict(list)
-            for r in formatted_results:
-                doc_id = r["metadata"].get("document_id", "unknown")
-                grouped_results[doc_id].append(r)
-
-            top_decisions = sorted(
-                grouped_results.items(),
-                key=lambda item: max(r["similarity_score"] for r in item[1]),
-                reverse=True
-            )
-
-            # Parse the result to a convenient format
-            result_data = []
-            for doc_id, chunks in top_decisions:
-                result_data.append({
+    @staticmethod
+    def stream_json(result_data: list[dict], response_data: dict):
+        """
+        Yields {"search_result": [...], ...} decision by decision.
+        """
+        yield '{"search_result": ['
+        for index, decision in enumerate(result_data):
+            yield ("," if index else "") + json.dumps(decision, ensure_ascii=False)
+        yield "]"
+        for key, value in response_data.items():
+            yield f", {json.dumps(key)}: {json.dumps(value)}"
+        yield "}"
+
+    def search(self, search_words: str, method: str) -> list[dict]:
+        results = None
+        db_handler = ChromaDBHandler()
+
+        # 1 similarity_search
+        if method == "similarity_search":
+            results = db_handler.similarity_search(query=search_words, with_score=True, k=self.top_k)
+
+        #2 similarity_search_by_vector
+        if method == "similarity_search_by_vector":
+            results = db_handler.similarity_search_by_vector(search_words)
+
+        # 3 similarity_search_by_vector_with_relevance_scores
+        if method == "similarity_search_by_vector_with_relevance_scores":
+            # 3.1. Get embedding from searching words
+            embedding = db_handler.embed_query(search_words)
+            # 3.2. Search by embedding
+            results = db_handler.similarity_search_by_vector_with_relevance_scores(embedding, k=self.top_k)
+
+        # 4 hybrid: BM25 + vector search merged with reciprocal rank fusion
+        if method == "hybrid":
+            results = db_handler.hybrid_search(search_words, k=self.top_k)
+
+        # 5 decision_search: the top distinct decisions, grouped by the handler
+        if method == "decision_search":
+            return [
+                {
                     "decision_id": doc_id,
-                    "max_score": max(r["similarity_score"] for r in chunks),
-                    "chunks": chunks
-                })
+                    "max_score": max_score,
+                    "chunks": [
+                        {"text": doc.page_content, "metadata": doc.metadata, "similarity_score": score}
+                        for doc, score in chunks
+                    ],
+                }
+                for doc_id, max_score, chunks in db_handler.decision_search(
+                    search_words, n=AppConfig.DECISION_SEARCH_TOP_N
+                )
+            ]
 
-            return Response({"search_result": result_data}, status=status.HTTP_200_OK)
+        formatted_results = [
+            {
+                "text": doc.page_content,
+                "metadata": doc.metadata,
+                "similarity_score": score,
+            }
+            for doc, score in results if score is not None
+        ]
 
-        except Exception as e:
-            logger.exception("Search failed")
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        grouped_results = defaultdict(list)
+        for r in formatted_results:
+            doc_id = r["metadata"].get("document_id", "unknown")
+            grouped_results[doc_id].append(r)
+
+        max_scores = {
+            doc_id: max(r["similarity_score"] for r in chunks) for doc_id, chunks in grouped_results.items()
+        }
+        top_decisions = sorted(grouped_results.items(), key=lambda item: max_scores[item[0]], reverse=True)
+
+        # Parse the result to a convenient format
+        result_data = []
+        for doc_id, chunks in top_decisions:
+            result_data.append({
+                "decision_id": doc_id,
+                "max_score": max_scores[doc_id],
+                "chunks": chunks
+            })
+
+        return result_data
+
+
+class EmbeddingModelStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        stats = {
+            **EmbeddingModelRegistry.stats(),
+            "query_embedding_cache": query_embedding_cache.stats(),
+            "query_batcher": query_batcher.stats(),
+            "search_result_cache": dict(search_result_cache.counters),
+        }
+        return Response(stats, status=status.HTTP_200_OK)
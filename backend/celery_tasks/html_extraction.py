@@ -0,0 +1,149 @@
+import re
+
+from lxml import etree
+
+from typing import Iterator
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Subtrees whose text never belongs to a decision
+SKIPPED_TAGS = frozenset({"script", "style", "template", "nav"})
+
+DECISION_START_MARKER = "Повний доступ"
+DECISION_END_MARKER = "Логін: Для помилки:"
+PAGE_END_MARKER = "Зачекайте, будь ласка..."
+
+FEED_SIZE = 64 * 1024
+
+WHITESPACE = re.compile(r"\s+")
+
+
+class _TextCollector:
+    """
+    lxml parser target that keeps the text nodes outside of the skipped subtrees, without building a tree.
+    The collected text has its whitespace already collapsed to single spaces.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.skip_depth = 0
+        self.ends_with_space = True
+
+    def start(self, tag, attrib):
+        if self.skip_depth or tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+
+    def end(self, tag):
+        if self.skip_depth:
+            self.skip_depth -= 1
+
+    def data(self, data):
+        if self.skip_depth:
+            return
+        # Whitespace is collapsed node by node, so the whole text never goes through the regex at once
+        data = WHITESPACE.sub(" ", data)
+        if self.ends_with_space and data.startswith(" "):
+            data = data[1:]
+        if data:
+            self.parts.append(data)
+            self.ends_with_space = data.endswith(" ")
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        return "".join(self.parts)
+
+
+def trim_decision_text(text: str) -> str:
+    """
+    Collapses whitespace and cuts the registry page down to the decision body in one pass:
+    everything up to "Повний доступ" and from "Логін: Для помилки:" (followed by "Зачекайте, будь ласка...")
+    to the end is dropped. Gives the same result as the regular expressions of clean_text.
+    """
+    return _trim_collapsed_text(WHITESPACE.sub(" ", text))
+
+
+def _trim_collapsed_text(text: str) -> str:
+    text = text.strip()
+
+    start = text.find(DECISION_START_MARKER)
+    if start != -1:
+        text = text[start + len(DECISION_START_MARKER):].lstrip()
+
+    end = text.find(DECISION_END_MARKER)
+    if end != -1 and text.find(PAGE_END_MARKER, end + len(DECISION_END_MARKER)) != -1:
+        text = text[:end]
+
+    return text.strip()
+
+
+def extract_decision_text(html: str) -> str:
+    """
+    Streams the page through lxml and returns the cleaned decision text.
+    """
+    parser = etree.HTMLParser(target=_TextCollector(), recover=True)
+    try:
+        for start in range(0, len(html), FEED_SIZE):
+            parser.feed(html[start:start + FEED_SIZE])
+        text = parser.close()
+    except etree.XMLSyntaxError:
+        # Raised for documents without any element (e.g. an empty page)
+        return ""
+    return _trim_collapsed_text(text)
+
+
+def iter_decision_text(html: str) -> Iterator[str]:
+    """
+    Yields the cleaned decision text piece by piece while the page is still being parsed.
+    The pieces join into extract_decision_text(html): nothing is yielded before the start marker is found,
+    and from the first end marker on the text is held back until it is known whether the page ends there.
+    """
+    collector = _TextCollector()
+    parser = etree.HTMLParser(target=collector, recover=True)
+    held = ""
+    started = False
+    emitted = False
+
+    def take_parsed():
+        text = "".join(collector.parts)
+        collector.parts.clear()
+        return text
+
+    try:
+        for start in range(0, len(html), FEED_SIZE):
+            parser.feed(html[start:start + FEED_SIZE])
+            held += take_parsed()
+            if not started:
+                marker = held.find(DECISION_START_MARKER)
+                if marker == -1:
+                    continue
+                held = held[marker + len(DECISION_START_MARKER):]
+                started = True
+            if not emitted:
+                held = held.lstrip()
+            if DECISION_END_MARKER in held:
+                continue
+            # A marker may begin in the tail, and the space before it would be stripped as well
+            ready = len(held) - len(DECISION_END_MARKER)
+            if ready > 0:
+                yield held[:ready]
+                held = held[ready:]
+                emitted = True
+        parser.close()
+    except etree.XMLSyntaxError:
+        # Raised for documents without any element (e.g. an empty page)
+        return
+    held += take_parsed()
+
+    if not started:
+        text = _trim_collapsed_text(held)
+    else:
+        text = held if emitted else held.lstrip()
+        end = text.find(DECISION_END_MARKER)
+        if end != -1 and text.find(PAGE_END_MARKER, end + len(DECISION_END_MARKER)) != -1:
+            text = text[:end]
+        text = text.rstrip()
+    if text:
+        yield text
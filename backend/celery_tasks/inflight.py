@@ -0,0 +1,77 @@
+from redis import RedisError
+from config.app_config import AppConfig
+from config.redis_client import get_redis_client
+
+from typing import Dict, List
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class InflightDecisions:
+    """
+    Redis locks (SET NX with a TTL) of the decisions that are queued or being processed, together with the set
+    of user channels waiting for each of them. A duplicate submission joins the set instead of starting a new job.
+    Claiming and releasing run in MULTI blocks, so a user either joins before the job reads the final set
+    or finds the lock gone and starts a job of its own.
+    """
+    lock_prefix = "decision_inflight"
+    subscribers_prefix = "decision_subscribers"
+
+    def __init__(self, ttl: int = None):
+        self.ttl = ttl or AppConfig.INFLIGHT_LOCK_TTL
+
+    def claim(self, decision_ids: List[str], user_channel_id: str) -> Dict[str, bool]:
+        """
+        True for the decisions claimed by this call, False for the ones another job is already running.
+        """
+        if not decision_ids:
+            return {}
+        try:
+            pipeline = get_redis_client().pipeline(transaction=True)
+            for decision_id in decision_ids:
+                pipeline.sadd(f"{self.subscribers_prefix}:{decision_id}", user_channel_id)
+                pipeline.expire(f"{self.subscribers_prefix}:{decision_id}", self.ttl)
+                pipeline.set(f"{self.lock_prefix}:{decision_id}", user_channel_id, nx=True, ex=self.ttl)
+            claimed = pipeline.execute()[2::3]
+        except RedisError as e:
+            # Without Redis duplicates are only filtered by the status check of the tasks
+            logger.warning(f"Could not claim {len(decision_ids)} decisions: {e}")
+            return dict.fromkeys(decision_ids, True)
+        return {decision_id: bool(result) for decision_id, result in zip(decision_ids, claimed)}
+
+    def subscribers(self, decision_ids: List[str]) -> Dict[str, List[str]]:
+        try:
+            pipeline = get_redis_client().pipeline(transaction=False)
+            for decision_id in decision_ids:
+                pipeline.smembers(f"{self.subscribers_prefix}:{decision_id}")
+            members = pipeline.execute()
+        except RedisError as e:
+            logger.warning(f"Could not read the subscribers of {len(decision_ids)} decisions: {e}")
+            return {}
+        return {decision_id: sorted(map(_decode, channels)) for decision_id, channels in zip(decision_ids, members)}
+
+    def release(self, decision_ids: List[str]) -> Dict[str, List[str]]:
+        """
+        Drops the locks and returns the final subscribers of the decisions.
+        """
+        if not decision_ids:
+            return {}
+        try:
+            pipeline = get_redis_client().pipeline(transaction=True)
+            for decision_id in decision_ids:
+                pipeline.smembers(f"{self.subscribers_prefix}:{decision_id}")
+                pipeline.delete(f"{self.lock_prefix}:{decision_id}", f"{self.subscribers_prefix}:{decision_id}")
+            members = pipeline.execute()[::2]
+        except RedisError as e:
+            # The locks expire on their own after the TTL
+            logger.warning(f"Could not release {len(decision_ids)} decisions: {e}")
+            return {}
+        return {decision_id: sorted(map(_decode, channels)) for decision_id, channels in zip(decision_ids, members)}
+
+
+inflight_decisions = InflightDecisions()
@@ -0,0 +1,130 @@
+import asyncio
+import os
+import threading
+
+import aiohttp
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from config.app_config import AppConfig
+
+from typing import List, Optional
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedPage:
+    etag: Optional[str]
+    last_modified: Optional[str]
+    html: str
+
+
+class PageFetcher:
+    """
+    Fetches single decision pages (no link following) over a keep-alive connection pool.
+    The pool lives on a background event loop owned by the process, so synchronous callers
+    (Celery tasks) reuse connections between calls and can fetch many pages concurrently.
+    """
+
+    def __init__(
+            self,
+            max_connections: int = None,
+            max_connections_per_host: int = None,
+            timeout: float = None,
+            validator_cache_size: int = None,
+    ):
+        self.max_connections = max_connections or AppConfig.FETCH_MAX_CONNECTIONS
+        self.max_connections_per_host = max_connections_per_host or AppConfig.FETCH_MAX_CONNECTIONS_PER_HOST
+        self.timeout = timeout or AppConfig.FETCH_TIMEOUT
+        self.validator_cache_size = validator_cache_size or AppConfig.FETCH_VALIDATOR_CACHE_SIZE
+        self._validators: OrderedDict[str, CachedPage] = OrderedDict()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._loop = None
+        self._session = None
+        self.counters = {"requests": 0, "not_modified": 0, "errors": 0}
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        # A forked child (Celery prefork) must not reuse the parent's loop thread and sockets
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._session = None
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="page-fetcher", daemon=True).start()
+            return self._loop
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections_per_host,
+                keepalive_timeout=AppConfig.FETCH_KEEPALIVE_TIMEOUT,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout, connect=min(self.timeout, 10)),
+                headers={"User-Agent": f"{AppConfig.PROJECT_NAME} page fetcher"},
+            )
+        return self._session
+
+    async def fetch_async(self, url: str) -> str:
+        cached = self._validators.get(url)
+        headers = {}
+        if cached:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        self.counters["requests"] += 1
+        try:
+            async with self._get_session().get(url, headers=headers, allow_redirects=True) as response:
+                if response.status == 304 and cached:
+                    self.counters["not_modified"] += 1
+                    self._validators.move_to_end(url)
+                    return cached.html
+
+                response.raise_for_status()
+                html = await response.text(errors="replace")
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except Exception:
+            self.counters["errors"] += 1
+            raise
+
+        if etag or last_modified:
+            self._validators[url] = CachedPage(etag, last_modified, html)
+            self._validators.move_to_end(url)
+            while len(self._validators) > self.validator_cache_size:
+                self._validators.popitem(last=False)
+        return html
+
+    async def fetch_many_async(self, urls: List[str]) -> List[str | BaseException]:
+        return await asyncio.gather(*(self.fetch_async(url) for url in urls), return_exceptions=True)
+
+    def fetch(self, url: str) -> str:
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self.fetch_async(url), loop).result()
+
+    def fetch_many(self, urls: List[str]) -> List[str | BaseException]:
+        """
+        Fetches the pages concurrently, within the pool limits.
+        Failed pages are returned as exceptions in their positions.
+        """
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self.fetch_many_async(urls), loop).result()
+
+    def close(self):
+        if self._loop is None or self._pid != os.getpid():
+            return
+        if self._session is not None:
+            asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result()
+            self._session = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+
+page_fetcher = PageFetcher()
@@ -0,0 +1,397 @@
+import queue
+import threading
+import time
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from langchain_core.documents import Document
+
+from celery_tasks.html_extraction import iter_decision_text
+from celery_tasks.page_fetcher import page_fetcher
+from celery_tasks.utils import DecisionMetadata, content_hasher, extract_metadata, iter_text_chunks
+from chroma_client.chroma_storage import ChromaDBHandler
+from chroma_client.model_registry import EmbeddingModelRegistry
+from config.app_config import AppConfig
+
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Closes a queue: every consumer that reads it stops
+END = object()
+
+
+@dataclass
+class DecisionEnd:
+    """
+    Follows the last chunk of a decision through the chunk queue, the decision is complete once it is stored.
+    """
+    decision_id: str
+    chunk_count: int
+    content_hash: str
+    metadata: DecisionMetadata
+
+
+class StageStats:
+    """
+    Items, busy time (waits on the queues excluded) and input queue depth of one pipeline stage.
+    """
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.depth_max = 0
+        self.depth_total = 0
+        self.depth_samples = 0
+        self._lock = threading.Lock()
+
+    def sample(self, input_queue: queue.Queue):
+        depth = input_queue.qsize()
+        with self._lock:
+            self.depth_max = max(self.depth_max, depth)
+            self.depth_total += depth
+            self.depth_samples += 1
+
+    def record(self, items: int, busy_seconds: float):
+        with self._lock:
+            self.items += items
+            self.busy_seconds += busy_seconds
+
+    def summary(self, wall_seconds: float) -> Dict[str, float]:
+        return {
+            "workers": self.workers,
+            "items": self.items,
+            "items_per_second": round(self.items / wall_seconds, 2) if wall_seconds else None,
+            "busy_seconds": round(self.busy_seconds, 3),
+            # Share of the run the workers of the stage spent working: the stage near 1.0 is the bottleneck
+            "utilization": round(self.busy_seconds / (wall_seconds * self.workers), 3) if wall_seconds else None,
+            "queue_depth_max": self.depth_max,
+            "queue_depth_mean": round(self.depth_total / self.depth_samples, 2) if self.depth_samples else 0,
+        }
+
+
+class IngestionPipeline:
+    """
+    Streams decisions through fetch → clean/split → embed → store, with bounded queues between the stages,
+    so that pages are downloaded while earlier decisions are parsed and encoded.
+
+    Fetching and parsing run in thread pools. Chunks are emitted while the page is still being cleaned,
+    and a single embedding stage fills its batches with chunks of any decision. A single store stage syncs each
+    decision with its precomputed embeddings once its last chunk is embedded, and then reports it complete.
+    """
+
+    def __init__(
+            self,
+            handler: ChromaDBHandler = None,
+            fetch: Callable[[str], str] = None,
+            fetch_workers: int = None,
+            parse_workers: int = None,
+            queue_size: int = None,
+            batch_size: int = None,
+            batch_wait: float = None,
+            on_progress: Callable[[str, str, str], Any] = None,
+    ):
+        self.handler = handler or ChromaDBHandler()
+        self.fetch = fetch or page_fetcher.fetch
+        self.fetch_workers = fetch_workers or AppConfig.PIPELINE_FETCH_WORKERS
+        self.parse_workers = parse_workers or AppConfig.PIPELINE_PARSE_WORKERS
+        self.queue_size = queue_size or AppConfig.PIPELINE_QUEUE_SIZE
+        self.batch_size = batch_size or AppConfig.EMBEDDING_BATCH_SIZE
+        self.batch_wait = AppConfig.PIPELINE_BATCH_WAIT if batch_wait is None else batch_wait
+        self.on_progress = on_progress or (lambda decision_id, status, detail: None)
+        self.stages: Dict[str, StageStats] = {}
+        self.wall_seconds = 0.0
+        self._results: List[Dict[str, Any]] = []
+        self._failed: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def run(self, items: Iterable[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Processes (url, decision_id) pairs. Returns one result per decision, in the order they complete:
+        {"status": "success", "decision_id", "chunk_count", "content_hash", "metadata"}
+        or {"status": "error", "decision_id", "error_message"}.
+        """
+        self.stages = {
+            "fetch": StageStats("fetch", self.fetch_workers),
+            "parse": StageStats("parse", self.parse_workers),
+            "embed": StageStats("embed", 1),
+            "store": StageStats("store", 1),
+        }
+        self._results = []
+        self._failed = {}
+        url_queue = queue.Queue(self.queue_size)
+        page_queue = queue.Queue(self.queue_size)
+        # Deep enough to fill several embedding batches while the encoder is busy
+        chunk_queue = queue.Queue(4 * self.batch_size)
+        batch_queue = queue.Queue(self.queue_size)
+
+        started = time.perf_counter()
+        fetch_pool = ThreadPoolExecutor(self.fetch_workers, thread_name_prefix="pipeline-fetch")
+        parse_pool = ThreadPoolExecutor(self.parse_workers, thread_name_prefix="pipeline-parse")
+        fetch_done = _Countdown(self.fetch_workers, lambda: [page_queue.put(END) for _ in range(self.parse_workers)])
+        parse_done = _Countdown(self.parse_workers, lambda: chunk_queue.put(END))
+        for _ in range(self.fetch_workers):
+            fetch_pool.submit(self._fetch_worker, url_queue, page_queue, fetch_done)
+        for _ in range(self.parse_workers):
+            parse_pool.submit(self._parse_worker, page_queue, chunk_queue, parse_done)
+        embedder = threading.Thread(target=self._embed_worker, args=(chunk_queue, batch_queue), name="pipeline-embed")
+        store = threading.Thread(target=self._store_worker, args=(batch_queue,), name="pipeline-store")
+        embedder.start()
+        store.start()
+
+        for item in items:
+            url_queue.put(item)
+        for _ in range(self.fetch_workers):
+            url_queue.put(END)
+
+        store.join()
+        embedder.join()
+        fetch_pool.shutdown()
+        parse_pool.shutdown()
+        self.wall_seconds = time.perf_counter() - started
+        return self._results
+
+    def _fail(self, decision_id: str, error: BaseException):
+        with self._lock:
+            if decision_id in self._failed:
+                return
+            self._failed[decision_id] = str(error)
+            self._results.append({"status": "error", "decision_id": decision_id, "error_message": str(error)})
+        logger.warning(f"Pipeline: decision «{decision_id}» failed: {error}")
+        self.on_progress(decision_id, "error", str(error))
+
+    def _fetch_worker(self, url_queue: queue.Queue, page_queue: queue.Queue, done: "_Countdown"):
+        stats = self.stages["fetch"]
+        try:
+            while True:
+                stats.sample(url_queue)
+                item = url_queue.get()
+                if item is END:
+                    return
+                url, decision_id = item
+                fetch_started = time.perf_counter()
+                try:
+                    html = self.fetch(url)
+                except Exception as e:
+                    self._fail(decision_id, e)
+                    continue
+                finally:
+                    stats.record(1, time.perf_counter() - fetch_started)
+                page_queue.put((decision_id, html))
+        finally:
+            done.count_down()
+
+    def _parse_worker(self, page_queue: queue.Queue, chunk_queue: queue.Queue, done: "_Countdown"):
+        stats = self.stages["parse"]
+        try:
+            while True:
+                stats.sample(page_queue)
+                item = page_queue.get()
+                if item is END:
+                    return
+                decision_id, html = item
+                parse_started = time.perf_counter()
+                try:
+                    waited = self._parse(decision_id, html, chunk_queue)
+                except Exception as e:
+                    self._fail(decision_id, e)
+                    waited = 0.0
+                stats.record(1, time.perf_counter() - parse_started - waited)
+        finally:
+            done.count_down()
+
+    def _parse(self, decision_id: str, html: str, chunk_queue: queue.Queue) -> float:
+        """
+        Puts the chunks of one decision on the chunk queue as they are split off the text being cleaned.
+        Returns the time spent blocked on the queue.
+        """
+        hasher = content_hasher()
+        pieces = []
+        waited = 0.0
+
+        def text_pieces():
+            for piece in iter_decision_text(html):
+                hasher.update(piece.encode())
+                pieces.append(piece)
+                yield piece
+
+        def put(chunk_index: int, chunk: str):
+            nonlocal waited
+            put_started = time.perf_counter()
+            chunk_queue.put((
+                f"{decision_id}_chunk_{chunk_index}",
+                Document(page_content=chunk, metadata={"document_id": decision_id, "decision_number": number}),
+            ))
+            waited += time.perf_counter() - put_started
+
+        number = None
+        held = []
+        count = 0
+        for chunk in iter_text_chunks(text_pieces()):
+            if number is None:
+                # The case number is near the top of the text, the first chunks wait until it has been read
+                text = "".join(pieces)
+                candidate = extract_metadata(text).number
+                if candidate == "unspecified" or text.endswith(candidate):
+                    held.append(chunk)
+                    continue
+                number = candidate
+            for held_chunk in [*held, chunk]:
+                put(count, held_chunk)
+                count += 1
+            held = []
+
+        metadata = extract_metadata("".join(pieces))
+        self.on_progress(decision_id, "text_extracted", "Text extracted")
+        if number is None:
+            number = metadata.number
+            for held_chunk in held:
+                put(count, held_chunk)
+                count += 1
+        self.on_progress(decision_id, "chunks_created", f"{count} chunks created")
+
+        put_started = time.perf_counter()
+        chunk_queue.put(DecisionEnd(decision_id, count, hasher.hexdigest(),
+                                    DecisionMetadata(number=number, proceeding=metadata.proceeding)))
+        return waited + time.perf_counter() - put_started
+
+    def _embed_worker(self, chunk_queue: queue.Queue, batch_queue: queue.Queue):
+        stats = self.stages["embed"]
+        ids, documents, ends = [], [], []
+
+        def flush():
+            nonlocal ids, documents, ends
+            if not ids and not ends:
+                return
+            batch_started = time.perf_counter()
+            vectors = []
+            try:
+                if documents:
+                    vectors = embeddings.embed_documents([document.page_content for document in documents])
+            except Exception as e:
+                for decision_id in dict.fromkeys(document.metadata["document_id"] for document in documents):
+                    self._fail(decision_id, e)
+                ids, documents = [], []
+            stats.record(len(ids), time.perf_counter() - batch_started)
+            batch_queue.put((ids, documents, vectors, ends))
+            ids, documents, ends = [], [], []
+
+        try:
+            embeddings = EmbeddingModelRegistry.get_document_embeddings()
+            while True:
+                stats.sample(chunk_queue)
+                try:
+                    # A partial batch is encoded when no chunk arrives in time, the encoder is not left idle
+                    item = chunk_queue.get(timeout=self.batch_wait) if ids else chunk_queue.get()
+                except queue.Empty:
+                    flush()
+                    continue
+                if item is END:
+                    flush()
+                    return
+                if isinstance(item, DecisionEnd):
+                    ends.append(item)
+                    continue
+                chunk_id, document = item
+                if document.metadata["document_id"] in self._failed:
+                    continue
+                ids.append(chunk_id)
+                documents.append(document)
+                if len(ids) >= self.batch_size:
+                    flush()
+        except Exception as e:
+            logger.exception(f"Pipeline embedding stage stopped: {e}")
+            for decision_id in [*(end.decision_id for end in ends),
+                                *(document.metadata["document_id"] for document in documents)]:
+                self._fail(decision_id, e)
+            # Consumes the rest of the stream, so that the parse workers are not left blocked on a full queue
+            while (item := chunk_queue.get()) is not END:
+                self._fail(item.decision_id if isinstance(item, DecisionEnd) else item[1].metadata["document_id"], e)
+        finally:
+            batch_queue.put(END)
+
+    def _store_worker(self, batch_queue: queue.Queue):
+        """
+        Holds the chunks of each decision until its last one is embedded, then syncs the complete decisions through
+        upsert_decision_documents: chunks left over from an earlier version are deleted, and nothing of a decision
+        that fails midway is written.
+        """
+        stats = self.stages["store"]
+        pending: Dict[str, List[Tuple[str, Document, List[float]]]] = defaultdict(list)
+        while True:
+            stats.sample(batch_queue)
+            batch = batch_queue.get()
+            if batch is END:
+                return
+            ids, documents, vectors, ends = batch
+            store_started = time.perf_counter()
+            for chunk_id, document, vector in zip(ids, documents, vectors):
+                pending[document.metadata["document_id"]].append((chunk_id, document, vector))
+            # A decision whose parsing failed after some chunks were queued never gets its DecisionEnd
+            for decision_id in [decision_id for decision_id in pending if decision_id in self._failed]:
+                del pending[decision_id]
+
+            complete = []
+            for end in ends:
+                chunks = pending.pop(end.decision_id, [])
+                if end.decision_id not in self._failed:
+                    complete.append((end, chunks))
+            if complete:
+                chunks = [chunk for _, decision_chunks in complete for chunk in decision_chunks]
+                try:
+                    self.handler.upsert_decision_documents(
+                        [document for _, document, _ in chunks],
+                        [chunk_id for chunk_id, _, _ in chunks],
+                        [end.decision_id for end, _ in complete],
+                        [vector for _, _, vector in chunks],
+                    )
+                except Exception as e:
+                    for end, _ in complete:
+                        self._fail(end.decision_id, e)
+            stats.record(len(ids), time.perf_counter() - store_started)
+
+            for end, _ in complete:
+                if end.decision_id in self._failed:
+                    continue
+                with self._lock:
+                    self._results.append({
+                        "status": "success",
+                        "decision_id": end.decision_id,
+                        "chunk_count": end.chunk_count,
+                        "content_hash": end.content_hash,
+                        "metadata": end.metadata,
+                    })
+                self.on_progress(end.decision_id, "documents_saved", "Documents saved to Chroma")
+
+    def stats(self) -> Dict[str, Any]:
+        succeeded = sum(result["status"] == "success" for result in self._results)
+        return {
+            "wall_seconds": round(self.wall_seconds, 3),
+            "decisions": succeeded,
+            "errors": len(self._results) - succeeded,
+            "chunks": sum(result.get("chunk_count", 0) for result in self._results),
+            "decisions_per_second": round(succeeded / self.wall_seconds, 2) if self.wall_seconds else None,
+            "stages": {name: stage.summary(self.wall_seconds) for name, stage in self.stages.items()},
+        }
+
+
+class _Countdown:
+    """
+    Runs on_zero once the last of the workers of a stage has stopped, to close the next queue.
+    """
+
+    def __init__(self, workers: int, on_zero: Callable[[], Any]):
+        self._remaining = workers
+        self._on_zero = on_zero
+        self._lock = threading.Lock()
+
+    def count_down(self):
+        with self._lock:
+            self._remaining -= 1
+            last = self._remaining == 0
+        if last:
+            self._on_zero()
@@ -0,0 +1,169 @@
+import json
+import os
+import threading
+import time
+
+from redis import RedisError
+from celery_tasks.inflight import inflight_decisions
+from config.app_config import AppConfig
+from config.redis_client import get_redis_client
+
+from typing import Dict, List, Tuple
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Stages after which nothing else is published for the decision, they are never coalesced away
+TERMINAL_STATUSES = frozenset({"done", "already_done", "unchanged", "error"})
+
+
+def progress_stream_key(user_channel_id: str) -> str:
+    return f"progress_stream:{user_channel_id}"
+
+
+def with_event_id(message: dict, event_id) -> dict:
+    return {**message, "event_id": event_id.decode() if isinstance(event_id, bytes) else event_id}
+
+
+class ProgressPublisher:
+    """
+    Buffers the progress events of the decision tasks, appends them to the capped progress_stream:{channel}
+    Redis streams and publishes them to the user:{channel} channels in pipelines, from a background thread
+    every flush_interval seconds or as soon as flush_size events wait.
+    A stage that is still waiting is replaced by the next stage of the same decision, so during bulk ingestion
+    the broker mostly sees the latest state of each decision.
+    """
+
+    def __init__(self, flush_size: int = None, flush_interval: float = None):
+        self.flush_size = flush_size or AppConfig.PROGRESS_FLUSH_SIZE
+        self.flush_interval = flush_interval or AppConfig.PROGRESS_FLUSH_INTERVAL
+        self._pending: Dict[Tuple[str, str], List[dict]] = {}
+        self._pending_count = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake_up = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.counters = {"events": 0, "coalesced": 0, "published": 0, "flushes": 0, "errors": 0}
+
+    def _ensure_flusher(self):
+        # Threads do not survive a fork, every worker child starts its own flusher
+        if self._thread is None or self._pid != os.getpid():
+            with self._lock:
+                if self._thread is None or self._pid != os.getpid():
+                    self._pending.clear()
+                    self._pending_count = 0
+                    self._wake_up = threading.Event()
+                    self._thread = threading.Thread(target=self._run, name="progress-flusher", daemon=True)
+                    self._thread.start()
+                    self._pid = os.getpid()
+
+    def publish(self, user_channel_id: str, decision_id: str, status: str, detail: str):
+        self._ensure_flusher()
+        message = {
+            "type": "progress",
+            "decision_id": decision_id,
+            "status": status,
+            "detail": detail,
+        }
+        with self._lock:
+            self.counters["events"] += 1
+            events = self._pending.setdefault((user_channel_id, decision_id), [])
+            if events and events[-1]["status"] not in TERMINAL_STATUSES:
+                events[-1] = message
+                self.counters["coalesced"] += 1
+            else:
+                events.append(message)
+                self._pending_count += 1
+            if self._pending_count >= self.flush_size:
+                self._wake_up.set()
+
+    def flush(self):
+        """
+        Publishes everything buffered so far: one pipeline appends to the streams, one publishes with the event IDs.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._pending_count = 0
+            if not pending:
+                return
+
+            events = [
+                (user_channel_id, message) for (user_channel_id, _), messages in pending.items() for message in messages
+            ]
+            client = get_redis_client()
+            try:
+                # The stream keeps the events for replay after a reconnect, the stream entry ID becomes the event ID
+                pipeline = client.pipeline(transaction=False)
+                for user_channel_id, message in events:
+                    pipeline.xadd(progress_stream_key(user_channel_id), {"data": json.dumps(message)},
+                                  maxlen=AppConfig.PROGRESS_STREAM_MAXLEN, approximate=True)
+                for user_channel_id in {user_channel_id for user_channel_id, _ in pending}:
+                    pipeline.expire(progress_stream_key(user_channel_id), AppConfig.PROGRESS_STREAM_TTL)
+                event_ids = pipeline.execute()[:len(events)]
+
+                pipeline = client.pipeline(transaction=False)
+                for (user_channel_id, message), event_id in zip(events, event_ids):
+                    pipeline.publish(f"user:{user_channel_id}", json.dumps(with_event_id(message, event_id)))
+                pipeline.execute()
+
+            except RedisError as e:
+                # Progress is best effort, the task itself must not fail because of it
+                logger.warning(f"Could not publish {len(events)} progress events: {e}")
+                with self._lock:
+                    self.counters["errors"] += 1
+                return
+
+            with self._lock:
+                self.counters["published"] += len(events)
+                self.counters["flushes"] += 1
+
+    def _run(self):
+        wake_up = self._wake_up
+        while True:
+            wake_up.wait(self.flush_interval)
+            wake_up.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.exception(f"Progress flusher failed: {e}")
+            # Coalescing needs a short window, do not spin when a task publishes in a tight loop
+            time.sleep(0.01)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.counters, "pending": self._pending_count}
+
+
+progress_publisher = ProgressPublisher()
+
+
+class DecisionNotifier:
+    """
+    Sends the progress of the decisions of one task to every user waiting for them, not only to the submitter.
+    Terminal stages release the in-flight locks and go to the subscribers read at that moment.
+    """
+
+    def __init__(self, decision_ids: List[str], user_channel_id: str):
+        self.user_channel_id = user_channel_id
+        self.channels = inflight_decisions.subscribers(decision_ids)
+
+    def notify(self, decision_id: str, status: str, detail: str):
+        if status in TERMINAL_STATUSES:
+            self.finish([decision_id], status, detail)
+        else:
+            self._publish(decision_id, status, detail)
+
+    def finish(self, decision_ids: List[str], status: str, detail: str):
+        """
+        Publishes a terminal stage of several decisions, releasing all their locks with one transaction.
+        """
+        self.channels.update((decision_id, channels)
+                             for decision_id, channels in inflight_decisions.release(decision_ids).items() if channels)
+        for decision_id in decision_ids:
+            self._publish(decision_id, status, detail)
+
+    def _publish(self, decision_id: str, status: str, detail: str):
+        for channel in self.channels.get(decision_id) or [self.user_channel_id]:
+            progress_publisher.publish(channel, decision_id, status, detail)
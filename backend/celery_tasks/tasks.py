@@ -1,10 +1,12 @@
 import smtplib
 import torch
-import gc
 
 from celery import shared_task
-from celery_tasks.utils import extract_text_from_url, extract_metadata, split_text_into_chunks, \
-    get_email_template_user_verification, get_smtp_config
+from celery_tasks.page_fetcher import page_fetcher
+from celery_tasks.pipeline import IngestionPipeline
+from celery_tasks.progress import DecisionNotifier, progress_publisher
+from celery_tasks.utils import extract_text_from_url, extract_text_from_html, extract_metadata, \
+    split_text_into_chunks, content_hash, get_email_template_user_verification, get_smtp_config
 from api.models import DecisionStatus, CourtDecision
 from chroma_client.chroma_storage import ChromaDBHandler
 
@@ -14,19 +16,11 @@ logger = logging.getLogger(__name__)
 
 @shared_task(bind=True, max_retries=2, queue="decision_processing")
 def decision_processing_task(self, url: str, decision_id: str, user_channel_id: str):
-    import redis
-    import json
-
-    redis_client = redis.Redis(host="localhost", port=6379, db=0)
+    # Users who submitted the same decision while it is in flight get its progress as well
+    notifier = DecisionNotifier([decision_id], user_channel_id)
 
     def notify(status, detail):
-        message = {
-            "type": "progress",
-            "decision_id": decision_id,
-            "status": status,
-            "detail": detail,
-        }
-        redis_client.publish(f"user:{user_channel_id}", json.dumps(message))
+        notifier.notify(decision_id, status, detail)
 
     try:
         decision, _ = CourtDecision.objects.get_or_create(decision_id=decision_id)
@@ -50,22 +44,22 @@ def decision_processing_task(self, url: str, decision_id: str, user_channel_id:
         notify("chunks_created", f"{len(documents)} chunks created")
 
         ids = [f"{decision_id}_chunk_{i}" for i in range(len(documents))]
-        chroma_handler.save_documents(documents, ids, decision_id)
+        # Also removes the chunks left over from an earlier, longer version of the decision
+        chroma_handler.upsert_decision_documents(documents, ids, [decision_id])
         notify("documents_saved", "Documents saved to Chroma")
 
         decision.decision_number = decision_metadata.number
         decision.proceeding_number = decision_metadata.proceeding
+        decision.content_hash = content_hash(cleaned_text)
+        decision.chunk_count = len(documents)
         decision.status = DecisionStatus.DONE
-        decision.save(update_fields=["decision_number", "proceeding_number", "status"])
+        decision.save(update_fields=["decision_number", "proceeding_number", "content_hash", "chunk_count", "status"])
         notify("done", "Decision processing completed")
 
         chroma_handler.close()
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
 
-        del cleaned_text, decision_metadata, documents, chroma_handler
-        gc.collect()
-
         return {"status": "success", "decision_id": decision_id}
 
     except Exception as e:
@@ -74,6 +68,198 @@ def decision_processing_task(self, url: str, decision_id: str, user_channel_id:
             torch.cuda.empty_cache()
         return {"status": "error", "decision_id": decision_id, "error_message": str(e)}
 
+    finally:
+        # The final stage reaches the user without waiting for the background flush
+        progress_publisher.flush()
+
+@shared_task(bind=True, max_retries=2, queue="decision_processing")
+def decision_batch_processing_task(self, items: list[list[str]], user_channel_id: str, refresh: bool = False):
+    """
+    Processes several decisions at once: fetch/clean/split runs per decision, then the chunks
+    of all decisions are embedded in fixed-size batches and written with a single call.
+    items: [url, decision_id] pairs.
+    refresh: processed decisions are fetched again, and re-indexed only if their text has changed.
+    """
+    notifier = DecisionNotifier([decision_id for _, decision_id in items], user_channel_id)
+    try:
+        return _process_decision_batch(items, notifier, refresh)
+    finally:
+        progress_publisher.flush()
+
+
+def _fail_decisions(notifier: DecisionNotifier, results: list[dict], decision_ids: list[str],
+                    error: Exception) -> list[dict]:
+    """
+    Reports a failure of a batch-wide step for the decisions it left unfinished and releases their locks.
+    """
+    logger.error(f"Batch step failed for {len(decision_ids)} decisions: {error}")
+    notifier.finish(decision_ids, "error", str(error))
+    results.extend({"status": "error", "decision_id": decision_id, "error_message": str(error)}
+                   for decision_id in decision_ids)
+    return results
+
+
+def _process_decision_batch(items: list[list[str]], notifier: DecisionNotifier, refresh: bool = False) -> list[dict]:
+    notify = notifier.notify
+    results = []
+    pending = []
+    for url, decision_id in items:
+        try:
+            decision, _ = CourtDecision.objects.get_or_create(decision_id=decision_id)
+            if decision.status == DecisionStatus.DONE and not refresh:
+                notify(decision_id, "already_done", f"The decision {decision_id} has already been processed.")
+                results.append({"status": "already_done", "decision_id": decision_id})
+                continue
+
+            notify(decision_id, "started", "Processing started")
+            pending.append((url, decision))
+
+        except Exception as e:
+            notify(decision_id, "error", str(e))
+            results.append({"status": "error", "decision_id": decision_id, "error_message": str(e)})
+
+    # The pages of the whole batch are downloaded concurrently over the shared connection pool
+    try:
+        pages = page_fetcher.fetch_many([url for url, _ in pending])
+    except Exception as e:
+        return _fail_decisions(notifier, results, [decision.decision_id for _, decision in pending], e)
+
+    prepared = []
+    for (url, decision), html in zip(pending, pages):
+        decision_id = decision.decision_id
+        try:
+            if isinstance(html, BaseException):
+                raise html
+
+            cleaned_text = extract_text_from_html(html)
+            notify(decision_id, "text_extracted", "Text extracted")
+
+            text_hash = content_hash(cleaned_text)
+            if decision.status == DecisionStatus.DONE and decision.content_hash == text_hash:
+                notify(decision_id, "unchanged", "The decision text has not changed")
+                results.append({"status": "unchanged", "decision_id": decision_id})
+                continue
+
+            decision_metadata = extract_metadata(cleaned_text)
+            notify(decision_id, "metadata_extracted", "Metadata extracted")
+
+            documents = split_text_into_chunks(cleaned_text, decision_id, decision_metadata)
+            notify(decision_id, "chunks_created", f"{len(documents)} chunks created")
+
+            decision.decision_number = decision_metadata.number
+            decision.proceeding_number = decision_metadata.proceeding
+            decision.content_hash = text_hash
+            decision.chunk_count = len(documents)
+            decision.status = DecisionStatus.DONE
+            prepared.append((decision, documents))
+
+        except Exception as e:
+            notify(decision_id, "error", str(e))
+            results.append({"status": "error", "decision_id": decision_id, "error_message": str(e)})
+
+    if not prepared:
+        return results
+
+    documents = []
+    ids = []
+    for decision, decision_documents in prepared:
+        documents.extend(decision_documents)
+        ids.extend(f"{decision.decision_id}_chunk_{i}" for i in range(len(decision_documents)))
+
+    try:
+        chroma_handler = ChromaDBHandler()
+        # Unchanged chunks are not embedded again, chunks the decisions no longer produce are deleted
+        chroma_handler.upsert_decision_documents(documents, ids, [decision.decision_id for decision, _ in prepared])
+        chroma_handler.close()
+    except Exception as e:
+        return _fail_decisions(notifier, results, [decision.decision_id for decision, _ in prepared], e)
+
+    for decision, _ in prepared:
+        notify(decision.decision_id, "documents_saved", "Documents saved to Chroma")
+
+    try:
+        CourtDecision.objects.bulk_update(
+            [decision for decision, _ in prepared],
+            ["decision_number", "proceeding_number", "content_hash", "chunk_count", "status"],
+        )
+    except Exception as e:
+        return _fail_decisions(notifier, results, [decision.decision_id for decision, _ in prepared], e)
+    notifier.finish([decision.decision_id for decision, _ in prepared], "done", "Decision processing completed")
+    for decision, _ in prepared:
+        results.append({"status": "success", "decision_id": decision.decision_id})
+
+    return results
+
+@shared_task(bind=True, max_retries=2, queue="decision_processing")
+def decision_pipeline_task(self, items: list[list[str]], user_channel_id: str):
+    """
+    Processes several decisions with the streaming ingestion pipeline: downloads, parsing, encoding
+    and writes of different decisions overlap, and the embedding batches mix chunks of all of them.
+    items: [url, decision_id] pairs.
+    """
+    notifier = DecisionNotifier([decision_id for _, decision_id in items], user_channel_id)
+    try:
+        return _process_decision_pipeline(items, notifier)
+    finally:
+        progress_publisher.flush()
+
+
+def _process_decision_pipeline(items: list[list[str]], notifier: DecisionNotifier) -> list[dict]:
+    notify = notifier.notify
+    results = []
+    decisions = {}
+    pending = []
+    for url, decision_id in items:
+        try:
+            decision, _ = CourtDecision.objects.get_or_create(decision_id=decision_id)
+            if decision.status == DecisionStatus.DONE:
+                notify(decision_id, "already_done", f"The decision {decision_id} has already been processed.")
+                results.append({"status": "already_done", "decision_id": decision_id})
+                continue
+
+            notify(decision_id, "started", "Processing started")
+            decisions[decision_id] = decision
+            pending.append((url, decision_id))
+
+        except Exception as e:
+            notify(decision_id, "error", str(e))
+            results.append({"status": "error", "decision_id": decision_id, "error_message": str(e)})
+
+    if not pending:
+        return results
+
+    # Stage progress and errors are reported from the pipeline threads as they happen
+    pipeline = IngestionPipeline(on_progress=notify)
+    try:
+        pipeline_results = pipeline.run(pending)
+    except Exception as e:
+        return _fail_decisions(notifier, results, [decision_id for _, decision_id in pending], e)
+    saved = []
+    for result in pipeline_results:
+        if result["status"] != "success":
+            results.append(result)
+            continue
+        decision = decisions[result["decision_id"]]
+        decision.decision_number = result["metadata"].number
+        decision.proceeding_number = result["metadata"].proceeding
+        decision.content_hash = result["content_hash"]
+        decision.chunk_count = result["chunk_count"]
+        decision.status = DecisionStatus.DONE
+        saved.append(decision)
+    logger.info(f"Ingestion pipeline: {pipeline.stats()}")
+
+    try:
+        CourtDecision.objects.bulk_update(
+            saved, ["decision_number", "proceeding_number", "content_hash", "chunk_count", "status"]
+        )
+    except Exception as e:
+        return _fail_decisions(notifier, results, [decision.decision_id for decision in saved], e)
+    notifier.finish([decision.decision_id for decision in saved], "done", "Decision processing completed")
+    for decision in saved:
+        results.append({"status": "success", "decision_id": decision.decision_id})
+
+    return results
+
 @shared_task(max_retries=2, queue="email_sending")
 def send_email_verification_link(user_id: int, verification_code: str):
     try:
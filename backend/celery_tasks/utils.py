@@ -1,16 +1,18 @@
+import hashlib
 import os
 import re
 
 from bs4 import BeautifulSoup
-from langchain_community.document_loaders import RecursiveUrlLoader
 from dataclasses import dataclass
 
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from typing import List
+from typing import Iterable, Iterator, List, Optional
 from email.message import EmailMessage
 
 from config.app_config import AppConfig
+from celery_tasks.html_extraction import extract_decision_text
+from celery_tasks.page_fetcher import page_fetcher
 from user.models import User
 
 from dotenv import load_dotenv
@@ -34,19 +36,27 @@ def clean_text(text: str) -> str:
     text = re.sub(r"\s*Логін: Для помилки:.*Зачекайте, будь ласка\.\.\..*$", "", text, flags=re.DOTALL)
     return text.strip()
 
-def extract_text_from_url(url: str) -> str:
+def extract_text_from_html(html: str) -> str:
     """
-    Downloads and extracts text from a page at the specified URL.
+    Extracts the cleaned decision text from the page HTML.
     """
-    def bs4_extractor(html: str) -> str:
-        soup = BeautifulSoup(html, "lxml")
-        return re.sub(r"\n\n+", "\n\n", soup.text).strip()
-    loader = RecursiveUrlLoader(url, extractor=bs4_extractor)
-    docs = loader.load()
-    script_text = docs[0].page_content
+    if AppConfig.HTML_EXTRACTOR == "lxml":
+        return extract_decision_text(html)
+    return extract_text_with_bs4(html)
+
+def extract_text_with_bs4(html: str) -> str:
+    soup = BeautifulSoup(html, "lxml")
+    script_text = re.sub(r"\n\n+", "\n\n", soup.text).strip()
     cleaned_text = clean_text(script_text)
     return cleaned_text
 
+def extract_text_from_url(url: str) -> str:
+    """
+    Downloads and extracts text from a page at the specified URL.
+    """
+    html = page_fetcher.fetch(url)
+    return extract_text_from_html(html)
+
 def extract_metadata(text: str) -> DecisionMetadata:
     # Universal regular expression
     pattern = r"(?:Категорія справи|Справа)?\s*№?\s*([\dа-яА-Я\-]+(?:/[\dа-яА-Я\-]+)+)"
@@ -64,15 +74,129 @@ def extract_metadata(text: str) -> DecisionMetadata:
         proceeding=proceeding_number,
     )
 
-def split_text_into_chunks(text: str, decision_id: str, decision_metadata: DecisionMetadata) -> List[Document]:
+def content_hasher():
+    """
+    sha256 object fed with the text piece by piece, hexdigest() gives content_hash(text).
+    """
+    # Chunk boundaries depend on the splitter settings, so a change of them changes the hash too
+    return hashlib.sha256(f"{AppConfig.MAX_CHUNK_SIZE}:{AppConfig.CHUNK_OVERLAP}\0".encode())
+
+def content_hash(text: str) -> str:
+    hasher = content_hasher()
+    hasher.update(text.encode())
+    return hasher.hexdigest()
+
 
-    text_splitter = RecursiveCharacterTextSplitter(
+def make_text_splitter(splitter_class=RecursiveCharacterTextSplitter) -> RecursiveCharacterTextSplitter:
+    return splitter_class(
         chunk_size=AppConfig.MAX_CHUNK_SIZE,
         chunk_overlap=AppConfig.CHUNK_OVERLAP,
         length_function=len,
         is_separator_regex=False,
     )
 
+
+class _Split(str):
+    """
+    A split of the text being chunked, with where it starts and the recursion depth it was split at.
+    """
+    offset: int
+    depth: int
+
+
+class _TrackingTextSplitter(RecursiveCharacterTextSplitter):
+    """
+    Splits like RecursiveCharacterTextSplitter and records in chunk_starts, for every chunk, the offset of its first
+    split in the text and the depth of the split: 1 for the top-level splits, more inside a split longer than a chunk.
+    The splits keep their separators and reach _merge_splits in order, so the offsets are counted there.
+    """
+
+    def split_text(self, text: str) -> List[str]:
+        self.chunk_starts = []
+        self._position = 0
+        self._depth = 0
+        return super().split_text(text)
+
+    def _split_text(self, text: str, separators: List[str]) -> List[str]:
+        self._depth += 1
+        try:
+            return super()._split_text(text, separators)
+        finally:
+            self._depth -= 1
+
+    def _merge_splits(self, splits: Iterable[str], separator: str) -> List[str]:
+        tracked = []
+        for split in splits:
+            tracked_split = _Split(split)
+            tracked_split.offset, tracked_split.depth = self._position, self._depth
+            self._position += len(split)
+            tracked.append(tracked_split)
+        return super()._merge_splits(tracked, separator)
+
+    def _join_docs(self, docs: List[str], separator: str) -> Optional[str]:
+        text = super()._join_docs(docs, separator)
+        if text is not None:
+            self.chunk_starts.append((docs[0].offset, docs[0].depth))
+        return text
+
+
+def _top_separator(text: str, separators: List[str]) -> int:
+    # The separator RecursiveCharacterTextSplitter splits the text on first
+    return next((i for i, separator in enumerate(separators) if not separator or separator in text),
+                len(separators) - 1)
+
+
+def iter_text_chunks(pieces: Iterable[str], window: int = None) -> Iterator[str]:
+    """
+    Splits text arriving in pieces, yielding each chunk once the text that follows can no longer change it,
+    so the chunks are those split_text_into_chunks produces for the whole text.
+
+    The buffer is split whenever it has grown by a window. It restarts at the last chunk, short of the final one,
+    whose first split is a top-level split: the greedy merge of the splitter resumes there exactly.
+    Should a separator the splitter prefers show up after a restart, the text before it is a split of its own
+    in the whole text and is split separately.
+    """
+    text_splitter = make_text_splitter(_TrackingTextSplitter)
+    separators = text_splitter._separators
+    window = window or AppConfig.STREAM_SPLIT_WINDOW
+    buffer = ""
+    # Separator the buffer starts on after a restart, None while it starts at the beginning of the text
+    level = None
+
+    def close_splits():
+        nonlocal buffer, level
+        while level is not None and _top_separator(buffer, separators) < level:
+            cut, level = min(
+                (buffer.find(separator), i) for i, separator in enumerate(separators[:level]) if separator in buffer
+            )
+            yield from text_splitter.split_text(buffer[:cut])
+            buffer = buffer[cut:]
+
+    threshold = window
+    for piece in pieces:
+        buffer += piece
+        if len(buffer) < threshold:
+            continue
+        yield from close_splits()
+        top = _top_separator(buffer, separators)
+        chunks = text_splitter.split_text(buffer)
+        for i in range(len(chunks) - 2, 0, -1):
+            offset, depth = text_splitter.chunk_starts[i]
+            if depth == 1 and offset > 0:
+                yield from chunks[:i]
+                buffer = buffer[offset:]
+                level = top
+                break
+        threshold = len(buffer) + window
+    yield from close_splits()
+    if buffer:
+        yield from text_splitter.split_text(buffer)
+
+
+def split_text_into_chunks(text: str, decision_id: str, decision_metadata: DecisionMetadata) -> List[Document]:
+
+    text_splitter = make_text_splitter()
+
     documents = [
         Document(
             page_content=chunk,
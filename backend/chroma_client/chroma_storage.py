@@ -1,8 +1,22 @@
+import hashlib
+import heapq
 import os
+import re
+import threading
+import time
+import numpy as np
 import torch
 
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
 from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
+from chroma_client.exact_index import ExactVectorIndex
+from chroma_client.lexical_index import TOKEN, LexicalIndex
+from chroma_client.model_registry import EmbeddingModelRegistry
+from chroma_client.query_batcher import query_batcher
+from chroma_client.query_cache import query_embedding_cache
+from chroma_client.search_cache import CollectionVersion
 from config.app_config import AppConfig
 from langchain.schema import Document
 
@@ -11,65 +25,380 @@ from typing import List, Optional, Dict, Any, Tuple
 import logging
 logger = logging.getLogger(__name__)
 
+# Statute articles and case/proceeding numbers, e.g. "ст. 625 ЦК" or "910/12345/23"
+EXACT_TERM = re.compile(r"(?<!\w)(?:ст\.?|стаття|статті|статтею)\s*\d+|\d+(?:[/-]\d+)+", re.IGNORECASE)
+
+# Shared by all handlers of the process, runs the lexical and vector retrieval of hybrid searches
+search_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hybrid-search")
+# Runs the per-shard queries of sharded collections (kept apart, hybrid searches fan out from search_executor)
+shard_executor = ThreadPoolExecutor(max_workers=AppConfig.CHROMA_SHARD_WORKERS, thread_name_prefix="chroma-shard")
+
+
+def shard_index(decision_id: str, shards: int) -> int:
+    # Stable across processes and restarts, unlike hash()
+    return int(hashlib.md5(decision_id.encode()).hexdigest()[:8], 16) % shards
+
+
+def chunk_decision_id(chunk_id: str) -> Optional[str]:
+    decision_id, separator, _ = chunk_id.rpartition("_chunk_")
+    return decision_id if separator else None
+
+
+def filter_decision_ids(where: Dict[str, Any]) -> Optional[List[str]]:
+    """
+    Decision IDs of a filter on document_id alone ({"document_id": id}, {"$eq": id} or {"$in": [ids]}),
+    None for any other filter.
+    """
+    if set(where) != {"document_id"}:
+        return None
+    condition = where["document_id"]
+    if isinstance(condition, str):
+        return [condition]
+    if isinstance(condition, dict) and len(condition) == 1:
+        if "$eq" in condition:
+            return [condition["$eq"]]
+        if "$in" in condition:
+            return list(condition["$in"])
+    return None
+
 
 class ChromaDBHandler:
-    def __init__(self, persist_directory=None, collection_name=None):
+    # Per exact index directory: (index version, checked at, ready), shared by the handlers of the process
+    _exact_readiness: Dict[str, Tuple[Any, float, bool]] = {}
+    _exact_readiness_lock = threading.Lock()
+
+    def __init__(self, persist_directory=None, collection_name=None, shards=None, hnsw_profile=None):
         self.persist_directory = persist_directory or AppConfig.CHROMA_PATH
         self.collection_name = collection_name or AppConfig.COLLECTION_NAME
+        # With several shards the chunks of a decision live in the collection {name}_shard_{i} chosen by its ID
+        self.shards = shards or AppConfig.CHROMA_SHARDS
+        if self.shards > 1:
+            self.shard_names = [f"{self.collection_name}_shard_{i}" for i in range(self.shards)]
+        else:
+            self.shard_names = [self.collection_name]
+        self.hnsw_profile = hnsw_profile or AppConfig.HNSW_PROFILE
+        if self.hnsw_profile not in AppConfig.HNSW_PROFILES:
+            raise ValueError(f"Unknown HNSW profile: «{self.hnsw_profile}»")
         self.embedding_model = None
         self.db = None
+        self.shard_dbs = []
+        self.lexical_index = LexicalIndex.for_collection(self.persist_directory, self.collection_name)
+        # One exact index for all shards; searched only while it holds every stored chunk
+        self.exact_index = (
+            ExactVectorIndex.for_collection(self.persist_directory, self.collection_name)
+            if AppConfig.EXACT_INDEX_ENABLED else None
+        )
 
     def init_embedding_model(self):
         if not self.embedding_model:
-            logger.info("Initialization of the embedding model")
-            self.embedding_model = HuggingFaceEmbeddings(
-                model_name=AppConfig.LM_MODEL_NAME,
-                model_kwargs={"device": "cpu"},
-                encode_kwargs={"normalize_embeddings": True},
-            )
+            # The model is loaded once per process and shared between handlers
+            self.embedding_model = EmbeddingModelRegistry.get_embedding_model()
+
+    def embed_query(self, query: str) -> List[float]:
+        self.init_embedding_model()
+        # Cache misses of concurrent requests are encoded together
+        compute = query_batcher.embed if AppConfig.QUERY_BATCHING_ENABLED else self.embedding_model.embed_query
+        return query_embedding_cache.get_or_compute(query, compute)
 
     def load_or_create_db(self):
         self.init_embedding_model()
+        self.shard_dbs = [
+            EmbeddingModelRegistry.get_db(self.persist_directory, name, lambda name=name: self._open_db(name))
+            for name in self.shard_names
+        ]
+        self.db = self.shard_dbs[0]
+        if self.exact_index is not None:
+            self.exact_index_ready()
+
+    def exact_index_ready(self) -> bool:
+        """
+        Whether the exact index holds every chunk stored in Chroma. Handler writes update both, so the counts are
+        compared again when the index changes, and otherwise every EXACT_INDEX_READY_CHECK_SECONDS.
+        """
+        if self.exact_index is None or not self.shard_dbs:
+            return False
+        version = self.exact_index.version()
+        now = time.monotonic()
+        with self._exact_readiness_lock:
+            state = self._exact_readiness.get(self.exact_index.directory)
+        if state is not None and state[0] == version and now - state[1] < AppConfig.EXACT_INDEX_READY_CHECK_SECONDS:
+            return state[2]
+
+        indexed = self.exact_index.count()
+        stored = sum(db._collection.count() for db in self.shard_dbs)
+        # A missing index is not ready even for an empty collection, writes may not go through the handler
+        ready = version is not None and indexed == stored
+        if not ready and (state is None or state[2]):
+            logger.warning(f"The exact index of «{self.collection_name}» holds {indexed} of {stored} chunks, "
+                           f"searches use HNSW until the rebuild_exact_index command is run")
+        with self._exact_readiness_lock:
+            self._exact_readiness[self.exact_index.directory] = (version, now, ready)
+        return ready
+
+    def rebuild_exact_index(self, page_size: int = 1000, on_progress=None):
+        """
+        Refills the exact index from the embeddings stored in Chroma, after writes that bypassed the handler.
+        """
+        if not self.db:
+            self.load_or_create_db()
+        self.exact_index.clear()
+        for db in self.shard_dbs:
+            collection = db._collection
+            indexed = 0
+            total = collection.count()
+            while indexed < total:
+                page = collection.get(include=["embeddings", "metadatas"], limit=page_size, offset=indexed)
+                if not page["ids"]:
+                    break
+                self.exact_index.upsert(
+                    page["ids"],
+                    page["embeddings"],
+                    [(metadata or {}).get("document_id", "unknown") for metadata in page["metadatas"]],
+                )
+                indexed += len(page["ids"])
+                if on_progress is not None:
+                    on_progress(collection.name, indexed, total)
+
+    def _open_db(self, collection_name: str = None):
+        collection_name = collection_name or self.collection_name
+        document_embeddings = EmbeddingModelRegistry.get_document_embeddings()
+        collection_metadata = {"hnsw:space": "cosine", **AppConfig.HNSW_PROFILES[self.hnsw_profile]}
         db_exists = os.path.exists(self.persist_directory) and os.listdir(self.persist_directory)
 
         if db_exists:
             logger.info("Loading an existing Chroma database")
-            self.db = Chroma(
-                embedding_function=self.embedding_model,
+            # The metadata (and so the HNSW profile) only applies when the collection does not exist in the catalog yet
+            return Chroma(
+                embedding_function=document_embeddings,
                 persist_directory=self.persist_directory,
-                collection_name=self.collection_name,
+                collection_name=collection_name,
+                collection_metadata=collection_metadata,
             )
         else:
             logger.info(f"Creating a new Chroma base in the catalog: {self.persist_directory}")
-            self.db = Chroma.from_texts(
+            return Chroma.from_texts(
                 texts=[],
-                embedding=self.embedding_model,
+                embedding=document_embeddings,
                 persist_directory=self.persist_directory,
-                collection_name=self.collection_name,
-                collection_metadata={"hnsw:space": "cosine"},
+                collection_name=collection_name,
+                collection_metadata=collection_metadata,
             )
 
+    def _shard_of(self, decision_id: str) -> int:
+        return shard_index(decision_id, self.shards) if self.shards > 1 else 0
+
+    def _group_by_shard(self, decision_ids: List[str]) -> Dict[int, List[str]]:
+        groups = defaultdict(list)
+        for decision_id in decision_ids:
+            groups[self._shard_of(decision_id)].append(decision_id)
+        return groups
+
     def save_documents(self, documents: list[Document], ids: list[str], decision_id: str):
         if not self.db:
             self.load_or_create_db()
 
         try:
-            self.db.add_documents(documents=documents, ids=ids)
+            if self.shards > 1:
+                shards = defaultdict(list)
+                for position, document in enumerate(documents):
+                    shards[self._shard_of(document.metadata.get("document_id", "unknown"))].append(position)
+                for shard, positions in shards.items():
+                    self._write(self.shard_dbs[shard], [documents[i] for i in positions], [ids[i] for i in positions])
+            else:
+                self._write(self.db, documents, ids)
+            self.lexical_index.add_chunks(
+                ids,
+                [document.page_content for document in documents],
+                [document.metadata.get("document_id", "unknown") for document in documents],
+            )
             logger.info(f"Document: «{decision_id}» added to Vector Storage")
+            # Invalidates cached search results of this collection
+            CollectionVersion.bump(self.collection_name)
 
         except Exception as e:
             logger.exception(f"Error adding documents: {e}")
             raise
 
+    def upsert_decision_documents(self, documents: list[Document], ids: list[str], decision_ids: list[str],
+                                  embeddings: Optional[List[List[float]]] = None) -> Dict[str, int]:
+        """
+        Makes the stored chunks of the decisions match the given ones: only new or changed chunks are embedded
+        (unless their embeddings are given, e.g. by the ingestion pipeline) and written, chunks of these decisions
+        that are no longer produced are deleted with one call per shard.
+        """
+        if not self.db:
+            self.load_or_create_db()
+
+        try:
+            shard_chunks = defaultdict(list)
+            for position, (document, chunk_id) in enumerate(zip(documents, ids)):
+                shard_chunks[self._shard_of(document.metadata.get("document_id", "unknown"))].append(
+                    (document, chunk_id, embeddings[position] if embeddings is not None else None)
+                )
+
+            stats = {"written": 0, "unchanged": 0, "deleted": 0}
+            for shard, shard_decision_ids in self._group_by_shard(decision_ids).items():
+                shard_stats = self._sync_shard(self.shard_dbs[shard], shard_chunks[shard], shard_decision_ids)
+                for key, value in shard_stats.items():
+                    stats[key] += value
+
+            logger.info(f"Documents of {len(decision_ids)} decisions synced with Vector Storage: {stats}")
+            if stats["written"] or stats["deleted"]:
+                # Invalidates cached search results of this collection
+                CollectionVersion.bump(self.collection_name)
+            return stats
+
+        except Exception as e:
+            logger.exception(f"Error syncing documents: {e}")
+            raise
+
+    def _sync_shard(self, db: Chroma, chunks: List[Tuple[Document, str, Optional[List[float]]]],
+                    decision_ids: List[str]) -> Dict[str, int]:
+        existing = db._collection.get(where={"document_id": {"$in": decision_ids}}, include=["documents", "metadatas"])
+        stored = {
+            chunk_id: (text, metadata)
+            for chunk_id, text, metadata in zip(existing["ids"], existing["documents"], existing["metadatas"])
+        }
+
+        changed = [
+            (document, chunk_id, embedding) for document, chunk_id, embedding in chunks
+            if stored.get(chunk_id) != (document.page_content, document.metadata)
+        ]
+        new_ids = {chunk_id for _, chunk_id, _ in chunks}
+        orphans = [chunk_id for chunk_id in stored if chunk_id not in new_ids]
+
+        if changed:
+            # Both write paths upsert, the IDs that already exist are overwritten
+            self._write(
+                db,
+                [document for document, _, _ in changed],
+                [chunk_id for _, chunk_id, _ in changed],
+                [embedding for _, _, embedding in changed] if changed[0][2] is not None else None,
+            )
+            self.lexical_index.add_chunks(
+                [chunk_id for _, chunk_id, _ in changed],
+                [document.page_content for document, _, _ in changed],
+                [document.metadata.get("document_id", "unknown") for document, _, _ in changed],
+            )
+        if orphans:
+            db._collection.delete(ids=orphans)
+            self.lexical_index.delete_chunks(orphans)
+            if self.exact_index is not None:
+                self.exact_index.delete(orphans)
+
+        return {"written": len(changed), "unchanged": len(chunks) - len(changed), "deleted": len(orphans)}
+
+    def _write(self, db: Chroma, documents: List[Document], ids: List[str],
+               embeddings: Optional[List[List[float]]] = None):
+        if embeddings is None:
+            db.add_documents(documents=documents, ids=ids)
+            self._update_exact_index(db, ids)
+            return
+        # What add_documents does after embedding the texts
+        db._collection.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            documents=[document.page_content for document in documents],
+            metadatas=[document.metadata for document in documents],
+        )
+        if self.exact_index is not None:
+            self.exact_index.upsert(
+                ids, embeddings, [document.metadata.get("document_id", "unknown") for document in documents]
+            )
+
+    def _update_exact_index(self, db: Chroma, ids: List[str]):
+        if self.exact_index is None or not ids:
+            return
+        # The vectors are read back from Chroma, so both indexes hold exactly the same embeddings
+        written = db._collection.get(ids=ids, include=["embeddings", "metadatas"])
+        self.exact_index.upsert(
+            written["ids"],
+            written["embeddings"],
+            [(metadata or {}).get("document_id", "unknown") for metadata in written["metadatas"]],
+        )
+
+    def _exact_query(self, embedding: List[float], k: int, include: List[str],
+                     where: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Optional[Dict[str, list]]:
+        """
+        Answers the query from the exact index when its candidate set is small enough, None otherwise.
+        """
+        if "embeddings" in include or any(value is not None for value in kwargs.values()) \
+                or not self.exact_index_ready():
+            return None
+        document_ids = None
+        if where is not None:
+            document_ids = filter_decision_ids(where)
+            if document_ids is None:
+                return None
+
+        ranked = self.exact_index.search(
+            embedding, k, document_ids, max_candidates=AppConfig.EXACT_SEARCH_MAX_CANDIDATES
+        )
+        if ranked is None:
+            return None
+
+        if "documents" in include or "metadatas" in include:
+            documents = self.get_documents_by_ids([chunk_id for chunk_id, _ in ranked])
+            # Chunks deleted from Chroma by a concurrent write
+            ranked = [(chunk_id, score) for chunk_id, score in ranked if chunk_id in documents]
+        result = {"ids": [[chunk_id for chunk_id, _ in ranked]]}
+        if "documents" in include:
+            result["documents"] = [[documents[chunk_id].page_content for chunk_id, _ in ranked]]
+        if "metadatas" in include:
+            result["metadatas"] = [[documents[chunk_id].metadata for chunk_id, _ in ranked]]
+        if "distances" in include:
+            result["distances"] = [[1 - score for _, score in ranked]]
+        return result
+
+    def _query(self, embedding: List[float], k: int, include: List[str], **kwargs: Any) -> Dict[str, list]:
+        """
+        Exact search over small candidate sets, otherwise collection.query over all shards:
+        every shard returns its top k, the global top k is merged with a heap.
+        """
+        exact = self._exact_query(embedding, k, include, **kwargs)
+        if exact is not None:
+            return exact
+
+        if self.shards == 1:
+            return self.db._collection.query(query_embeddings=[embedding], n_results=k, include=include, **kwargs)
+
+        # Distances are needed for the merge even when the caller does not ask for them
+        shard_include = list(dict.fromkeys([*include, "distances"]))
+        futures = [
+            shard_executor.submit(
+                db._collection.query, query_embeddings=[embedding], n_results=k, include=shard_include, **kwargs
+            )
+            for db in self.shard_dbs
+        ]
+        shard_results = [future.result() for future in futures]
+
+        candidates = (
+            (distance, shard, position)
+            for shard, result in enumerate(shard_results)
+            for position, distance in enumerate(result["distances"][0])
+        )
+        top = heapq.nsmallest(k, candidates)
+
+        merged = {"ids": [[shard_results[shard]["ids"][0][position] for _, shard, position in top]]}
+        for field in shard_include:
+            merged[field] = [[shard_results[shard][field][0][position] for _, shard, position in top]]
+        return merged
+
     def similarity_search(self, query: str, with_score: bool = False, k: int = 10):
         if not self.db:
             self.load_or_create_db()
 
         logger.info(f"Search for similar documents: «{query}», top_k={k}")
         try:
+            embedding = self.embed_query(query)
+            result = self._query(embedding, k, include=["documents", "metadatas", "distances"])
+            results = [
+                (Document(page_content=doc, metadata=meta or {}), dist)
+                for doc, meta, dist in zip(result["documents"][0], result["metadatas"][0], result["distances"][0])
+            ]
             if with_score:
-                return self.db.similarity_search_with_score(query=query, k=k)
-            return self.db.similarity_search(query=query, k=k)
+                return results
+            return [doc for doc, _ in results]
         except Exception as e:
             logger.exception(f"Error while searching: {e}")
             raise
@@ -89,19 +418,14 @@ class ChromaDBHandler:
 
         # Get a vector from text if a string is passed
         if isinstance(query, str):
-            if not self.embedding_model:
-                self.init_embedding_model()
-            embedding = self.embedding_model.embed_query(query)
+            embedding = self.embed_query(query)
         else:
             embedding = query
 
-        # Access to collection
-        collection = self.db._collection
-
         try:
-            result = collection.query(
-                query_embeddings=[embedding],
-                n_results=k,
+            result = self._query(
+                embedding,
+                k,
                 where=filter,
                 where_document=where_document,
                 include=["documents", "metadatas", "distances"],
@@ -137,9 +461,9 @@ class ChromaDBHandler:
         logger.info("Vector search with relevance scores")
 
         try:
-            result = self.db._collection.query(
-                query_embeddings=[embedding],
-                n_results=k,
+            result = self._query(
+                embedding,
+                k,
                 where=filter,
                 where_document=where_document,
                 include=["documents", "metadatas", "distances"],
@@ -162,8 +486,132 @@ class ChromaDBHandler:
             logger.exception(f"Error when searching with relevance scores: {e}")
             raise
 
+    def get_documents_by_ids(self, ids: List[str]) -> Dict[str, Document]:
+        if not ids:
+            return {}
+        if not self.db:
+            self.load_or_create_db()
+
+        # Chunk IDs carry the decision ID, so each shard is only asked for its own chunks
+        shard_ids = defaultdict(list)
+        for chunk_id in ids:
+            decision_id = chunk_decision_id(chunk_id)
+            for shard in ([self._shard_of(decision_id)] if decision_id is not None else range(self.shards)):
+                shard_ids[shard].append(chunk_id)
+
+        documents = {}
+        for shard, chunk_ids in shard_ids.items():
+            result = self.shard_dbs[shard]._collection.get(ids=chunk_ids, include=["documents", "metadatas"])
+            documents.update(
+                (chunk_id, Document(page_content=doc, metadata=meta))
+                for chunk_id, doc, meta in zip(result["ids"], result["documents"], result["metadatas"])
+                if doc is not None
+            )
+        return documents
+
+    def lexical_search(self, query: str, k: int = 10) -> List[Tuple[Document, float]]:
+        """
+        BM25 search over the lexical index, the encoder is not involved.
+        """
+        logger.info(f"Lexical search: «{query}», top_k={k}")
+        ranked = self.lexical_index.search(query, k)
+        documents = self.get_documents_by_ids([chunk_id for chunk_id, _ in ranked])
+        return [(documents[chunk_id], score) for chunk_id, score in ranked if chunk_id in documents]
+
+    def _vector_ranking(self, query: str, k: int) -> List[str]:
+        result = self._query(self.embed_query(query), k, include=[])
+        return result.get("ids", [[]])[0]
+
+    def hybrid_search(self, query: str, k: int = 10, rrf_k: int = None) -> List[Tuple[Document, float]]:
+        """
+        Runs lexical and vector retrieval concurrently and merges them with reciprocal rank fusion.
+        Short queries with statute articles or case numbers are answered from the lexical index alone.
+        """
+        if not self.db:
+            self.load_or_create_db()
+        rrf_k = rrf_k or AppConfig.HYBRID_RRF_K
+
+        if EXACT_TERM.search(query) and len(TOKEN.findall(query)) <= 4:
+            results = self.lexical_search(query, k)
+            if results:
+                # Scored by rank like the fused results, so the score scale does not depend on the query
+                return [(document, 1 / (rrf_k + rank)) for rank, (document, _) in enumerate(results, start=1)]
+
+        logger.info(f"Hybrid search: «{query}», top_k={k}")
+        try:
+            lexical = search_executor.submit(self.lexical_index.search, query, k)
+            vector = search_executor.submit(self._vector_ranking, query, k)
+            rankings = [[chunk_id for chunk_id, _ in lexical.result()], vector.result()]
+
+            fused = {}
+            for ranking in rankings:
+                for rank, chunk_id in enumerate(ranking, start=1):
+                    fused[chunk_id] = fused.get(chunk_id, 0.0) + 1 / (rrf_k + rank)
+            top = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]
+
+            documents = self.get_documents_by_ids([chunk_id for chunk_id, _ in top])
+            return [(documents[chunk_id], score) for chunk_id, score in top if chunk_id in documents]
+
+        except Exception as e:
+            logger.exception(f"Error during hybrid search: {e}")
+            raise
+
+    def decision_search(
+            self, query: str, n: int = 10, max_k: int = None
+    ) -> List[Tuple[str, float, List[Tuple[Document, float]]]]:
+        """
+        Returns the top n distinct decisions as (document_id, max chunk score, [(chunk, score)]).
+        The candidate set is doubled until it covers n decisions or reaches max_k chunks.
+        """
+        if not self.db:
+            self.load_or_create_db()
+        max_k = max(max_k or AppConfig.DECISION_SEARCH_MAX_K, n)
+
+        logger.info(f"Decision search: «{query}», top_n={n}")
+        try:
+            embedding = self.embed_query(query)
+            k = min(n * AppConfig.DECISION_SEARCH_CHUNKS_PER_DECISION, max_k)
+            while True:
+                result = self._query(embedding, k, include=["metadatas", "distances"])
+                ids = result.get("ids", [[]])[0]
+                document_ids = np.array([(meta or {}).get("document_id", "unknown")
+                                         for meta in result.get("metadatas", [[]])[0]])
+                decision_ids, chunk_decisions = np.unique(document_ids, return_inverse=True)
+                # Stop when enough decisions are covered, the budget is spent or the collection is exhausted
+                if len(decision_ids) >= n or k >= max_k or len(ids) < k:
+                    break
+                k = min(k * 2, max_k)
+            if not ids:
+                return []
+
+            scores = 1 - np.asarray(result.get("distances", [[]])[0], dtype=np.float64)
+            max_scores = np.full(len(decision_ids), -np.inf)
+            np.maximum.at(max_scores, chunk_decisions, scores)
+
+            top = np.arange(len(decision_ids))
+            if len(top) > n:
+                top = np.argpartition(-max_scores, n - 1)[:n]
+            top = top[np.argsort(-max_scores[top])]
+
+            # Only the chunks of the returned decisions are loaded with their text
+            selected = np.flatnonzero(np.isin(chunk_decisions, top))
+            documents = self.get_documents_by_ids([ids[i] for i in selected])
+            chunks = defaultdict(list)
+            for i in selected:
+                if ids[i] in documents:
+                    chunks[chunk_decisions[i]].append((documents[ids[i]], float(scores[i])))
+
+            logger.info(f"Decision search covered {len(decision_ids)} decisions with k={k}")
+            return [(str(decision_ids[i]), float(max_scores[i]), chunks[i]) for i in top]
+
+        except Exception as e:
+            logger.exception(f"Error during decision search: {e}")
+            raise
+
     def close(self):
+        # The model and the Chroma client are owned by the registry, only detach from them here
         logger.info("Closing Chroma DB")
         self.db = None
+        self.shard_dbs = []
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
@@ -0,0 +1,138 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from chroma_client.query_cache import embedding_model_key, pack_vector, unpack_vector
+from config.app_config import AppConfig
+
+from typing import Dict, Iterable, List
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class ChunkEmbeddingStore:
+    """
+    Content-addressed on-disk store of chunk embeddings (SQLite file).
+    Keys are hashes of the model name and the chunk text, so identical boilerplate is embedded only once.
+    The file is kept under max_bytes by evicting the least recently used vectors; the total size is kept
+    in the store_meta table, updated in the same transaction as the vectors.
+    """
+
+    def __init__(self, path: str = None, max_bytes: int = None):
+        self.path = path or AppConfig.CHUNK_EMBEDDING_STORE_PATH
+        self.max_bytes = max_bytes or AppConfig.CHUNK_EMBEDDING_STORE_MAX_BYTES
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections are not shared with forked children
+        if self._connection is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS embeddings_accessed_at ON embeddings (accessed_at)")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS store_meta (name TEXT PRIMARY KEY, value INTEGER)")
+            # Stores created before the running total are summed once
+            self._connection.execute(
+                "INSERT OR IGNORE INTO store_meta SELECT 'total_bytes', COALESCE(SUM(size), 0) FROM embeddings"
+            )
+            self._connection.commit()
+            self._pid = os.getpid()
+        return self._connection
+
+    @staticmethod
+    def make_key(text: str) -> str:
+        return hashlib.sha256(f"{embedding_model_key()}\0{text}".encode()).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        keys = list(keys)
+        found = {}
+        with self._lock:
+            connection = self._connect()
+            # Stay well below SQLite's limit of bound parameters
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update((key, unpack_vector(vector)) for key, vector in rows)
+                if rows:
+                    connection.execute(
+                        f"UPDATE embeddings SET accessed_at = ? WHERE key IN ({','.join('?' * len(rows))})",
+                        [time.time(), *(key for key, _ in rows)],
+                    )
+            connection.commit()
+        return found
+
+    def put_many(self, vectors: Dict[str, List[float]]):
+        now = time.time()
+        rows = []
+        for key, vector in vectors.items():
+            packed = pack_vector(vector)
+            rows.append((key, packed, len(packed), now))
+
+        with self._lock:
+            connection = self._connect()
+            # Other processes write the same file: the sizes read here must not change before the update
+            connection.execute("BEGIN IMMEDIATE")
+            # Replaced vectors are subtracted, so the total counts every key once
+            replaced = 0
+            keys = [key for key, *_ in rows]
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                replaced += connection.execute(
+                    f"SELECT COALESCE(SUM(size), 0) FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchone()[0]
+            connection.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            connection.execute(
+                "UPDATE store_meta SET value = value + ? WHERE name = 'total_bytes'",
+                (sum(size for _, _, size, _ in rows) - replaced,),
+            )
+            total = connection.execute("SELECT value FROM store_meta WHERE name = 'total_bytes'").fetchone()[0]
+            connection.commit()
+            if total > self.max_bytes:
+                self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection):
+        connection.execute("BEGIN IMMEDIATE")
+        # Another process may have evicted in the meantime
+        total = connection.execute("SELECT value FROM store_meta WHERE name = 'total_bytes'").fetchone()[0]
+        if total <= self.max_bytes:
+            connection.commit()
+            return
+
+        # Free some headroom so that eviction does not run on every write
+        to_free = total - int(self.max_bytes * 0.9)
+        freed = 0
+        stale_keys = []
+        for key, size in connection.execute("SELECT key, size FROM embeddings ORDER BY accessed_at"):
+            stale_keys.append((key,))
+            freed += size
+            if freed >= to_free:
+                break
+        connection.executemany("DELETE FROM embeddings WHERE key = ?", stale_keys)
+        connection.execute("UPDATE store_meta SET value = value - ? WHERE name = 'total_bytes'", (freed,))
+        connection.commit()
+        logger.info(f"Chunk embedding store: evicted {len(stale_keys)} vectors ({freed / 2**20:.1f} MiB)")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            connection = self._connect()
+            count = connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            size = connection.execute("SELECT value FROM store_meta WHERE name = 'total_bytes'").fetchone()[0]
+        return {"vectors": count, "bytes": size, "max_bytes": self.max_bytes}
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
@@ -0,0 +1,163 @@
+import os
+import socket
+import socketserver
+import struct
+import threading
+
+from langchain_core.embeddings import Embeddings
+from config.app_config import AppConfig
+
+from typing import List
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Wire format, all integers little-endian:
+#   request:  u32 text count, then per text u32 byte length + UTF-8 bytes
+#   response: u8 status (0 - ok), then u32 count + u32 dimension + count * dimension float32,
+#             or u32 byte length + UTF-8 error message
+HEADER = struct.Struct("<I")
+RESPONSE_HEADER = struct.Struct("<BII")
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+MAX_TEXTS_PER_REQUEST = 256
+
+
+def _receive_exactly(connection: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = connection.recv_into(view[received:], size - received)
+        if not count:
+            raise ConnectionError("Embedding service connection closed")
+        received += count
+    return bytes(buffer)
+
+
+def encode_request(texts: List[str]) -> bytes:
+    parts = [HEADER.pack(len(texts))]
+    for text in texts:
+        data = text.encode()
+        parts.append(HEADER.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def read_request(connection: socket.socket) -> List[str]:
+    count, = HEADER.unpack(_receive_exactly(connection, HEADER.size))
+    texts = []
+    for _ in range(count):
+        size, = HEADER.unpack(_receive_exactly(connection, HEADER.size))
+        texts.append(_receive_exactly(connection, size).decode())
+    return texts
+
+
+class _EmbeddingRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # Clients keep their connection open and send one request after another
+        while True:
+            try:
+                texts = read_request(self.request)
+            except ConnectionError:
+                return
+
+            try:
+                vectors = self.server.encode(texts)
+            except Exception as e:
+                logger.exception(f"Embedding service: encoding {len(texts)} texts failed: {e}")
+                message = str(e).encode()
+                self.request.sendall(RESPONSE_HEADER.pack(STATUS_ERROR, len(message), 0) + message)
+                continue
+
+            dimension = len(vectors[0]) if vectors else 0
+            values = [value for vector in vectors for value in vector]
+            self.request.sendall(
+                RESPONSE_HEADER.pack(STATUS_OK, len(vectors), dimension) + struct.pack(f"<{len(values)}f", *values)
+            )
+
+
+class EmbeddingServer(socketserver.ThreadingUnixStreamServer):
+    """
+    Owns the only copy of the embedding model and encodes texts for the clients connected to its Unix socket.
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, embedding_model: Embeddings):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        os.makedirs(os.path.dirname(socket_path) or ".", exist_ok=True)
+        super().__init__(socket_path, _EmbeddingRequestHandler)
+        os.chmod(socket_path, 0o660)
+        self.socket_path = socket_path
+        self.embedding_model = embedding_model
+        # One forward pass at a time, the model already uses all intra-op threads
+        self._encode_lock = threading.Lock()
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        with self._encode_lock:
+            return self.embedding_model.embed_documents(texts)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class RemoteEmbeddings(Embeddings):
+    """
+    Client of the embedding service, a drop-in replacement for the in-process model.
+    Every thread keeps its own connection, reopened after a fork or a broken connection.
+    """
+
+    def __init__(self, socket_path: str = None, timeout: float = None):
+        self.socket_path = socket_path or AppConfig.EMBEDDING_SERVICE_SOCKET
+        self.timeout = timeout or AppConfig.EMBEDDING_SERVICE_TIMEOUT
+        self._local = threading.local()
+
+    def _connect(self) -> socket.socket:
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.settimeout(self.timeout)
+            connection.connect(self.socket_path)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _disconnect(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def _request(self, texts: List[str]) -> List[List[float]]:
+        connection = self._connect()
+        connection.sendall(encode_request(texts))
+        status, count, dimension = RESPONSE_HEADER.unpack(_receive_exactly(connection, RESPONSE_HEADER.size))
+        if status != STATUS_OK:
+            # For errors the count field holds the message length
+            message = _receive_exactly(connection, count).decode()
+            raise RuntimeError(f"Embedding service error: {message}")
+        values = struct.unpack(f"<{count * dimension}f", _receive_exactly(connection, 4 * count * dimension))
+        return [list(values[i * dimension:(i + 1) * dimension]) for i in range(count)]
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        try:
+            return self._request(texts)
+        except (ConnectionError, socket.timeout, OSError):
+            # The service may have been restarted since the connection was opened, retry once on a new one
+            self._disconnect()
+            return self._request(texts)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for start in range(0, len(texts), MAX_TEXTS_PER_REQUEST):
+            vectors.extend(self._encode(texts[start:start + MAX_TEXTS_PER_REQUEST]))
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0]
@@ -0,0 +1,65 @@
+import threading
+
+from langchain_core.embeddings import Embeddings
+from chroma_client.chunk_embedding_store import ChunkEmbeddingStore
+
+from typing import Dict, List
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class ChunkCachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that sends only chunks missing from the ChunkEmbeddingStore to the encoder.
+    """
+
+    def __init__(self, embedding_model: Embeddings, store: ChunkEmbeddingStore):
+        self.embedding_model = embedding_model
+        self.store = store
+        self._lock = threading.Lock()
+        self.counters = {"runs": 0, "chunks": 0, "hits": 0, "misses": 0}
+        self.last_run: Dict[str, float] = {}
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self.store.make_key(text) for text in texts]
+        vectors = self.store.get_many(set(keys))
+
+        # Identical chunks inside one run are encoded once as well
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+
+        if missing:
+            encoded = self.embedding_model.embed_documents(list(missing.values()))
+            new_vectors = dict(zip(missing.keys(), encoded))
+            self.store.put_many(new_vectors)
+            vectors.update(new_vectors)
+
+        hits = len(texts) - len(missing)
+        self._report(len(texts), hits, len(missing))
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embedding_model.embed_query(text)
+
+    def _report(self, chunks: int, hits: int, misses: int):
+        hit_ratio = hits / chunks if chunks else 0.0
+        with self._lock:
+            self.counters["runs"] += 1
+            self.counters["chunks"] += chunks
+            self.counters["hits"] += hits
+            self.counters["misses"] += misses
+            self.last_run = {"chunks": chunks, "hits": hits, "misses": misses, "hit_ratio": round(hit_ratio, 4)}
+        logger.info(f"Chunk embeddings: {hits}/{chunks} taken from the store (hit ratio {hit_ratio:.1%}), "
+                    f"{misses} sent to the encoder")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            chunks = self.counters["chunks"]
+            return {
+                **self.counters,
+                "hit_ratio": round(self.counters["hits"] / chunks, 4) if chunks else 0.0,
+                "last_run": dict(self.last_run),
+            }
@@ -0,0 +1,366 @@
+import fcntl
+import json
+import os
+import threading
+
+import numpy as np
+
+from contextlib import contextmanager
+from config.app_config import AppConfig
+
+from typing import Dict, List, Optional, Tuple
+
+import logging
+logger = logging.getLogger(__name__)
+
+ID_DTYPE = "S64"
+DOCUMENT_ID_DTYPE = "S32"
+VECTOR_DTYPES = ("float32", "float16", "int8")
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Positions of the k largest scores, best first.
+    """
+    if len(scores) > k:
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top])]
+
+
+def quantize(vectors: np.ndarray, dtype: np.dtype) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Converts normalized float32 vectors to the stored dtype. int8 is scaled per vector (symmetric, by its
+    largest component), so vectors can be added one batch at a time without a calibration pass.
+    Returns the stored vectors and the per-vector scales (None unless int8).
+    """
+    if dtype != np.int8:
+        return vectors.astype(dtype), None
+    scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127
+    return np.rint(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+
+class ExactVectorIndex:
+    """
+    Memory-mapped matrix of normalized chunk embeddings with parallel arrays of chunk and decision IDs,
+    searched with a blocked dot product. Mirrors all shards of a Chroma collection.
+
+    The matrix is float32, float16 or int8 (scalar-quantized). With a compressed matrix, rescore_factor * k
+    candidates are taken from it and rescored against a float32 copy of the vectors that stays on disk
+    (only the candidate rows are read), which recovers most of the quantization loss.
+
+    Writers of all processes serialize on a file lock. Rows are upserted in place, deleted rows keep an empty ID
+    until the files are compacted. Growing or compacting writes a new generation of the files, and meta.json,
+    replaced atomically, tells readers which generation, arrays and how many rows to map.
+    """
+    _instances: Dict[str, "ExactVectorIndex"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, directory: str, dtype: str = None, rescore_factor: int = None):
+        self.directory = directory
+        self.dtype = np.dtype(dtype or AppConfig.EXACT_INDEX_DTYPE)
+        if self.dtype.name not in VECTOR_DTYPES:
+            raise ValueError(f"Unsupported exact index dtype: «{self.dtype.name}»")
+        self.rescore_factor = AppConfig.EXACT_INDEX_RESCORE_FACTOR if rescore_factor is None else rescore_factor
+        self._lock = threading.Lock()
+        self._meta = None
+        self._meta_mtime = None
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._rows = None
+
+    @classmethod
+    def for_collection(cls, persist_directory: str, collection_name: str) -> "ExactVectorIndex":
+        # Kept inside the Chroma catalog, next to the collection it mirrors
+        directory = os.path.join(persist_directory, "exact_index", collection_name)
+        with cls._instances_lock:
+            if directory not in cls._instances:
+                cls._instances[directory] = cls(directory)
+            return cls._instances[directory]
+
+    def _path(self, name: str, generation: int = None) -> str:
+        return os.path.join(self.directory, name if generation is None else f"{name}-{generation}.npy")
+
+    @contextmanager
+    def _file_lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self):
+        """
+        Remaps the files when another process (or a resize) has written a new meta.json.
+        """
+        try:
+            # meta.json is replaced, never rewritten, so the inode changes even within the mtime resolution
+            stat = os.stat(self._path("meta.json"))
+            mtime = (stat.st_ino, stat.st_mtime_ns)
+        except FileNotFoundError:
+            self._meta, self._meta_mtime, self._arrays, self._rows = None, None, {}, None
+            return
+        if mtime == self._meta_mtime:
+            return
+
+        with open(self._path("meta.json")) as meta_file:
+            meta = json.load(meta_file)
+        if self._meta is None or meta["generation"] != self._meta["generation"]:
+            self._arrays = {
+                name: np.load(self._path(name, meta["generation"]), mmap_mode="r+") for name in meta["arrays"]
+            }
+        self._meta, self._meta_mtime = meta, mtime
+        # The row lookup is only needed by writers and rebuilt lazily
+        self._rows = None
+
+    def _write_meta(self, **changes):
+        meta = {**self._meta, **changes, "version": self._meta["version"] + 1}
+        temporary_path = self._path("meta.json.tmp")
+        with open(temporary_path, "w") as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(temporary_path, self._path("meta.json"))
+        stat = os.stat(self._path("meta.json"))
+        self._meta, self._meta_mtime = meta, (stat.st_ino, stat.st_mtime_ns)
+
+    def _allocate(self, generation: int, capacity: int, dimension: int, dtype: np.dtype,
+                  names: List[str]) -> Dict[str, np.ndarray]:
+        shapes = {
+            "vectors": (dtype, (capacity, dimension)),
+            "ids": (ID_DTYPE, (capacity,)),
+            "document_ids": (DOCUMENT_ID_DTYPE, (capacity,)),
+            "scales": (np.float32, (capacity,)),
+            "full": (np.float32, (capacity, dimension)),
+        }
+        return {
+            name: np.lib.format.open_memmap(self._path(name, generation), "w+", *shapes[name]) for name in names
+        }
+
+    def _create(self, capacity: int, dimension: int):
+        names = ["vectors", "ids", "document_ids"]
+        if self.dtype == np.int8:
+            names.append("scales")
+        if self.dtype != np.float32 and self.rescore_factor:
+            names.append("full")
+        self._arrays = self._allocate(0, capacity, dimension, self.dtype, names)
+        self._meta = {"generation": 0, "count": 0, "deleted": 0, "dimension": dimension, "dtype": self.dtype.name,
+                      "arrays": names, "version": 0}
+
+    def _rewrite(self, capacity: int, keep: Optional[np.ndarray] = None):
+        """
+        Copies the rows into a new generation of the files with the given capacity. All rows keep their positions,
+        unless only the keep rows are compacted to the front.
+        """
+        old_generation = self._meta["generation"]
+        generation = old_generation + 1
+        deleted = self._meta["deleted"] if keep is None else 0
+        keep = np.arange(self._meta["count"]) if keep is None else keep
+        arrays = self._allocate(
+            generation, capacity, self._meta["dimension"], self._arrays["vectors"].dtype, self._meta["arrays"]
+        )
+        for start in range(0, len(keep), AppConfig.EXACT_INDEX_BLOCK_ROWS):
+            rows = keep[start:start + AppConfig.EXACT_INDEX_BLOCK_ROWS]
+            for name, array in arrays.items():
+                array[start:start + len(rows)] = self._arrays[name][rows]
+        for array in arrays.values():
+            array.flush()
+
+        self._arrays = arrays
+        self._write_meta(generation=generation, count=len(keep), deleted=deleted)
+        self._rows = None
+        # Readers that still map the old files keep them alive until they remap
+        for name in arrays:
+            os.remove(self._path(name, old_generation))
+
+    def _row_lookup(self) -> Dict[bytes, int]:
+        if self._rows is None:
+            count = self._meta["count"]
+            self._rows = {
+                chunk_id: row for row, chunk_id in enumerate(self._arrays["ids"][:count].tolist()) if chunk_id
+            }
+        return self._rows
+
+    @staticmethod
+    def _encode(values: List[str], dtype: str) -> List[bytes]:
+        encoded = [value.encode() for value in values]
+        length = np.dtype(dtype).itemsize
+        too_long = [value for value in encoded if len(value) > length]
+        if too_long:
+            raise ValueError(f"IDs longer than {length} bytes cannot be indexed: {too_long[:3]}")
+        return encoded
+
+    def upsert(self, ids: List[str], embeddings, document_ids: List[str]):
+        if not ids:
+            return
+        vectors = np.array(embeddings, dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        chunk_ids = self._encode(ids, ID_DTYPE)
+        decision_ids = self._encode(document_ids, DOCUMENT_ID_DTYPE)
+
+        with self._lock, self._file_lock():
+            self._refresh()
+            if self._meta is None:
+                self._create(max(AppConfig.EXACT_INDEX_INITIAL_ROWS, len(ids)), vectors.shape[1])
+            elif vectors.shape[1] != self._meta["dimension"]:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} != index dimension {self._meta['dimension']}")
+
+            lookup = self._row_lookup()
+            count = self._meta["count"]
+            rows = []
+            for chunk_id in chunk_ids:
+                row = lookup.get(chunk_id)
+                if row is None:
+                    row = lookup[chunk_id] = count
+                    count += 1
+                rows.append(row)
+            if count > len(self._arrays["ids"]):
+                # Positions are kept, so the rows assigned above stay valid
+                self._rewrite(max(count, 2 * len(self._arrays["ids"])))
+
+            rows = np.asarray(rows)
+            # The stored dtype, not the configured one, in case the configuration changed since the files were created
+            stored, scales = quantize(vectors, self._arrays["vectors"].dtype)
+            self._arrays["vectors"][rows] = stored
+            if "scales" in self._arrays:
+                self._arrays["scales"][rows] = scales
+            if "full" in self._arrays:
+                self._arrays["full"][rows] = vectors
+            self._arrays["ids"][rows] = chunk_ids
+            self._arrays["document_ids"][rows] = decision_ids
+            for array in self._arrays.values():
+                array.flush()
+            self._write_meta(count=count)
+            self._rows = lookup
+
+    def delete(self, ids: List[str]):
+        if not ids:
+            return
+        with self._lock, self._file_lock():
+            self._refresh()
+            if self._meta is None:
+                return
+            lookup = self._row_lookup()
+            rows = [lookup.pop(chunk_id) for chunk_id in self._encode(ids, ID_DTYPE) if chunk_id in lookup]
+            if not rows:
+                return
+            for name in ("ids", "document_ids"):
+                self._arrays[name][rows] = b""
+                self._arrays[name].flush()
+            deleted = self._meta["deleted"] + len(rows)
+            self._write_meta(deleted=deleted)
+
+            count = self._meta["count"]
+            if deleted > max(AppConfig.EXACT_INDEX_INITIAL_ROWS, count // 4):
+                logger.info(f"Compacting the exact index {self.directory}: {deleted} of {count} rows deleted")
+                self._rewrite(len(self._arrays["ids"]), keep=np.flatnonzero(self._arrays["ids"][:count]))
+
+    def _snapshot(self) -> Optional[Tuple[Dict[str, np.ndarray], int]]:
+        with self._lock:
+            self._refresh()
+            if self._meta is None:
+                return None
+            count = self._meta["count"]
+            return {name: array[:count] for name, array in self._arrays.items()}, count - self._meta["deleted"]
+
+    def version(self) -> Optional[Tuple[int, int]]:
+        """
+        Changes with every write (meta.json is replaced), None while the index has not been created.
+        """
+        with self._lock:
+            self._refresh()
+            return self._meta_mtime
+
+    def count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self._meta["count"] - self._meta["deleted"] if self._meta else 0
+
+    @staticmethod
+    def _scores(arrays: Dict[str, np.ndarray], rows, query: np.ndarray) -> np.ndarray:
+        scores = arrays["vectors"][rows].astype(np.float32) @ query
+        if "scales" in arrays:
+            scores *= arrays["scales"][rows]
+        return scores
+
+    def search(self, embedding: List[float], k: int, document_ids: List[str] = None,
+               max_candidates: int = None, rescore: bool = True) -> Optional[List[Tuple[str, float]]]:
+        """
+        Returns (chunk_id, cosine similarity) of the top k, optionally among the chunks of the given decisions.
+        None when the index has not been created or more than max_candidates chunks would have to be scanned.
+        """
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return None
+        if k <= 0:
+            return []
+        arrays, live = snapshot
+        ids = arrays["ids"]
+        query = np.array(embedding, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        rescore = rescore and "full" in arrays
+        candidates = k * self.rescore_factor if rescore else k
+
+        if document_ids is not None:
+            wanted = [document_id.encode() for document_id in document_ids]
+            rows = np.flatnonzero(np.isin(arrays["document_ids"], wanted))
+            if max_candidates is not None and len(rows) > max_candidates:
+                return None
+            scores = self._scores(arrays, rows, query)
+        else:
+            if max_candidates is not None and live > max_candidates:
+                return None
+            # Blocks bound the float32 copies of compressed rows, and only the candidates are kept per block
+            rows = np.empty(0, dtype=np.int64)
+            scores = np.empty(0, dtype=np.float32)
+            for start in range(0, len(ids), AppConfig.EXACT_INDEX_BLOCK_ROWS):
+                block = self._scores(arrays, slice(start, start + AppConfig.EXACT_INDEX_BLOCK_ROWS), query)
+                block[ids[start:start + len(block)] == b""] = -np.inf
+                best = top_k(block, candidates)
+                rows = np.concatenate([rows, best + start])
+                scores = np.concatenate([scores, block[best]])
+                best = top_k(scores, candidates)
+                rows, scores = rows[best], scores[best]
+
+        if rescore:
+            best = top_k(scores, candidates)
+            rows, scores = rows[best], scores[best]
+            finite = np.isfinite(scores)
+            rows, scores = rows[finite], scores[finite]
+            # Sorted rows read the full-precision file sequentially
+            order = np.argsort(rows)
+            rows, scores = rows[order], arrays["full"][rows[order]] @ query
+
+        return [(ids[rows[i]].decode(), float(scores[i])) for i in top_k(scores, k) if np.isfinite(scores[i])]
+
+    def clear(self):
+        with self._lock, self._file_lock():
+            self._refresh()
+            if self._meta is not None:
+                os.remove(self._path("meta.json"))
+                for name in self._meta["arrays"]:
+                    os.remove(self._path(name, self._meta["generation"]))
+            self._refresh()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Rows, and the bytes of the matrix scanned by searches (search_bytes) and of the float32 copy
+        only read for rescoring (rescore_bytes).
+        """
+        with self._lock:
+            self._refresh()
+            if self._meta is None:
+                return {"rows": 0, "deleted": 0, "capacity": 0, "dtype": self.dtype.name,
+                        "search_bytes": 0, "rescore_bytes": 0}
+            count = self._meta["count"]
+            search_bytes = self._arrays["vectors"][:count].nbytes
+            if "scales" in self._arrays:
+                search_bytes += self._arrays["scales"][:count].nbytes
+            return {
+                "rows": count - self._meta["deleted"],
+                "deleted": self._meta["deleted"],
+                "capacity": len(self._arrays["ids"]),
+                "dtype": self._meta["dtype"],
+                "search_bytes": search_bytes,
+                "rescore_bytes": self._arrays["full"][:count].nbytes if "full" in self._arrays else 0,
+            }
@@ -0,0 +1,164 @@
+import heapq
+import math
+import os
+import re
+import sqlite3
+import threading
+
+from collections import Counter, defaultdict
+from config.app_config import AppConfig
+
+from typing import Dict, List, Tuple
+
+import logging
+logger = logging.getLogger(__name__)
+
+TOKEN = re.compile(r"\w+")
+# Case and proceeding numbers ("910/12345/23", "2-123/2020") are also indexed whole, not only as their parts
+JOINED_NUMBER = re.compile(r"\d+(?:[/-]\d+)+")
+
+
+def tokenize(text: str) -> List[str]:
+    text = text.lower()
+    return TOKEN.findall(text) + JOINED_NUMBER.findall(text)
+
+
+class LexicalIndex:
+    """
+    On-disk BM25 inverted index (SQLite file) over the same chunk IDs that are stored in Chroma.
+    """
+    _instances: Dict[str, "LexicalIndex"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+
+    @classmethod
+    def for_collection(cls, persist_directory: str, collection_name: str) -> "LexicalIndex":
+        # Kept inside the Chroma catalog, next to the collection it mirrors
+        path = os.path.join(persist_directory, "lexical_index", f"{collection_name}.sqlite3")
+        with cls._instances_lock:
+            if path not in cls._instances:
+                cls._instances[path] = cls(path)
+            return cls._instances[path]
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections are not shared with forked children
+        if self._connection is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._connection.executescript("""
+                PRAGMA journal_mode=WAL;
+                CREATE TABLE IF NOT EXISTS chunks (
+                    chunk_id TEXT PRIMARY KEY, document_id TEXT NOT NULL, length INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS postings (
+                    term TEXT NOT NULL, chunk_id TEXT NOT NULL, tf INTEGER NOT NULL, PRIMARY KEY (term, chunk_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS postings_chunk_id ON postings (chunk_id);
+                CREATE INDEX IF NOT EXISTS chunks_document_id ON chunks (document_id);
+                CREATE TABLE IF NOT EXISTS totals (
+                    id INTEGER PRIMARY KEY CHECK (id = 1), chunk_count INTEGER NOT NULL, total_length INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO totals VALUES (1, 0, 0);
+            """)
+            self._connection.commit()
+            self._pid = os.getpid()
+        return self._connection
+
+    def add_chunks(self, ids: List[str], texts: List[str], document_ids: List[str]):
+        """
+        Indexes the chunks, replacing previously indexed chunks with the same IDs.
+        """
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                self._delete(connection, ids)
+                chunk_rows = []
+                posting_rows = []
+                total_length = 0
+                for chunk_id, text, document_id in zip(ids, texts, document_ids):
+                    tokens = tokenize(text)
+                    total_length += len(tokens)
+                    chunk_rows.append((chunk_id, document_id, len(tokens)))
+                    posting_rows.extend((term, chunk_id, tf) for term, tf in Counter(tokens).items())
+                connection.executemany("INSERT INTO chunks VALUES (?, ?, ?)", chunk_rows)
+                connection.executemany("INSERT INTO postings VALUES (?, ?, ?)", posting_rows)
+                connection.execute(
+                    "UPDATE totals SET chunk_count = chunk_count + ?, total_length = total_length + ?",
+                    (len(chunk_rows), total_length),
+                )
+
+    def delete_chunks(self, ids: List[str]):
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                self._delete(connection, ids)
+
+    @staticmethod
+    def _delete(connection: sqlite3.Connection, ids: List[str]):
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            count, length = connection.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks WHERE chunk_id IN ({placeholders})", batch
+            ).fetchone()
+            if not count:
+                continue
+            connection.execute(f"DELETE FROM postings WHERE chunk_id IN ({placeholders})", batch)
+            connection.execute(f"DELETE FROM chunks WHERE chunk_id IN ({placeholders})", batch)
+            connection.execute(
+                "UPDATE totals SET chunk_count = chunk_count - ?, total_length = total_length - ?", (count, length)
+            )
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Returns (chunk_id, BM25 score) pairs of the best k chunks.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        with self._lock:
+            connection = self._connect()
+            chunk_count, total_length = connection.execute(
+                "SELECT chunk_count, total_length FROM totals"
+            ).fetchone()
+            if not chunk_count:
+                return []
+            average_length = total_length / chunk_count
+
+            frequencies = {
+                term: connection.execute("SELECT COUNT(*) FROM postings WHERE term = ?", (term,)).fetchone()[0]
+                for term in terms
+            }
+            # Terms present in most chunks barely change the ranking but cost a full posting list scan
+            max_df = AppConfig.LEXICAL_MAX_DF_RATIO * chunk_count
+            selective = [term for term in terms if 0 < frequencies[term] <= max_df]
+            terms = selective or [term for term in terms if frequencies[term]]
+
+            scores = defaultdict(float)
+            for term in terms:
+                df = frequencies[term]
+                idf = math.log(1 + (chunk_count - df + 0.5) / (df + 0.5))
+                rows = connection.execute(
+                    "SELECT p.chunk_id, p.tf, c.length FROM postings p JOIN chunks c ON c.chunk_id = p.chunk_id "
+                    "WHERE p.term = ?", (term,)
+                )
+                for chunk_id, tf, length in rows:
+                    norm = tf + self.k1 * (1 - self.b + self.b * length / average_length)
+                    scores[chunk_id] += idf * tf * (self.k1 + 1) / norm
+
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            chunk_count, total_length = self._connect().execute(
+                "SELECT chunk_count, total_length FROM totals"
+            ).fetchone()
+        return {"chunks": chunk_count, "tokens": total_length}
@@ -0,0 +1,171 @@
+import os
+import resource
+import threading
+import time
+
+from langchain_huggingface import HuggingFaceEmbeddings
+from chroma_client.chunk_embedding_store import ChunkEmbeddingStore
+from chroma_client.embeddings import ChunkCachedEmbeddings
+from config.app_config import AppConfig
+
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def _current_rss_bytes() -> int:
+    # /proc gives the current RSS, getrusage only the peak (in KB on Linux)
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _parameters_bytes(embedding_model) -> int:
+    if hasattr(embedding_model, "model_bytes"):
+        return embedding_model.model_bytes
+    client = getattr(embedding_model, "_client", None)
+    if client is None or not hasattr(client, "parameters"):
+        return 0
+    return sum(p.numel() * p.element_size() for p in client.parameters())
+
+
+def create_embedding_model(backend: str):
+    """
+    Builds the embedding model for the backend selected by AppConfig.EMBEDDING_BACKEND.
+    """
+    if backend == "torch":
+        return HuggingFaceEmbeddings(
+            model_name=AppConfig.LM_MODEL_NAME,
+            model_kwargs={"device": "cpu"},
+            encode_kwargs={"normalize_embeddings": True, "batch_size": AppConfig.EMBEDDING_BATCH_SIZE},
+        )
+    if backend == "onnx":
+        from chroma_client.onnx_embeddings import OnnxEmbeddings
+        return OnnxEmbeddings()
+    if backend == "service":
+        # The model lives in the run_embedding_service process, this one only holds a socket client
+        from chroma_client.embedding_service import RemoteEmbeddings
+        return RemoteEmbeddings()
+    raise ValueError(f"Unknown embedding backend: «{backend}»")
+
+
+class EmbeddingModelRegistry:
+    """
+    Process-wide holder of the embedding model and the Chroma handles built on top of it.
+    The model is loaded once per process and shared by every ChromaDBHandler.
+    """
+    _lock = threading.RLock()
+    _embedding_model = None
+    _document_embeddings = None
+    _databases: Dict[Tuple[str, str], Any] = {}
+    _stats: Dict[str, Any] = {
+        "pid": None,
+        "model_name": None,
+        "backend": None,
+        "load_count": 0,
+        "load_time_seconds": None,
+        "rss_delta_bytes": None,
+        "parameters_bytes": None,
+    }
+
+    @classmethod
+    def get_embedding_model(cls):
+        if cls._embedding_model is None:
+            with cls._lock:
+                if cls._embedding_model is None:
+                    cls._embedding_model = cls._load_embedding_model()
+        return cls._embedding_model
+
+    @classmethod
+    def _load_embedding_model(cls):
+        logger.info(f"Loading the embedding model «{AppConfig.LM_MODEL_NAME}» "
+                    f"with the {AppConfig.EMBEDDING_BACKEND} backend (pid={os.getpid()})")
+        rss_before = _current_rss_bytes()
+        started = time.perf_counter()
+
+        embedding_model = create_embedding_model(AppConfig.EMBEDDING_BACKEND)
+
+        load_time = time.perf_counter() - started
+        cls._stats.update({
+            "pid": os.getpid(),
+            "model_name": AppConfig.LM_MODEL_NAME,
+            "backend": AppConfig.EMBEDDING_BACKEND,
+            "load_count": cls._stats["load_count"] + 1,
+            "load_time_seconds": round(load_time, 3),
+            "rss_delta_bytes": _current_rss_bytes() - rss_before,
+            "parameters_bytes": _parameters_bytes(embedding_model),
+        })
+        logger.info(
+            f"Embedding model loaded in {load_time:.2f}s, "
+            f"RSS +{cls._stats['rss_delta_bytes'] / 2**20:.1f} MiB, "
+            f"load count in this process: {cls._stats['load_count']}"
+        )
+        return embedding_model
+
+    @classmethod
+    def get_document_embeddings(cls):
+        """
+        Embeddings used to write chunks: the shared model behind the chunk embedding store, if it is enabled.
+        """
+        if not AppConfig.CHUNK_EMBEDDING_STORE_ENABLED:
+            return cls.get_embedding_model()
+        if cls._document_embeddings is None:
+            with cls._lock:
+                if cls._document_embeddings is None:
+                    cls._document_embeddings = ChunkCachedEmbeddings(cls.get_embedding_model(), ChunkEmbeddingStore())
+        return cls._document_embeddings
+
+    @classmethod
+    def use_chunk_embedding_store(cls, store: Optional[ChunkEmbeddingStore]):
+        """
+        Puts the given store behind the document embeddings (benchmarks), None goes back to the configured one.
+        Collections opened before keep the embeddings they were opened with.
+        """
+        with cls._lock:
+            cls._document_embeddings = (
+                ChunkCachedEmbeddings(cls.get_embedding_model(), store) if store is not None else None
+            )
+
+    @classmethod
+    def get_db(cls, persist_directory: str, collection_name: str, factory: Callable[[], Any]):
+        key = (persist_directory, collection_name)
+        db = cls._databases.get(key)
+        if db is None:
+            with cls._lock:
+                db = cls._databases.get(key)
+                if db is None:
+                    db = factory()
+                    cls._databases[key] = db
+        return db
+
+    @classmethod
+    def warm_up(cls):
+        """
+        Loads the model and opens the default collection so that the first request does not pay for it.
+        """
+        from chroma_client.chroma_storage import ChromaDBHandler
+
+        try:
+            ChromaDBHandler().load_or_create_db()
+        except Exception as e:
+            logger.exception(f"Embedding model warm-up failed: {e}")
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        return {
+            **cls._stats,
+            "loaded": cls._embedding_model is not None,
+            "open_collections": [name for _, name in cls._databases],
+            "current_rss_bytes": _current_rss_bytes(),
+            "chunk_embeddings": cls._document_embeddings.stats() if cls._document_embeddings else None,
+        }
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._embedding_model = None
+            cls._document_embeddings = None
+            cls._databases.clear()
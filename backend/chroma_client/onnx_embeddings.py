@@ -0,0 +1,173 @@
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from langchain_core.embeddings import Embeddings
+from config.app_config import AppConfig
+
+from typing import List, Optional
+
+import logging
+logger = logging.getLogger(__name__)
+
+QUANTIZED_MODEL_FILE = "model_quantized.onnx"
+FP32_MODEL_FILE = "model.onnx"
+SETTINGS_FILE = "onnx_settings.json"
+
+
+def exported_model_name(model_dir: str) -> Optional[str]:
+    """
+    Name of the model exported to model_dir, None when there is no complete export.
+    """
+    try:
+        with open(os.path.join(model_dir, SETTINGS_FILE)) as settings_file:
+            return json.load(settings_file)["model_name"]
+    except FileNotFoundError:
+        return None
+
+
+def export_quantized_model(model_name: str, model_dir: str, force: bool = False) -> bool:
+    """
+    Exports the model into model_dir unless it already holds an export of it (or force is set).
+    Concurrent exports wait on a file lock, and the export is built in a temporary directory renamed into place,
+    so model_dir never holds a partial export. Returns whether an export was written.
+    """
+    parent = os.path.dirname(os.path.abspath(model_dir))
+    os.makedirs(parent, exist_ok=True)
+    with open(os.path.abspath(model_dir) + ".lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        if not force and exported_model_name(model_dir) == model_name:
+            return False
+
+        build_dir = tempfile.mkdtemp(prefix=".onnx-export-", dir=parent)
+        try:
+            _export(model_name, build_dir)
+            if os.path.exists(model_dir):
+                # Processes that already loaded the old files keep them open
+                old_dir = tempfile.mkdtemp(prefix=".onnx-old-", dir=parent)
+                os.rename(model_dir, os.path.join(old_dir, "model"))
+                os.rename(build_dir, model_dir)
+                shutil.rmtree(old_dir, ignore_errors=True)
+            else:
+                os.rename(build_dir, model_dir)
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
+        return True
+
+
+def _export(model_name: str, model_dir: str):
+    """
+    Exports the sentence-transformers encoder to ONNX and applies dynamic int8 quantization to its weights.
+    The tokenizer and max_seq_length are saved next to the model.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    logger.info(f"Exporting «{model_name}» to ONNX in {model_dir}")
+    sentence_transformer = SentenceTransformer(model_name, device="cpu")
+    tokenizer = sentence_transformer.tokenizer
+
+    class Encoder(torch.nn.Module):
+        def __init__(self, transformer):
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, input_ids, attention_mask):
+            return self.transformer(input_ids=input_ids, attention_mask=attention_mask)[0]
+
+    encoder = Encoder(sentence_transformer[0].auto_model).eval()
+    sample = tokenizer(["Приклад тексту судового рішення"], return_tensors="pt")
+    fp32_path = os.path.join(model_dir, FP32_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            encoder,
+            (sample["input_ids"], sample["attention_mask"]),
+            fp32_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=14,
+        )
+
+    quantize_dynamic(fp32_path, os.path.join(model_dir, QUANTIZED_MODEL_FILE), weight_type=QuantType.QInt8)
+    tokenizer.save_pretrained(model_dir)
+    with open(os.path.join(model_dir, SETTINGS_FILE), "w") as settings_file:
+        json.dump({"model_name": model_name, "max_seq_length": sentence_transformer.max_seq_length}, settings_file)
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    CPU embedding backend running the int8-quantized ONNX export of the model through onnxruntime.
+    Mean pooling and normalization reproduce the sentence-transformers pipeline.
+    """
+
+    def __init__(self, model_name: str = None, model_dir: str = None, batch_size: int = None):
+        try:
+            import onnxruntime
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise ImportError("The «onnx» embedding backend requires onnxruntime: pip install onnxruntime onnx") from e
+
+        self.model_name = model_name or AppConfig.LM_MODEL_NAME
+        self.model_dir = model_dir or AppConfig.ONNX_MODEL_DIR
+        self.batch_size = batch_size or AppConfig.EMBEDDING_BATCH_SIZE
+
+        # Every worker process loads the model, exporting is a separate step: manage.py export_onnx_model
+        model_path = os.path.join(self.model_dir, QUANTIZED_MODEL_FILE)
+        try:
+            with open(os.path.join(self.model_dir, SETTINGS_FILE)) as settings_file:
+                settings = json.load(settings_file)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"No ONNX export in {self.model_dir}, run: python manage.py export_onnx_model")
+        if settings["model_name"] != self.model_name:
+            raise ValueError(f"{self.model_dir} holds an export of «{settings['model_name']}», "
+                             f"not of «{self.model_name}», run: python manage.py export_onnx_model")
+        self.max_seq_length = settings["max_seq_length"]
+
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if AppConfig.ONNX_INTRA_OP_THREADS:
+            options.intra_op_num_threads = AppConfig.ONNX_INTRA_OP_THREADS
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.model_bytes = os.path.getsize(model_path)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors="np",
+        )
+        attention_mask = encoded["attention_mask"].astype(np.int64)
+        last_hidden_state = self.session.run(
+            None,
+            {"input_ids": encoded["input_ids"].astype(np.int64), "attention_mask": attention_mask},
+        )[0]
+
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (last_hidden_state * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # Batches of similar length need less padding, the original order is restored afterwards
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for i, vector in zip(batch, self._encode([texts[i] for i in batch]).tolist()):
+                vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0].tolist()
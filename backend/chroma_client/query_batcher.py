@@ -0,0 +1,121 @@
+import os
+import queue
+import threading
+import time
+
+from bisect import bisect_left
+from concurrent.futures import Future
+from chroma_client.model_registry import EmbeddingModelRegistry
+from config.app_config import AppConfig
+
+from typing import Dict, List, Sequence
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    """
+    Counts observations per bucket, an observation goes to the first bucket whose upper bound is not below it.
+    """
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = list(bounds)
+        self.buckets = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def snapshot(self) -> Dict[str, object]:
+        labels = [f"<={bound:g}" for bound in self.bounds] + [f">{self.bounds[-1]:g}"]
+        return {
+            "buckets": dict(zip(labels, self.buckets)),
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else 0.0,
+        }
+
+
+class QueryMicroBatcher:
+    """
+    Collects the query embeddings requested by concurrent searches for up to max_wait_ms
+    (or until max_batch_size queries are waiting) and encodes them with one embed_documents call.
+    Each caller blocks on its own future and gets its own vector back.
+    """
+
+    def __init__(self, max_batch_size: int = None, max_wait_ms: float = None):
+        self.max_batch_size = max_batch_size or AppConfig.QUERY_BATCH_MAX_SIZE
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else AppConfig.QUERY_BATCH_MAX_WAIT_MS) / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.batch_sizes = Histogram([1, 2, 4, 8, 16, 32, 64])
+        self.queue_waits_ms = Histogram([0.5, 1, 2, 5, 10, 20, 50, 100])
+        self.counters = {"queries": 0, "batches": 0, "errors": 0}
+
+    def _ensure_worker(self):
+        # Threads do not survive a fork, every process starts its own worker
+        if self._thread is None or self._pid != os.getpid():
+            with self._lock:
+                if self._thread is None or self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                    self._thread = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+                    self._thread.start()
+                    self._pid = os.getpid()
+
+    def embed(self, query: str) -> List[float]:
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((query, time.perf_counter(), future))
+        return future.result()
+
+    def _run(self):
+        requests = self._queue
+        while True:
+            batch = [requests.get()]
+            deadline = batch[0][1] + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                try:
+                    batch.append(requests.get(timeout=timeout) if timeout > 0 else requests.get_nowait())
+                except queue.Empty:
+                    break
+            self._encode(batch)
+
+    def _encode(self, batch: list):
+        started = time.perf_counter()
+        with self._lock:
+            self.counters["queries"] += len(batch)
+            self.counters["batches"] += 1
+            self.batch_sizes.observe(len(batch))
+            for _, queued_at, _ in batch:
+                self.queue_waits_ms.observe((started - queued_at) * 1000)
+
+        try:
+            # Same vectors as embed_query: the backends encode queries and documents alike
+            vectors = EmbeddingModelRegistry.get_embedding_model().embed_documents([query for query, _, _ in batch])
+        except Exception as e:
+            logger.exception(f"Query batch of {len(batch)} failed: {e}")
+            with self._lock:
+                self.counters["errors"] += 1
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, _, future), vector in zip(batch, vectors):
+            future.set_result(vector)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                **self.counters,
+                "batch_size": self.batch_sizes.snapshot(),
+                "queue_wait_ms": self.queue_waits_ms.snapshot(),
+            }
+
+
+query_batcher = QueryMicroBatcher()
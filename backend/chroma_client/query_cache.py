@@ -0,0 +1,134 @@
+import hashlib
+import struct
+import threading
+import unicodedata
+
+from collections import OrderedDict
+from redis import RedisError
+from config.app_config import AppConfig
+from config.redis_client import get_redis_client
+
+from typing import Callable, Dict, List, Optional
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def embedding_model_key() -> str:
+    """
+    Identifies the vectors the configured model produces: its name and the backend that actually encodes,
+    which for the "service" backend is the one run by the embedding service.
+    """
+    backend = AppConfig.EMBEDDING_BACKEND
+    if backend == "service":
+        backend = AppConfig.EMBEDDING_SERVICE_BACKEND
+    return f"{AppConfig.LM_MODEL_NAME}:{backend}"
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", query).split())
+
+
+def pack_vector(embedding: List[float]) -> bytes:
+    return struct.pack(f"<{len(embedding)}f", *embedding)
+
+
+def unpack_vector(data: bytes) -> List[float]:
+    return list(struct.unpack(f"<{len(data) // 4}f", data))
+
+
+class QueryEmbeddingCache:
+    """
+    Two-tier cache of query embeddings: a bounded in-process LRU in front of a Redis tier
+    shared by all web workers. Keys include the model name and backend, so switching
+    AppConfig.LM_MODEL_NAME never serves vectors of the previous model.
+    """
+    key_prefix = "query_embedding"
+
+    def __init__(self, max_size: int = None, ttl: int = None):
+        self.max_size = max_size or AppConfig.QUERY_EMBEDDING_CACHE_SIZE
+        self.ttl = ttl or AppConfig.QUERY_EMBEDDING_CACHE_TTL
+        self._local: OrderedDict[str, List[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._model_name = embedding_model_key()
+        self.counters = {"local_hits": 0, "redis_hits": 0, "misses": 0}
+
+    def _check_model(self):
+        model_name = embedding_model_key()
+        if self._model_name != model_name:
+            logger.info(f"Embedding model changed to «{model_name}», dropping cached query vectors")
+            self._local.clear()
+            self._model_name = model_name
+
+    def make_key(self, normalized_query: str) -> str:
+        model_name = embedding_model_key()
+        model_digest = hashlib.sha1(model_name.encode()).hexdigest()[:12]
+        query_digest = hashlib.sha1(normalized_query.encode()).hexdigest()
+        return f"{self.key_prefix}:{model_digest}:{query_digest}"
+
+    def get(self, normalized_query: str) -> Optional[List[float]]:
+        key = self.make_key(normalized_query)
+        with self._lock:
+            self._check_model()
+            embedding = self._local.get(key)
+            if embedding is not None:
+                self._local.move_to_end(key)
+                self.counters["local_hits"] += 1
+                return embedding
+
+        try:
+            packed = get_redis_client().get(key)
+        except RedisError as e:
+            logger.warning(f"Query embedding cache: Redis is unavailable: {e}")
+            packed = None
+
+        if packed is None:
+            with self._lock:
+                self.counters["misses"] += 1
+            return None
+
+        embedding = unpack_vector(packed)
+        with self._lock:
+            self.counters["redis_hits"] += 1
+            self._remember(key, embedding)
+        return embedding
+
+    def set(self, normalized_query: str, embedding: List[float]) -> List[float]:
+        key = self.make_key(normalized_query)
+        packed = pack_vector(embedding)
+        # Both tiers hold the float32 values, so a hit returns the same vector wherever it came from
+        embedding = unpack_vector(packed)
+        with self._lock:
+            self._check_model()
+            self._remember(key, embedding)
+        try:
+            get_redis_client().set(key, packed, ex=self.ttl)
+        except RedisError as e:
+            logger.warning(f"Query embedding cache: could not store the vector in Redis: {e}")
+        return embedding
+
+    def _remember(self, key: str, embedding: List[float]):
+        self._local[key] = embedding
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_size:
+            self._local.popitem(last=False)
+
+    def get_or_compute(self, query: str, compute: Callable[[str], List[float]]) -> List[float]:
+        normalized_query = normalize_query(query)
+        embedding = self.get(normalized_query)
+        if embedding is None:
+            embedding = self.set(normalized_query, compute(normalized_query))
+        return embedding
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = sum(self.counters.values())
+            hits = self.counters["local_hits"] + self.counters["redis_hits"]
+            return {
+                **self.counters,
+                "size": len(self._local),
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+query_embedding_cache = QueryEmbeddingCache()
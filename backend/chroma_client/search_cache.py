@@ -0,0 +1,89 @@
+import hashlib
+import json
+
+from redis import RedisError
+from chroma_client.query_cache import normalize_query
+from config.app_config import AppConfig
+from config.redis_client import get_redis_client
+
+from typing import Any, Dict, Optional
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class CollectionVersion:
+    """
+    Counter in Redis bumped after every successful write to a collection.
+    Cached search results are keyed by it, so new decisions invalidate them implicitly.
+    """
+
+    @staticmethod
+    def make_key(collection_name: str) -> str:
+        return f"collection_version:{collection_name}"
+
+    @classmethod
+    def get(cls, collection_name: str) -> Optional[int]:
+        try:
+            version = get_redis_client().get(cls.make_key(collection_name))
+        except RedisError as e:
+            logger.warning(f"Could not read the version of «{collection_name}»: {e}")
+            return None
+        return int(version) if version is not None else 0
+
+    @classmethod
+    def bump(cls, collection_name: str) -> Optional[int]:
+        try:
+            return get_redis_client().incr(cls.make_key(collection_name))
+        except RedisError as e:
+            logger.error(f"Could not bump the version of «{collection_name}», cached searches may be stale: {e}")
+            return None
+
+
+class SearchResultCache:
+    key_prefix = "search_result"
+
+    def __init__(self, ttl: int = None):
+        self.ttl = ttl or AppConfig.SEARCH_RESULT_CACHE_TTL
+        self.counters = {"hits": 0, "misses": 0}
+
+    def make_key(self, query: str, method: str, k: int, filters: Optional[Dict[str, Any]],
+                 collection_name: str, version: int) -> str:
+        params = json.dumps([normalize_query(query), method, k, filters], sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha1(params.encode()).hexdigest()
+        return f"{self.key_prefix}:{collection_name}:{version}:{digest}"
+
+    def get(self, query: str, method: str, k: int, filters: Optional[Dict[str, Any]] = None,
+            collection_name: str = None) -> tuple[Optional[Any], Optional[str]]:
+        """
+        Returns the cached result (or None) and the key to store a fresh result under.
+        The key is None when the collection version is unknown, such results must not be cached.
+        """
+        collection_name = collection_name or AppConfig.COLLECTION_NAME
+        version = CollectionVersion.get(collection_name)
+        if version is None:
+            return None, None
+
+        key = self.make_key(query, method, k, filters, collection_name, version)
+        try:
+            cached = get_redis_client().get(key)
+        except RedisError as e:
+            logger.warning(f"Search result cache: Redis is unavailable: {e}")
+            return None, None
+
+        if cached is None:
+            self.counters["misses"] += 1
+            return None, key
+        self.counters["hits"] += 1
+        return json.loads(cached), key
+
+    def set(self, key: Optional[str], result: Any):
+        if key is None:
+            return
+        try:
+            get_redis_client().set(key, json.dumps(result, ensure_ascii=False), ex=self.ttl)
+        except (RedisError, TypeError, ValueError) as e:
+            logger.warning(f"Search result cache: could not store the result: {e}")
+
+
+search_result_cache = SearchResultCache()
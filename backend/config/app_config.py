@@ -7,7 +7,99 @@ class AppConfig:
     LM_MODEL_NAME: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
     CHROMA_PATH: str = os.path.join(BASE_DIR, "chroma_db")
     COLLECTION_NAME: str = "chroma_docs"
+    # Collections the chunks are spread over by decision ID (1 - a single collection), threads querying them
+    CHROMA_SHARDS: int = int(os.getenv("CHROMA_SHARDS", "1"))
+    CHROMA_SHARD_WORKERS: int = 16
+    # HNSW parameters of newly created collections, compare them with the eval_hnsw_profiles command.
+    # search_ef below k has no effect, the index always explores at least k candidates.
+    HNSW_PROFILES: dict = {
+        "fast": {"hnsw:M": 12, "hnsw:construction_ef": 100, "hnsw:search_ef": 64},
+        "balanced": {"hnsw:M": 16, "hnsw:construction_ef": 200, "hnsw:search_ef": 200},
+        "accurate": {"hnsw:M": 32, "hnsw:construction_ef": 400, "hnsw:search_ef": 500},
+    }
+    HNSW_PROFILE: str = os.getenv("HNSW_PROFILE", "balanced")
+    # Memory-mapped copy of all chunk embeddings, searched exactly instead of HNSW when a query scans
+    # at most EXACT_SEARCH_MAX_CANDIDATES chunks (small collections, filters on few decisions).
+    # "float16" and "int8" matrices take RESCORE_FACTOR * k candidates, rescored from float32 vectors kept on disk
+    # (0 - no rescoring and no float32 copy); compare them with the bench_quantization command
+    EXACT_INDEX_ENABLED: bool = os.getenv("EXACT_INDEX_ENABLED", "True") == "True"
+    EXACT_INDEX_DTYPE: str = os.getenv("EXACT_INDEX_DTYPE", "float32")
+    EXACT_INDEX_RESCORE_FACTOR: int = 4
+    EXACT_INDEX_INITIAL_ROWS: int = 4096
+    EXACT_INDEX_BLOCK_ROWS: int = 16_384
+    EXACT_SEARCH_MAX_CANDIDATES: int = 20_000
+    # How long a comparison of the exact index with the Chroma counts is trusted while the index is unchanged;
+    # writes that bypass the handler (straight to the collection) are noticed after at most this long
+    EXACT_INDEX_READY_CHECK_SECONDS: float = 10.0
     MAX_CHUNK_SIZE: int = 512
     CHUNK_OVERLAP: int = 50
+    # Characters of text buffered by the streaming splitter before chunks are emitted
+    STREAM_SPLIT_WINDOW: int = 8 * 512
     DOMAIN_NAME: str = "127.0.0.1:8000"
     PROJECT_NAME: str = "Search Assistant"
+    # Embedding backend: "torch" (sentence-transformers), "onnx" (int8-quantized export run by onnxruntime)
+    # or "service" (client of the run_embedding_service process, which runs EMBEDDING_SERVICE_BACKEND)
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "torch")
+    EMBEDDING_SERVICE_BACKEND: str = os.getenv("EMBEDDING_SERVICE_BACKEND", "torch")
+    EMBEDDING_SERVICE_SOCKET: str = os.getenv("EMBEDDING_SERVICE_SOCKET", os.path.join(BASE_DIR, "run", "embedding.sock"))
+    EMBEDDING_SERVICE_TIMEOUT: float = 60.0
+    ONNX_MODEL_DIR: str = os.path.join(BASE_DIR, "onnx_model")
+    ONNX_INTRA_OP_THREADS: int = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))
+    # Decisions per ingestion task (1 - one task per decision) and chunks per encoder call
+    INGEST_BATCH_SIZE: int = 16
+    # Batches of decisions go through the streaming ingestion pipeline: fetch and parse threads, items per queue
+    # between the stages, longest wait (s) for more chunks before a partial embedding batch is encoded
+    INGEST_PIPELINE_ENABLED: bool = os.getenv("INGEST_PIPELINE_ENABLED", "False") == "True"
+    PIPELINE_FETCH_WORKERS: int = 8
+    PIPELINE_PARSE_WORKERS: int = 2
+    PIPELINE_QUEUE_SIZE: int = 32
+    PIPELINE_BATCH_WAIT: float = 0.05
+    # Bulk status lookups: most IDs per request, IDs per IN query
+    DECISION_STATUS_MAX_IDS: int = 10_000
+    DECISION_STATUS_QUERY_BATCH: int = 1000
+    # Lifetime (s) of the in-flight lock of a queued decision, bounds the wait after a worker crash
+    INFLIGHT_LOCK_TTL: int = 15 * 60
+    EMBEDDING_BATCH_SIZE: int = 64
+    # Page text extraction: "lxml" (streaming, no tree) or "bs4" (BeautifulSoup tree)
+    HTML_EXTRACTOR: str = "lxml"
+    # Decision pages fetcher: connection pool limits, timeout in seconds, cached ETag/Last-Modified validators
+    FETCH_MAX_CONNECTIONS: int = 32
+    FETCH_MAX_CONNECTIONS_PER_HOST: int = 8
+    FETCH_TIMEOUT: float = 30.0
+    FETCH_KEEPALIVE_TIMEOUT: float = 30.0
+    FETCH_VALIDATOR_CACHE_SIZE: int = 256
+    # Progress events of the decision tasks are published in pipelines of up to this size, at least this often (s)
+    PROGRESS_FLUSH_SIZE: int = 50
+    PROGRESS_FLUSH_INTERVAL: float = 0.25
+    # Per-user progress streams replayed to reconnecting sockets: approximate length cap and idle lifetime (s)
+    PROGRESS_STREAM_MAXLEN: int = 1000
+    PROGRESS_STREAM_TTL: int = 60 * 60 * 24
+    # Progress messages buffered per WebSocket, the oldest are dropped for clients that do not keep up
+    PROGRESS_SOCKET_QUEUE_SIZE: int = 100
+    # How long a connecting socket waits for the progress subscription before replaying the stream anyway (s)
+    PROGRESS_SUBSCRIBE_TIMEOUT: float = 10.0
+    # Content-addressed store of chunk embeddings, re-ingested or repeated chunks skip the encoder
+    CHUNK_EMBEDDING_STORE_ENABLED: bool = True
+    CHUNK_EMBEDDING_STORE_PATH: str = os.path.join(BASE_DIR, "embedding_store", "chunks.sqlite3")
+    CHUNK_EMBEDDING_STORE_MAX_BYTES: int = 2 * 1024 ** 3
+    # BM25 index next to Chroma for the hybrid search; terms found in more than this share of chunks are ignored
+    LEXICAL_MAX_DF_RATIO: float = 0.5
+    HYBRID_RRF_K: int = 60
+    # Decision-level search: decisions returned, chunks fetched per wanted decision at first, most chunks fetched
+    DECISION_SEARCH_TOP_N: int = 20
+    DECISION_SEARCH_CHUNKS_PER_DECISION: int = 5
+    DECISION_SEARCH_MAX_K: int = 1000
+    QUERY_EMBEDDING_CACHE_SIZE: int = 2048
+    QUERY_EMBEDDING_CACHE_TTL: int = 60 * 60 * 24 * 7
+    SEARCH_RESULT_CACHE_TTL: int = 60 * 60
+    # Query embeddings of concurrent searches are encoded in one batch of up to this size, waiting at most this long.
+    # Only for servers that run views on concurrent threads (e.g. gunicorn --threads): under ASGI the sync SearchView
+    # runs on the single thread-sensitive executor, no batch forms and every uncached query just waits longer
+    QUERY_BATCHING_ENABLED: bool = os.getenv("QUERY_BATCHING_ENABLED", "False") == "True"
+    QUERY_BATCH_MAX_SIZE: int = 32
+    QUERY_BATCH_MAX_WAIT_MS: float = 5.0
+    # Search responses: largest page of decisions a client may request, characters kept by the "snippets" projection
+    SEARCH_MAX_PAGE_SIZE: int = 100
+    SEARCH_SNIPPET_LENGTH: int = 300
+    # Load the embedding model at web/worker process start instead of on the first request
+    WARM_UP_EMBEDDING_MODEL: bool = os.getenv("WARM_UP_EMBEDDING_MODEL", "True") == "True"
@@ -26,6 +26,12 @@ application = ProtocolTypeRouter({
         )
     ),
 })
+
+from config.app_config import AppConfig
+if AppConfig.WARM_UP_EMBEDDING_MODEL:
+    from chroma_client.model_registry import EmbeddingModelRegistry
+    EmbeddingModelRegistry.warm_up()
+
 # application = ProtocolTypeRouter({
 #     "http": get_asgi_application(),
 #     "websocket": AllowedHostsOriginValidator(
@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from celery.signals import worker_process_init
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
@@ -14,3 +15,12 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
+
+
+@worker_process_init.connect
+def warm_up_embedding_model(**kwargs):
+    # Every prefork child loads the model once and reuses it for all its tasks
+    from config.app_config import AppConfig
+    if AppConfig.WARM_UP_EMBEDDING_MODEL:
+        from chroma_client.model_registry import EmbeddingModelRegistry
+        EmbeddingModelRegistry.warm_up()
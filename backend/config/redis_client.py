@@ -0,0 +1,20 @@
+import redis
+from django.conf import settings
+
+
+_connection_pool = None
+
+
+def get_redis_client() -> redis.Redis:
+    """
+    Returns a client bound to the process-wide connection pool built from settings.REDIS_URL.
+    """
+    global _connection_pool
+    if _connection_pool is None:
+        _connection_pool = redis.ConnectionPool.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=5,
+            socket_timeout=5,
+            health_check_interval=30,
+        )
+    return redis.Redis(connection_pool=_connection_pool)
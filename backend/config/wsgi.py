@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+from config.app_config import AppConfig
+if AppConfig.WARM_UP_EMBEDDING_MODEL:
+    from chroma_client.model_registry import EmbeddingModelRegistry
+    EmbeddingModelRegistry.warm_up()
@@ -1,18 +1,30 @@
 import asyncio
-import os
+import json
+import re
+import time
 
-import redis.asyncio as redis
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from urllib.parse import parse_qs
-from contextlib import suppress
+from config.app_config import AppConfig
+from web_socket.subscriber import SocketSendQueue, progress_subscriber, stream_id_at
 
-from dotenv import load_dotenv
-load_dotenv()
+from typing import Optional, Tuple
 
 import logging
 logger = logging.getLogger(__name__)
 
+STREAM_ID = re.compile(r"^(\d+)-(\d+)$")
+
+
+def parse_event_id(event_id) -> Optional[Tuple[int, int]]:
+    """
+    Redis stream entry IDs ("<ms>-<seq>") as comparable tuples, None for a missing or malformed ID.
+    """
+    match = STREAM_ID.match(event_id or "")
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
 class ProgressConsumer(AsyncWebsocketConsumer):
 
     async def connect(self):
@@ -32,52 +44,72 @@ class ProgressConsumer(AsyncWebsocketConsumer):
 
         self.channel_name_redis = f"user:{self.user.uuid_channel}"
 
-        try:
-            self.redis = redis.from_url(
-                os.getenv('REDIS_URL'),
-                health_check_interval=10,
-                socket_connect_timeout=5,
-                retry_on_timeout=True,
-                socket_keepalive=True
-            )
-        except Exception as e:
-            logger.error(f"Redis connection failed: {e}")
-            await self.close()
-            return
+        last_event_id = query_params.get("last_event_id", [None])[0]
+        self.last_event_id = parse_event_id(last_event_id)
+        # IDs sent by the replays that the live subscription may deliver again
+        self.replayed = set()
+        connected_at = stream_id_at(time.time())
 
         await self.accept()
         logger.info(f"WebSocket accepted for user {self.user.uuid_channel}")
-        asyncio.create_task(self.listen_redis())
+        # Messages come from the process-wide subscription, not from a Redis connection of this socket.
+        # Live messages wait in the queue until the missed ones are replayed.
+        self.send_queue = SocketSendQueue(self.send_event, paused=True, replay=self.replay_missed)
+        progress_subscriber.register(self.channel_name_redis, self.send_queue)
 
-    async def listen_redis(self):
+        if self.last_event_id is None and progress_subscriber.ready.is_set():
+            self.send_queue.resume()
+            return
+        # Events published before the subscription is active only reach the socket through the replay
         try:
-            pubsub = self.redis.pubsub()
-            await pubsub.subscribe(self.channel_name_redis)
-
-            async for message in pubsub.listen():
-                if message["type"] == "message":
-                    try:
-                        data = message["data"]
-                        if isinstance(data, bytes):
-                            data = data.decode()
-                        logger.info(f"Sending message to frontend: {data}")
-                        await self.send(text_data=data)
-                    except Exception as decode_error:
-                        logger.error(f"Error decoding message: {decode_error}")
+            await asyncio.wait_for(progress_subscriber.ready.wait(), AppConfig.PROGRESS_SUBSCRIBE_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("The progress subscription is not active yet, replaying the stream without it")
+        await self.replay_missed(connected_at)
+        self.send_queue.resume()
+
+    async def replay_missed(self, since: Optional[Tuple[int, int]] = None):
+        """
+        Sends the events of the user's stream after the last one this socket has sent,
+        or after since when it has not sent any.
+        """
+        start = self.last_event_id or since
+        if start is None:
+            return
+        # Duplicates of an earlier replay arrive right after it, its IDs are not kept any longer
+        self.replayed = set()
+        try:
+            for data in await progress_subscriber.replay(str(self.user.uuid_channel), f"{start[0]}-{start[1]}"):
+                event_id = parse_event_id(json.loads(data).get("event_id"))
+                if event_id is not None:
+                    self.replayed.add(event_id)
+                await self.send_tracked(data, event_id)
         except Exception as e:
-            logger.error(f"Error listening to Redis: {e}")
-            if not self.is_closed:
-                self.is_closed = True
-                with suppress(Exception):
-                    await self.close()
+            logger.warning(f"Progress replay failed for user {self.user.uuid_channel}: {e}")
+
+    async def send_event(self, data: str):
+        # Only events sent by a replay are skipped: worker processes publish independently, so live events
+        # do not arrive in stream ID order and an older ID than the last one sent may well be new
+        event_id = parse_event_id(json.loads(data).get("event_id"))
+        if event_id in self.replayed:
+            self.replayed.discard(event_id)
+            return
+        await self.send_tracked(data, event_id)
+
+    async def send_tracked(self, data: str, event_id: Optional[Tuple[int, int]]):
+        # The highest ID sent is where a later replay continues
+        if event_id is not None and (self.last_event_id is None or event_id > self.last_event_id):
+            self.last_event_id = event_id
+        await self.send(text_data=data)
 
     async def disconnect(self, close_code):
         self.is_closed = True
-        try:
-            await self.redis.close()
-            logger.info("Redis connection closed")
-        except Exception as e:
-            logger.warning(f"Error during disconnect: {e}")
+        send_queue = getattr(self, "send_queue", None)
+        if send_queue is not None:
+            progress_subscriber.unregister(self.channel_name_redis, send_queue)
+            send_queue.close()
+            if send_queue.dropped:
+                logger.warning(f"{send_queue.dropped} progress messages dropped for a slow client")
 
     @database_sync_to_async
     def get_user_from_token(self, token):
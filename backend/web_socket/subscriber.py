@@ -0,0 +1,202 @@
+import asyncio
+import json
+import time
+
+import redis.asyncio as redis
+from django.conf import settings
+from celery_tasks.progress import progress_stream_key, with_event_id
+from config.app_config import AppConfig
+from collections import defaultdict
+
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def stream_id_at(timestamp: float) -> Tuple[int, int]:
+    """
+    Redis stream ID just before the given time, with a margin for the clock difference with the Redis server.
+    """
+    return int((timestamp - 1.0) * 1000), 0
+
+
+class SocketSendQueue:
+    """
+    Bounded queue of the messages waiting to be sent to one WebSocket.
+    A client that does not keep up loses its oldest messages instead of growing the process memory.
+    replay(since) sends the events missed while the subscription was down; since is the stream ID
+    the subscription was lost at.
+    """
+
+    def __init__(self, send: Callable[[str], Awaitable[None]], max_size: int = None, paused: bool = False,
+                 replay: Callable[[Optional[Tuple[int, int]]], Awaitable[None]] = None):
+        self._send = send
+        self._replay = replay
+        self._queue = asyncio.Queue(max_size or AppConfig.PROGRESS_SOCKET_QUEUE_SIZE)
+        # A paused queue collects messages (e.g. while missed events are replayed) and sends them after resume()
+        self._resumed = asyncio.Event()
+        if not paused:
+            self._resumed.set()
+        self._task = asyncio.create_task(self._run())
+        self.dropped = 0
+
+    def pause(self):
+        self._resumed.clear()
+
+    def resume(self):
+        self._resumed.set()
+
+    async def resync(self, since: Tuple[int, int]):
+        if self._replay is None:
+            return
+        self.pause()
+        try:
+            await self._replay(since)
+        except Exception as e:
+            logger.warning(f"Progress replay after a reconnect failed: {e}")
+        finally:
+            self.resume()
+
+    def put(self, data: str):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(data)
+
+    async def _run(self):
+        while True:
+            data = await self._queue.get()
+            await self._resumed.wait()
+            try:
+                await self._send(data)
+            except Exception as e:
+                logger.warning(f"Error sending a progress message: {e}")
+
+    def close(self):
+        self._task.cancel()
+
+
+class ProgressSubscriber:
+    """
+    One Redis connection and one pattern subscription per ASGI process for all progress sockets.
+    Messages are dispatched to the send queues registered for their channel.
+    """
+
+    def __init__(self, pattern: str = "user:*", redis_url: str = None):
+        self.pattern = pattern
+        self.redis_url = redis_url or settings.REDIS_URL
+        self._queues: Dict[str, Set[SocketSendQueue]] = defaultdict(set)
+        self._task = None
+        self._client = None
+        self._resyncs: Set[asyncio.Task] = set()
+        self.ready = None
+        self.counters = {"messages": 0, "delivered": 0, "unrouted": 0, "reconnects": 0, "replays": 0}
+
+    def _ensure_listener(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self.ready = asyncio.Event()
+            self._task = loop.create_task(self._listen())
+
+    def register(self, channel: str, send_queue: SocketSendQueue):
+        self._ensure_listener()
+        self._queues[channel].add(send_queue)
+
+    def unregister(self, channel: str, send_queue: SocketSendQueue):
+        send_queues = self._queues.get(channel)
+        if send_queues is None:
+            return
+        send_queues.discard(send_queue)
+        if not send_queues:
+            del self._queues[channel]
+
+    def dispatch(self, channel: str, data: str):
+        self.counters["messages"] += 1
+        send_queues = self._queues.get(channel)
+        if not send_queues:
+            # Sockets of this user are connected to another process
+            self.counters["unrouted"] += 1
+            return
+        for send_queue in send_queues:
+            send_queue.put(data)
+            self.counters["delivered"] += 1
+
+    def _resync(self, since: Tuple[int, int]):
+        """
+        Replays to every registered socket the events published while the subscription was down.
+        """
+        for send_queues in list(self._queues.values()):
+            for send_queue in list(send_queues):
+                task = asyncio.create_task(send_queue.resync(since))
+                self._resyncs.add(task)
+                task.add_done_callback(self._resyncs.discard)
+
+    async def _listen(self):
+        delay = 0.5
+        lost_at = None
+        while True:
+            client = redis.from_url(
+                self.redis_url,
+                health_check_interval=10,
+                socket_connect_timeout=5,
+                socket_keepalive=True,
+            )
+            try:
+                pubsub = client.pubsub()
+                await pubsub.psubscribe(self.pattern)
+                logger.info(f"Subscribed to «{self.pattern}»")
+                self.ready.set()
+                delay = 0.5
+                if lost_at is not None:
+                    self._resync(lost_at)
+                    lost_at = None
+
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    channel = message["channel"]
+                    data = message["data"]
+                    self.dispatch(
+                        channel.decode() if isinstance(channel, bytes) else channel,
+                        data.decode() if isinstance(data, bytes) else data,
+                    )
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Progress subscription lost, reconnecting in {delay:.1f}s: {e}")
+                self.counters["reconnects"] += 1
+                if self.ready.is_set():
+                    lost_at = stream_id_at(time.time())
+                self.ready.clear()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+            finally:
+                await client.aclose()
+
+    async def replay(self, user_channel_id: str, last_event_id: str) -> List[str]:
+        """
+        Returns the events of the user's progress stream published after last_event_id, with a single XRANGE.
+        """
+        if self._client is None:
+            # Commands go through a small pool of their own, the subscription connection is blocked in listen()
+            self._client = redis.from_url(self.redis_url, socket_connect_timeout=5, max_connections=10)
+        entries = await self._client.xrange(
+            progress_stream_key(user_channel_id), min=f"({last_event_id}", max="+",
+            count=AppConfig.PROGRESS_STREAM_MAXLEN,
+        )
+        self.counters["replays"] += 1
+        return [
+            json.dumps(with_event_id(json.loads(fields[b"data"]), event_id)) for event_id, fields in entries
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **self.counters,
+            "channels": len(self._queues),
+            "sockets": sum(len(send_queues) for send_queues in self._queues.values()),
+        }
+
+
+progress_subscriber = ProgressSubscriber()
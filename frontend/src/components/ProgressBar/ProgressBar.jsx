@@ -21,14 +21,17 @@ LinearProgressWithLabel.propTypes = {
   value: PropTypes.number.isRequired,
 };
 
-export default function ProgressBar({ taskIds, messages }) {
+// Stable default, a new array on every render would re-run the effect below endlessly
+const NO_IDS = [];
+
+export default function ProgressBar({ taskIds, messages, doneIds = NO_IDS }) {
   const [completed, setCompleted] = useState([]);
 
   useEffect(() => {
     if (!taskIds || taskIds.length === 0) return;
 
     const relevantIds = new Set(taskIds);
-    const completedStatuses = ["done", "already_done", "success"];
+    const completedStatuses = ["done", "already_done", "unchanged", "success"];
 
     const newCompleted = messages
       .filter(
@@ -38,8 +41,9 @@ export default function ProgressBar({ taskIds, messages }) {
       )
       .map((msg) => msg.decision_id);
 
-    setCompleted(Array.from(new Set(newCompleted)));
-  }, [messages, taskIds]);
+    // Decisions processed before the upload are not enqueued and send no messages
+    setCompleted(Array.from(new Set([...doneIds, ...newCompleted])));
+  }, [messages, taskIds, doneIds]);
 
   const progress = taskIds?.length
     ? (completed.length / taskIds.length) * 100
@@ -61,4 +65,5 @@ export default function ProgressBar({ taskIds, messages }) {
 ProgressBar.propTypes = {
   taskIds: PropTypes.array.isRequired,
   messages: PropTypes.array.isRequired,
+  doneIds: PropTypes.array,
 };
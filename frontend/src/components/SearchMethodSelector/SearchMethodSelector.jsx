@@ -12,6 +12,8 @@ const methodDescriptions = {
   similarity_search_by_vector: "Пошук за вектором без оцінки релевантності",
   similarity_search_by_vector_with_relevance_scores:
     "Пошук за вектором з оцінкою релевантності",
+  hybrid: "Гібридний пошук (ключові слова + вектор)",
+  decision_search: "Пошук найкращих рішень (без повторів)",
 };
 
 export default function SearchMethodSelector({ value, onChange }) {
@@ -84,6 +84,14 @@ const SearchPage = () => {
                   3. Пошук за вектором з оцінкою релевантності - шукає за
                   змістом та надає оцінку подібності
                 </p>
+                <p>
+                  4. Гібридний пошук - поєднує пошук за точними словами (номери
+                  статей, справ) з пошуком за змістом
+                </p>
+                <p>
+                  5. Пошук найкращих рішень - повертає задану кількість різних
+                  рішень, навіть якщо одне рішення має багато схожих фрагментів
+                </p>
               </div>
             </div>
           </div>
@@ -16,56 +16,82 @@ const UploadPage = () => {
   const [messages, setMessages] = useState([]);
 
   const socketRef = useRef(null); // save socket
+  const lastEventIdRef = useRef(null); // last progress event, missed events are replayed after it on reconnect
 
   // web-socket
   useEffect(() => {
-    const token = localStorage.getItem("access");
-    const ws = new WebSocket(`ws://localhost:8000/ws/progress/?token=${token}`);
-    socketRef.current = ws;
-
-    ws.onopen = () => {
-      setMessages((prev) => [
-        ...prev,
-        { type: "system", detail: "WebSocket connected" },
-      ]);
-    };
+    let closedByPage = false;
+    let retryDelay = 1000;
+    let retryTimer = null;
+
+    const connect = () => {
+      const token = localStorage.getItem("access");
+      const resume = lastEventIdRef.current
+        ? `&last_event_id=${encodeURIComponent(lastEventIdRef.current)}`
+        : "";
+      const ws = new WebSocket(
+        `ws://localhost:8000/ws/progress/?token=${token}${resume}`
+      );
+      socketRef.current = ws;
+
+      ws.onopen = () => {
+        retryDelay = 1000;
+        setMessages((prev) => [
+          ...prev,
+          { type: "system", detail: "WebSocket connected" },
+        ]);
+      };
 
-    ws.onmessage = (event) => {
-      try {
-        const data = JSON.parse(event.data);
+      ws.onmessage = (event) => {
+        try {
+          const data = JSON.parse(event.data);
+          if (data.event_id) {
+            lastEventIdRef.current = data.event_id;
+          }
 
-        if (data.type === "progress") {
-          setMessages((prev) => [...prev, data]);
-        } else if (data.type === "status") {
-          setMessages((prev) => [...prev, data]);
-        } else {
-          setMessages((prev) => [...prev, data]);
+          if (data.type === "progress") {
+            setMessages((prev) => [...prev, data]);
+          } else if (data.type === "status") {
+            setMessages((prev) => [...prev, data]);
+          } else {
+            setMessages((prev) => [...prev, data]);
+          }
+        } catch (err) {
+          console.error("Failed to parse WebSocket message", err);
         }
-      } catch (err) {
-        console.error("Failed to parse WebSocket message", err);
-      }
-    };
+      };
 
-    ws.onerror = (err) => {
-      setMessages((prev) => [
-        ...prev,
-        {
-          type: "error",
-          detail: `WebSocket error: ${err?.message || "Unknown error"}`,
-        },
-      ]);
-    };
+      ws.onerror = (err) => {
+        setMessages((prev) => [
+          ...prev,
+          {
+            type: "error",
+            detail: `WebSocket error: ${err?.message || "Unknown error"}`,
+          },
+        ]);
+      };
 
-    ws.onclose = () => {
-      setMessages((prev) => [
-        ...prev,
-        { type: "system", detail: "WebSocket closed" },
-      ]);
+      ws.onclose = () => {
+        setMessages((prev) => [
+          ...prev,
+          { type: "system", detail: "WebSocket closed" },
+        ]);
+        if (closedByPage) {
+          return;
+        }
+        // Reconnect with a jittered backoff, so that a server restart does not get all tabs back at once
+        retryTimer = setTimeout(connect, retryDelay * (0.5 + Math.random()));
+        retryDelay = Math.min(retryDelay * 2, 30000);
+      };
     };
 
+    connect();
+
     return () => {
-      if (ws.readyState === 1) {
-        ws.close();
+      closedByPage = true;
+      clearTimeout(retryTimer);
+      if (socketRef.current && socketRef.current.readyState === 1) {
+        socketRef.current.close();
       }
     };
   }, []);
@@ -183,6 +209,9 @@ const UploadPage = () => {
                 userChannelId={uploadingResult.user_channel_id}
                 socket={socketRef.current}
                 messages={messages}
+                doneIds={Object.keys(uploadingResult.statuses || {}).filter(
+                  (id) => uploadingResult.statuses[id] === "done"
+                )}
               />
             )}
 